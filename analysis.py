@@ -0,0 +1,319 @@
+"""
+股票分析核心 - 不依赖 Streamlit，可在批处理/定时任务中直接导入
+提供：代码解析、数据获取、指标计算、技术信号、缠论/威科夫/形态判断、综合结论
+重量级依赖（yfinance、fuzzywuzzy、curl_cffi 等）均在首次使用时才导入
+"""
+
+import os
+import threading
+import time
+from functools import lru_cache
+
+# 指标计算后端：fused 为单次遍历的融合内核，pandas 为逐列 rolling/ewm 的参考实现
+INDICATOR_BACKEND = os.environ.get("STOCK_INDICATOR_BACKEND", "fused")
+# 全库品种版本的扫描间隔（秒）：形态索引与全库前瞻统计在此间隔内沿用上次扫描结果
+VERSION_TTL = float(os.environ.get("STOCK_VERSION_TTL", "60"))
+
+# 股票数据库
+STOCK_DATABASE = {
+    "MSFT": {"name": "Microsoft Corporation", "market": "US", "full_code": "MSFT"},
+    "AAPL": {"name": "Apple Inc", "market": "US", "full_code": "AAPL"},
+    "GOOGL": {"name": "Alphabet Inc", "market": "US", "full_code": "GOOGL"},
+    "AMZN": {"name": "Amazon.com Inc", "market": "US", "full_code": "AMZN"},
+    "META": {"name": "Meta Platforms Inc", "market": "US", "full_code": "META"},
+    "TSLA": {"name": "Tesla Inc", "market": "US", "full_code": "TSLA"},
+    "NVDA": {"name": "NVIDIA Corporation", "market": "US", "full_code": "NVDA"},
+    "600060": {"name": "海信视像", "market": "A", "full_code": "600060.SS"},
+    "600785": {"name": "新华百货", "market": "A", "full_code": "600785.SS"},
+    "603986": {"name": "兆易创新", "market": "A", "full_code": "603986.SS"},
+    "002050": {"name": "三花智控", "market": "A", "full_code": "002050.SZ"},
+    "688521": {"name": "芯原股份", "market": "A", "full_code": "688521.SS"},
+    "600519": {"name": "贵州茅台", "market": "A", "full_code": "600519.SS"},
+    "9988": {"name": "阿里巴巴-SW", "market": "HK", "full_code": "9988.HK"},
+    "0700": {"name": "腾讯控股", "market": "HK", "full_code": "0700.HK"},
+    "3690": {"name": "美团-W", "market": "HK", "full_code": "3690.HK"},
+}
+
+@lru_cache(maxsize=1)
+def get_symbol_index():
+    # 可通过 STOCK_UNIVERSE 指定全市场代码表（CSV），内置列表作为补充
+    from symbol_search import SymbolIndex, load_universe
+    universe = load_universe(os.environ["STOCK_UNIVERSE"]) if os.environ.get("STOCK_UNIVERSE") else {}
+    return SymbolIndex({**universe, **STOCK_DATABASE})
+
+def fuzzy_search(query, limit=5):
+    return get_symbol_index().search(query, limit)
+
+def get_stock_code(user_input):
+    user_input = user_input.strip().upper()
+    index = get_symbol_index()
+    if user_input in index: return index.get(user_input)["full_code"]
+    results = fuzzy_search(user_input, 1)
+    if results: return results[0]["full_code"]
+    if user_input.isdigit() and len(user_input) == 6:
+        return f"{user_input}.SS" if user_input.startswith("6") else f"{user_input}.SZ"
+    if user_input.isdigit() and len(user_input) == 4:
+        return f"{user_input}.HK"
+    return None
+
+@lru_cache(maxsize=1)
+def get_store():
+    from bar_store import BarStore
+    return BarStore()
+
+@lru_cache(maxsize=1)
+def get_fetcher():
+    from bar_store import yahoo_history
+    from fetcher import Fetcher
+    return Fetcher(fallback=yahoo_history)
+
+@lru_cache(maxsize=1)
+def get_timeframes():
+    from timeframe import Timeframes
+    return Timeframes()
+
+def get_stock_data(symbol, period="1y", with_info=True, interval="1d"):
+    """返回 (K线, 基本面信息)；失败时K线为None，信息中带 error
+    interval 为K线周期（1d/1wk/1mo/3mo），由全量日线切片、聚合得到
+    """
+    try:
+        store, fetcher = get_store(), get_fetcher()
+        # K线走本地存储（过期时只补尾部）；基本面走长TTL的本地记录，缺失时与K线并发获取，超时不阻塞K线
+        def get_bars(s):
+            base = store.get(s, "max", fetch=fetcher.history)
+            return None if base is None else get_timeframes().derive(s, base, period, interval)
+        if not with_info: return get_bars(symbol), {}
+        return get_fundamentals().fetch(symbol, get_bars)
+    except Exception as e:
+        return None, {"error": str(e)}
+
+@lru_cache(maxsize=1)
+def get_fundamentals():
+    from fundamentals import FundamentalsStore
+    return FundamentalsStore(get_fetcher())
+
+@lru_cache(maxsize=1)
+def _valuation_table(version):
+    """按基本面存储版本缓存的记录表与全表估值，记录不变时不再重算"""
+    from fundamentals import valuate
+    funds = get_fundamentals().frame()
+    return funds, valuate(funds)
+
+def valuation(symbol, df=None):
+    """单个代码的估值，PE区间取本地已有基本面的同行业分位；df 给出时价格与52周区间取最近一年K线
+    全表估值按存储版本缓存，df 给出时只重算该代码一行（PE缺失需由价格反推时同行业分位也会变，才整表重算）"""
+    import pandas as pd
+    from fundamentals import valuate
+    funds, table = _valuation_table(get_fundamentals().current_version())
+    if symbol not in funds.index: return None
+    if df is None or not len(df): return table.loc[symbol].to_dict()
+    year = df[df.index > df.index[-1] - pd.Timedelta(days=365)]
+    quote = year['Close'].iloc[-1], year['Low'].min(), year['High'].max()
+    if funds.at[symbol, 'trailingPE'] == funds.at[symbol, 'trailingPE']:
+        bands = table.loc[[symbol], ['pe_low', 'pe_mid', 'pe_high']].to_numpy()
+        return valuate(funds.loc[[symbol]], *([q] for q in quote), bands=bands).loc[symbol].to_dict()
+    price, low, high = (funds[k].to_numpy(dtype=float, copy=True) for k in ("currentPrice", "fiftyTwoWeekLow", "fiftyTwoWeekHigh"))
+    i = funds.index.get_loc(symbol)
+    price[i], low[i], high[i] = quote
+    return valuate(funds, price, low, high).loc[symbol].to_dict()
+
+@lru_cache(maxsize=1)
+def get_shared_cache():
+    from shared_cache import from_url
+    return from_url(os.environ.get("STOCK_CACHE_URL"))
+
+def get_base_data(symbol, ttl=300):
+    """全量日线+基本面，经跨进程共享缓存；多个 worker 同时请求同一代码只取一次，失败结果不缓存"""
+    return get_shared_cache().get_or_compute(f"base:{symbol}", lambda: get_stock_data(symbol, "max"), ttl,
+                                             cache_if=lambda r: r[0] is not None and len(r[0]) > 0)
+
+def calculate_indicators(df, backend=None, dtype=None):
+    """技术指标；backend 缺省取 STOCK_INDICATOR_BACKEND，dtype 仅融合内核支持（如 np.float32）"""
+    if (backend or INDICATOR_BACKEND) == "fused":
+        import numpy as np
+        from fused import calculate_indicators_fused
+        return calculate_indicators_fused(df, dtype or np.float64)
+    return calculate_indicators_pandas(df)
+
+def calculate_indicators_pandas(df):
+    d = df.copy()
+    for m in [5, 10, 20, 60]: d[f'MA{m}'] = d['Close'].rolling(m).mean()
+    d['VWAP'] = (d['Close'] * d['Volume']).cumsum() / d['Volume'].cumsum()
+    e1, e2 = d['Close'].ewm(span=12).mean(), d['Close'].ewm(span=26).mean()
+    d['MACD'] = e1 - e2
+    d['MACD_Signal'] = d['MACD'].ewm(span=9).mean()
+    dl = d['Close'].diff()
+    g, l = dl.where(dl>0,0).rolling(14).mean(), (-dl.where(dl<0,0)).rolling(14).mean()
+    d['RSI'] = 100 - (100/(1+g/l))
+    low_min, high_max = d['Low'].rolling(9).min(), d['High'].rolling(9).max()
+    d['K'] = 100 * (d['Close'] - low_min) / (high_max - low_min)
+    d['D'] = d['K'].rolling(3).mean()
+    d['J'] = 3 * d['K'] - 2 * d['D']
+    d['BB_Mid'] = d['Close'].rolling(20).mean()
+    d['BB_Std'] = d['Close'].rolling(20).std()
+    d['BB_Up'], d['BB_Down'] = d['BB_Mid'] + 2*d['BB_Std'], d['BB_Mid'] - 2*d['BB_Std']
+    # ATR/Supertrend/SAR/吊灯止损依赖上一根的状态，用逐根递推内核
+    from trail import trail_indicators
+    for k, v in trail_indicators(d['High'].to_numpy(), d['Low'].to_numpy(), d['Close'].to_numpy()).items(): d[k] = v
+    return d
+
+def analyze_technical(df):
+    """技术分析"""
+    d = calculate_indicators(df)
+    cp = d['Close'].iloc[-1]
+    ma5, ma10, ma20 = d['MA5'].iloc[-1], d['MA10'].iloc[-1], d['MA20'].iloc[-1]
+    rsi = d['RSI'].iloc[-1]
+    k, d_k = d['K'].iloc[-1], d['D'].iloc[-1]
+    macd, macd_sig = d['MACD'].iloc[-1], d['MACD_Signal'].iloc[-1]
+    st_val = d['Supertrend'].iloc[-1]
+    bb_up, bb_down = d['BB_Up'].iloc[-1], d['BB_Down'].iloc[-1]
+    
+    signals = {}
+    
+    # 均线
+    if ma5 > ma10 > ma20: sig, reason = "买入", "均线多头排列"
+    elif ma5 < ma10 < ma20: sig, reason = "卖出", "均线空头排列"
+    else: sig, reason = "观望", "均线纠缠"
+    signals['均线'] = {"signal": sig, "reason": reason}
+    
+    # MACD
+    sig = "买入" if macd > macd_sig else "卖出"
+    signals['MACD'] = {"signal": sig, "reason": "MACD金叉" if sig=="买入" else "死叉"}
+    
+    # RSI
+    if rsi < 30: sig, reason = "超卖买入", f"RSI={rsi:.1f}超卖"
+    elif rsi > 70: sig, reason = "超买卖出", f"RSI={rsi:.1f}超买"
+    else: sig, reason = "观望", f"RSI={rsi:.1f}中性"
+    signals['RSI'] = {"signal": sig, "reason": reason}
+    
+    # KDJ
+    sig = "买入" if k > d_k else "卖出"
+    signals['KDJ'] = {"signal": sig, "reason": "KDJ金叉" if sig=="买入" else "死叉"}
+    
+    # 布林带
+    if cp > bb_up: sig, reason = "超买", "突破布林上轨"
+    elif cp < bb_down: sig, reason = "超卖", "触及布林下轨"
+    else: sig, reason = "观望", "布林带内运行"
+    signals['布林带'] = {"signal": sig, "reason": reason}
+    
+    # Supertrend：方向由轨道翻转决定，多头时价格在下轨之上
+    sig = "买入" if d['Supertrend_Dir'].iloc[-1] == 1 else "卖出"
+    signals['Supertrend'] = {"signal": sig, "reason": f"多头，止损线{st_val:.2f}" if sig=="买入" else f"空头，压力线{st_val:.2f}"}
+    
+    return signals, d
+
+def chan_analysis(d):
+    """均线走势 + 缠论结构（笔/线段/中枢）"""
+    from chan import analyze_chan, chan_signal
+    cp, ma20 = d['Close'].iloc[-1], d['MA20'].iloc[-1]
+    ma60 = d['MA60'].iloc[-1] if len(d) >= 60 else ma20
+    if cp > ma20 > ma60: trend, sig = "上涨趋势", "买入"
+    elif cp < ma20 < ma60: trend, sig = "下跌趋势", "卖出"
+    else: trend, sig = "震荡整理", "观望"
+    chan = analyze_chan(d)
+    pos, chan_sig = chan_signal(chan, cp)
+    strokes, pivots = chan.strokes, chan.pivots()
+    return {"trend": trend, "signal": sig, "engine": chan, "strokes": strokes, "segments": chan.segments(),
+            "pivots": pivots, "position": pos, "chan_signal": chan_sig,
+            "last_stroke": strokes[-1]['direction'] if strokes else None}
+
+def wyckoff_analysis(d):
+    """成交量分布（POC/价值区）+ Spring/UTAD/SC 等结构事件判断阶段"""
+    from wyckoff import analyze_wyckoff, wyckoff_phase, EVENT_NAMES
+    avg_vol = d['Volume'].mean()
+    recent_vol = d['Volume'].iloc[-5:].mean()
+    engine = analyze_wyckoff(d)
+    phase, sig = wyckoff_phase(engine, float(d['Close'].iloc[-1]))
+    val, vah = engine.profile.value_area()
+    events = [{"index": i, "date": str(d.index[i]), "event": EVENT_NAMES[e]} for i, e in engine.recent()]
+    return {"phase": phase, "volume": '缩量' if recent_vol < avg_vol else '放量', "signal": sig,
+            "poc": engine.profile.poc(), "val": val, "vah": vah, "events": events,
+            "last_event": events[-1]["event"] if events else None}
+
+def pattern_analysis(d):
+    cp = d['Close'].iloc[-1]
+    high, low = d['High'].max(), d['Low'].min()
+    if cp > high * 0.9: pat, sig = "突破形态", "买入"
+    elif cp < low * 1.1: pat, sig = "二次探底", "卖出"
+    else: pat, sig = "横盘整理", "观望"
+    return {"pattern": pat, "high": high, "low": low, "signal": sig}
+
+_pattern = {"index": None}
+_pattern_lock = threading.Lock()
+
+def get_pattern_index():
+    """本地库全部品种的形态索引；品种增减或K线更新（版本变化）时只重新读取、重算变化的品种"""
+    from similarity import PatternIndex
+    with _pattern_lock:
+        index = _pattern["index"] or PatternIndex()
+        _pattern["index"] = index = index.updated(get_store(), stored_versions())
+    return index
+
+def similar_patterns(df, symbol=None, m=30, k=8, universe=False):
+    """最近m根K线的相似历史K段及其后续收益；universe=False 时只在 df 自身历史中查找"""
+    from similarity import PatternIndex, summarize
+    close = df['Close'].to_numpy()
+    if universe:
+        index = get_pattern_index()
+    else:
+        symbol = symbol or "_self"
+        index = PatternIndex(max_len=max(m, 256)).add(symbol, close, df.index)
+    # 排除查询自身所在区间（全库索引中该品种的长度可能与 df 不同；不在库中则无需排除）
+    exclude = (symbol, len(index.series[symbol][0]) - m) if symbol in index.series else None
+    matches = index.search(close[-m:], k, exclude=exclude)
+    return {"matches": matches, "summary": summarize(matches)}
+
+@lru_cache(maxsize=1)
+def get_forward_stats():
+    from forward import ForwardStats
+    return ForwardStats()
+
+_versions = {"at": 0.0, "versions": {}}
+
+def stored_versions(symbols=None, max_age=VERSION_TTL):
+    """本地库已有日线的版本（不读K线、不联网），{代码: 版本}
+    全库扫描要读每个品种的 meta.json，结果缓存 max_age 秒，避免每次请求都扫一遍；指定 symbols 时直接读取
+    """
+    store = get_store()
+    if symbols is None and time.time() - _versions["at"] < max_age: return _versions["versions"]
+    versions = {s: store.version(s) for s in (symbols or store.symbols())}
+    versions = {s: v for s, v in versions.items() if v is not None}
+    if symbols is None: _versions.update(at=time.time(), versions=versions)
+    return versions
+
+def horizon_advice(df, symbol=None, universe=False):
+    """各持有期建议与成本区间：当前综合信号下的历史前瞻收益分布；df 为日线，universe=True 时样本取本地全库"""
+    from forward import advise, cost_ranges, signal_state
+    fs = get_forward_stats()
+    load = lambda s: get_store().get(s, "max", fetch=None)
+    stats = fs.universe(stored_versions(), load) if universe else fs.get(symbol or "_self", df)
+    state = int(signal_state(df['Close'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy())[0, -1])
+    state = None if state == -128 else state
+    price = float(df['Close'].iloc[-1])
+    return {"state": state, "advice": advise(stats, state), "costs": cost_ranges(stats, state, price)}
+
+def conclusion(signals):
+    """综合信号：只统计"买入"/"卖出"票数"""
+    buy = sum(1 for s in signals.values() if s['signal'] == '买入')
+    sell = sum(1 for s in signals.values() if s['signal'] == '卖出')
+    if buy >= 4: overall = "🟢 强烈看涨"
+    elif buy > sell: overall = "🟡 偏多"
+    elif sell > buy: overall = "🔴 偏空"
+    else: overall = "⚪ 中性"
+    return {"overall": overall, "buy": buy, "sell": sell}
+
+def analyze(df, info=None):
+    """单品种完整分析，返回可序列化的结果"""
+    signals, d = analyze_technical(df)
+    cp = float(d['Close'].iloc[-1])
+    pp = float(d['Close'].iloc[-2]) if len(d) > 1 else cp
+    chan = chan_analysis(d)
+    info = info or {}
+    return {
+        "price": cp, "change_pct": (cp - pp) / pp * 100 if pp else 0.0, "bars": len(d),
+        "date": str(d.index[-1]), "name": info.get('longName'),
+        "signals": signals,
+        "chan": {k: chan[k] for k in ("trend", "signal", "position", "chan_signal", "last_stroke")},
+        "wyckoff": wyckoff_analysis(d), "pattern": pattern_analysis(d),
+        "conclusion": conclusion(signals),
+    }
@@ -4,12 +4,14 @@
 """
 
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import numpy as np
 from datetime import datetime
-import plotly.graph_objects as go
-from fuzzywuzzy import fuzz
+import analysis
+from analysis import get_stock_code, analyze_technical, chan_analysis, wyckoff_analysis, pattern_analysis, conclusion
+from backtest import backtest_frame
+from chart_data import zoom, price_figure
+import instrument
+from instrument import stage
 
 # 页面配置
 st.set_page_config(
@@ -46,166 +48,53 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# 股票数据库
-STOCK_DATABASE = {
-    "MSFT": {"name": "Microsoft Corporation", "market": "US", "full_code": "MSFT"},
-    "AAPL": {"name": "Apple Inc", "market": "US", "full_code": "AAPL"},
-    "GOOGL": {"name": "Alphabet Inc", "market": "US", "full_code": "GOOGL"},
-    "AMZN": {"name": "Amazon.com Inc", "market": "US", "full_code": "AMZN"},
-    "META": {"name": "Meta Platforms Inc", "market": "US", "full_code": "META"},
-    "TSLA": {"name": "Tesla Inc", "market": "US", "full_code": "TSLA"},
-    "NVDA": {"name": "NVIDIA Corporation", "market": "US", "full_code": "NVDA"},
-    "600060": {"name": "海信视像", "market": "A", "full_code": "600060.SS"},
-    "600785": {"name": "新华百货", "market": "A", "full_code": "600785.SS"},
-    "603986": {"name": "兆易创新", "market": "A", "full_code": "603986.SS"},
-    "002050": {"name": "三花智控", "market": "A", "full_code": "002050.SZ"},
-    "688521": {"name": "芯原股份", "market": "A", "full_code": "688521.SS"},
-    "600519": {"name": "贵州茅台", "market": "A", "full_code": "600519.SS"},
-    "9988": {"name": "阿里巴巴-SW", "market": "HK", "full_code": "9988.HK"},
-    "0700": {"name": "腾讯控股", "market": "HK", "full_code": "0700.HK"},
-    "3690": {"name": "美团-W", "market": "HK", "full_code": "3690.HK"},
-}
+@st.cache_resource
+def get_symbol_index():
+    return analysis.get_symbol_index()
 
 def fuzzy_search(query, limit=5):
-    if not query: return []
-    query = query.upper().strip()
-    results = []
-    for code, info in STOCK_DATABASE.items():
-        name_score = fuzz.ratio(query.lower(), info["name"].lower())
-        code_score = fuzz.ratio(query, code)
-        max_score = max(name_score, code_score, fuzz.partial_ratio(query, code))
-        if max_score > 50:
-            results.append({"code": code, "name": info["name"], "market": info["market"], "full_code": info["full_code"], "score": max_score})
-    results.sort(key=lambda x: x["score"], reverse=True)
-    return results[:limit]
+    return get_symbol_index().search(query, limit)
 
-def get_stock_code(user_input):
-    user_input = user_input.strip().upper()
-    if user_input in STOCK_DATABASE: return STOCK_DATABASE[user_input]["full_code"]
-    results = fuzzy_search(user_input, 1)
-    if results: return results[0]["full_code"]
-    if user_input.isdigit() and len(user_input) == 6:
-        return f"{user_input}.SS" if user_input.startswith("6") else f"{user_input}.SZ"
-    if user_input.isdigit() and len(user_input) == 4:
-        return f"{user_input}.HK"
-    return None
+@st.cache_resource(ttl=300)
+def get_base(symbol):
+    # 每个代码只取一次全量日线+基本面；只有缓存未命中时才会执行到这里
+    m = instrument.current()
+    if m: m.cache_result("stock_data", False)
+    return analysis.get_base_data(symbol)
 
-@st.cache_data(ttl=300)
-def get_stock_data(symbol, period="1y"):
-    try:
-        import requests
-        # 尝试Yahoo Finance
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(period=period, timeout=10)
-        info = {}
-        try: 
-            info = ticker.info or {}
-        except: 
-            pass
-        
-        if df is None or len(df) == 0:
-            # 备用：尝试直接下载
-            url = f"https://query1.finance.yahoo.com/v7/finance/download/{symbol}?period1=0&period2=9999999999&interval=1d&events=history"
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            resp = requests.get(url, headers=headers, timeout=15)
-            if resp.status_code == 200:
-                from io import StringIO
-                df = pd.read_csv(StringIO(resp.text), parse_dates=['Date'], index_col='Date')
-        
-        return df, info
-    except Exception as e:
-        return None, {"error": str(e)}
-
-def calculate_indicators(df):
-    d = df.copy()
-    for m in [5, 10, 20, 60]: d[f'MA{m}'] = d['Close'].rolling(m).mean()
-    d['VWAP'] = (d['Close'] * d['Volume']).cumsum() / d['Volume'].cumsum()
-    e1, e2 = d['Close'].ewm(span=12).mean(), d['Close'].ewm(span=26).mean()
-    d['MACD'] = e1 - e2
-    d['MACD_Signal'] = d['MACD'].ewm(span=9).mean()
-    dl = d['Close'].diff()
-    g, l = dl.where(dl>0,0).rolling(14).mean(), (-dl.where(dl<0,0)).rolling(14).mean()
-    d['RSI'] = 100 - (100/(1+g/l))
-    low_min, high_max = d['Low'].rolling(9).min(), d['High'].rolling(9).max()
-    d['K'] = 100 * (d['Close'] - low_min) / (high_max - low_min)
-    d['D'] = d['K'].rolling(3).mean()
-    d['J'] = 3 * d['K'] - 2 * d['D']
-    d['BB_Mid'] = d['Close'].rolling(20).mean()
-    d['BB_Std'] = d['Close'].rolling(20).std()
-    d['BB_Up'], d['BB_Down'] = d['BB_Mid'] + 2*d['BB_Std'], d['BB_Mid'] - 2*d['BB_Std']
-    atr = d['High'].rolling(14).max() - d['Low'].rolling(14).min()
-    d['Supertrend'] = d['Close'] - 3 * atr
-    return d
-
-def analyze_technical(df):
-    """技术分析"""
-    d = calculate_indicators(df)
-    cp = d['Close'].iloc[-1]
-    ma5, ma10, ma20 = d['MA5'].iloc[-1], d['MA10'].iloc[-1], d['MA20'].iloc[-1]
-    rsi = d['RSI'].iloc[-1]
-    k, d_k = d['K'].iloc[-1], d['D'].iloc[-1]
-    macd, macd_sig = d['MACD'].iloc[-1], d['MACD_Signal'].iloc[-1]
-    st_val = d['Supertrend'].iloc[-1]
-    bb_up, bb_down = d['BB_Up'].iloc[-1], d['BB_Down'].iloc[-1]
-    
-    signals = {}
-    
-    # 均线
-    if ma5 > ma10 > ma20: sig, reason = "买入", "均线多头排列"
-    elif ma5 < ma10 < ma20: sig, reason = "卖出", "均线空头排列"
-    else: sig, reason = "观望", "均线纠缠"
-    signals['均线'] = {"signal": sig, "reason": reason}
-    
-    # MACD
-    sig = "买入" if macd > macd_sig else "卖出"
-    signals['MACD'] = {"signal": sig, "reason": "MACD金叉" if sig=="买入" else "死叉"}
-    
-    # RSI
-    if rsi < 30: sig, reason = "超卖买入", f"RSI={rsi:.1f}超卖"
-    elif rsi > 70: sig, reason = "超买卖出", f"RSI={rsi:.1f}超买"
-    else: sig, reason = "观望", f"RSI={rsi:.1f}中性"
-    signals['RSI'] = {"signal": sig, "reason": reason}
-    
-    # KDJ
-    sig = "买入" if k > d_k else "卖出"
-    signals['KDJ'] = {"signal": sig, "reason": "KDJ金叉" if sig=="买入" else "死叉"}
-    
-    # 布林带
-    if cp > bb_up: sig, reason = "超买", "突破布林上轨"
-    elif cp < bb_down: sig, reason = "超卖", "触及布林下轨"
-    else: sig, reason = "观望", "布林带内运行"
-    signals['布林带'] = {"signal": sig, "reason": reason}
-    
-    # Supertrend
-    sig = "买入" if cp > st_val else "卖出"
-    signals['Supertrend'] = {"signal": sig, "reason": "价格在Supertrend上方" if sig=="买入" else "下方"}
-    
-    return signals, d
+def get_stock_data(symbol, period="1y", interval="1d"):
+    """切换周期只在已缓存的全量序列上切片/聚合，不再请求网络"""
+    base, info = get_base(symbol)
+    if base is None or len(base) == 0: return base, info
+    # 基本面不阻塞K线，首次可能为空；后台取到后从本地记录补上
+    info = info or analysis.get_fundamentals().get(symbol, timeout=0)
+    return analysis.get_timeframes().derive(symbol, base, period, interval), info
 
 def render_header():
     st.markdown('<p class="main-title">📈 股票分析工具 Pro Max V3.1</p>', unsafe_allow_html=True)
     st.markdown('<p class="subtitle">完整技术分析框架 | 缠论 · 威科夫 · 形态 · 均线 · Supertrend · 动量指标</p>', unsafe_allow_html=True)
 
 def render_search():
-    col1, col2 = st.columns([3, 1])
+    col1, col2, col3 = st.columns([3, 1, 1])
     with col1: query = st.text_input("🔍 搜索股票", placeholder="输入代码/名称（MSFT、茅台、9988）", key="search")
-    with col2: period = st.selectbox("📅周期", ["1个月", "3个月", "6个月", "1年", "2年"], index=3)
+    with col2: period = st.selectbox("📅周期", ["1个月", "3个月", "6个月", "1年", "2年", "5年"], index=3)
+    with col3: interval = st.selectbox("🕯K线", ["日线", "周线", "月线"], index=0)
     if query:
         suggestions = fuzzy_search(query, 5)
         if suggestions:
             cols = st.columns(len(suggestions))
             for i, s in enumerate(suggestions):
                 with cols[i]: st.markdown(f"**{s['code']}**  \n{s['name'][:12]}")
-    return query, period
+    return query, period, interval
 
 def render_company_info(info, symbol):
     st.markdown("## 一、公司概况")
     if not info: st.warning("暂无信息"); return
-    st.markdown(f"**公司**: {info.get('longName', symbol)}")
-    st.markdown(f"**行业**: {info.get('sector', 'N/A')} | {info.get('industry', 'N/A')}")
-    st.markdown(f"**业务**: {info.get('businessSummary', '暂无')[:200]}...")
+    st.markdown(f"**公司**: {info.get('longName') or symbol}")
+    st.markdown(f"**行业**: {info.get('sector') or 'N/A'} | {info.get('industry') or 'N/A'}")
+    st.markdown(f"**业务**: {(info.get('businessSummary') or '暂无')[:200]}...")
 
-def render_fundamental(df, info):
+def render_fundamental(df, info, code=None):
     st.markdown("## 二、基本面分析")
     if not info: st.warning("暂无数据"); return
     
@@ -214,7 +103,6 @@ def render_fundamental(df, info):
     mc = info.get('marketCap')
     div = info.get('dividendYield')
     roe = info.get('returnOnEquity')
-    eps = info.get('epsTrailingTwelveMonths')
     
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("PE", f"{pe:.1f}" if pe else "N/A")
@@ -224,51 +112,55 @@ def render_fundamental(df, info):
     
     # 合理价格
     st.markdown("### 合理价格区间（3种方法）")
-    if pe and eps:
-        st.markdown(f"**PE法**: ${eps*20:.2f} - ${eps*30:.2f}")
-    if info.get('fiftyTwoWeekLow') and info.get('fiftyTwoWeekHigh'):
-        l, h = info.get('fiftyTwoWeekLow'), info.get('fiftyTwoWeekHigh')
-        st.markdown(f"**区间中值法**: ${(l+h)/2:.2f}")
+    v = analysis.valuation(code, df) or {}
+    ok = lambda k: v.get(k) is not None and v[k] == v[k]
+    if ok('pe_low'):
+        st.markdown(f"**PE法**（同行业PE分位）: ${v['pe_low']:.2f} - ${v['pe_high']:.2f}，中值 ${v['pe_mid']:.2f}")
+    if ok('dcf'):
+        st.markdown(f"**DCF**（折现率{v['discount_rate']*100:.1f}%，前5年增速{v['growth']*100:.0f}%）: ${v['dcf']:.2f}，空间 {v['dcf_upside']*100:+.0f}%")
+    if ok('pos_52w'):
+        st.markdown(f"**52周位置**: {v['pos_52w']*100:.0f}%")
     cp = df['Close'].iloc[-1]
-    st.markdown(f"**当前价格**: ${cp:.2f}")
-    st.markdown(f"**52周**: ${l} - ${h}")
+    st.markdown(f"**当前价格**: ${cp:.2f}" + (f" | 估值: **{v['valuation']}**" if v.get('valuation') else ""))
+    l, h = info.get('fiftyTwoWeekLow'), info.get('fiftyTwoWeekHigh')
+    if l and h: st.markdown(f"**52周**: ${l} - ${h}")
 
-def render_technical_analysis(df):
+def render_technical_analysis(df, code=None, hist=None, daily=True):
     st.markdown("## 三、技术面分析")
     
-    signals, d = analyze_technical(df)
+    with stage("calculate_indicators", rows=len(df)):
+        signals, d = analyze_technical(df)
     cp = d['Close'].iloc[-1]
     
     # K线图
-    fig = go.Figure(data=[go.Candlestick(x=d.index, open=d['Open'], high=d['High'], low=d['Low'], close=d['Close'])])
-    fig.add_trace(go.Scatter(x=d.index, y=d['MA20'], name='MA20', line=dict(color='yellow', width=1)))
-    fig.add_trace(go.Scatter(x=d.index, y=d['MA60'], name='MA60', line=dict(color='purple', width=1)))
-    fig.update_layout(template='plotly_dark', height=350, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-    st.plotly_chart(fig, use_container_width=True)
-    
-    # 缠论（简化版）
+    with stage("figure_build", rows=len(d)):
+        view = zoom(d, "tech_zoom")
+        fig = price_figure(view, [('MA20', 'yellow'), ('MA60', 'purple')])
+        fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+    with stage("figure_send", rows=sum(len(t.x) for t in fig.data)):
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # 缠论
     st.markdown("### 3.1 缠论分析")
-    ma20, ma60 = d['MA20'].iloc[-1], d['MA60'].iloc[-1] if len(d) >= 60 else ma20
-    if cp > ma20 > ma60: trend, sig = "上涨趋势", "买入"
-    elif cp < ma20 < ma60: trend, sig = "下跌趋势", "卖出"
-    else: trend, sig = "震荡整理", "观望"
-    st.markdown(f"走势类型: **{trend}** | 信号: {sig}")
+    chan = chan_analysis(d)
+    st.markdown(f"走势类型: **{chan['trend']}** | 信号: {chan['signal']}")
+    strokes, pivots = chan['strokes'], chan['pivots']
+    last = f"{'向上' if chan['last_stroke'] == 'up' else '向下'}笔" if strokes else "N/A"
+    st.markdown(f"笔: {len(strokes)} | 线段: {len(chan['segments'])} | 中枢: {len(pivots)} | 最后一笔: {last} | 位置: **{chan['position']}** | 信号: {chan['chan_signal']}")
+    if pivots: st.markdown(f"最近中枢: {pivots[-1]['zd']:.2f} - {pivots[-1]['zg']:.2f}")
     
     # 威科夫
     st.markdown("### 3.2 威科夫分析")
-    avg_vol = d['Volume'].mean()
-    recent_vol = d['Volume'].iloc[-5:].mean()
-    phase = "吸筹" if recent_vol < avg_vol else "派发" if recent_vol > avg_vol * 1.5 else "上涨"
-    sig = "买入" if phase == "吸筹" else "卖出" if phase == "派发" else "观望"
-    st.markdown(f"当前阶段: **{phase}** | 成交量: {'缩量' if recent_vol < avg_vol else '放量'} | 信号: {sig}")
+    w = wyckoff_analysis(d)
+    st.markdown(f"当前阶段: **{w['phase']}** | 成交量: {w['volume']} | 信号: {w['signal']}")
+    if w['poc'] is not None: st.markdown(f"POC: {w['poc']:.2f} | 价值区: {w['val']:.2f} - {w['vah']:.2f}")
+    if w['events']: st.markdown("近期事件: " + " · ".join(f"{e['event']}({e['date'][:10]})" for e in w['events'][-5:]))
     
     # 形态
     st.markdown("### 3.3 形态分析")
-    high, low = d['High'].max(), d['Low'].min()
-    if cp > high * 0.9: pat, sig = "突破形态", "买入"
-    elif cp < low * 1.1: pat, sig = "二次探底", "卖出"
-    else: pat, sig = "横盘整理", "观望"
-    st.markdown(f"形态: **{pat}** | 区间: {low:.2f}-{high:.2f} | 信号: {sig}")
+    p = pattern_analysis(d)
+    st.markdown(f"形态: **{p['pattern']}** | 区间: {p['low']:.2f}-{p['high']:.2f} | 信号: {p['signal']}")
+    if hist is not None and len(hist) > 100: render_similar(hist, code, daily)
     
     # 均线/VWAP
     st.markdown("### 3.4 均线/VWAP")
@@ -283,9 +175,12 @@ def render_technical_analysis(df):
     # Supertrend
     st.markdown("### 3.5 Supertrend")
     st_val = d['Supertrend'].iloc[-1]
-    c1, c2 = st.columns(2)
-    c1.metric("Supertrend", f"{st_val:.2f}")
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("Supertrend", f"{st_val:.2f}", "多头" if d['Supertrend_Dir'].iloc[-1] == 1 else "空头")
     c2.metric("当前价格", f"{cp:.2f}")
+    c3.metric("ATR(14)", f"{d['ATR'].iloc[-1]:.2f}")
+    c4.metric("抛物线SAR", f"{d['PSAR'].iloc[-1]:.2f}")
+    c5.metric("吊灯止损(多/空)", f"{d['Chandelier_Long'].iloc[-1]:.2f}/{d['Chandelier_Short'].iloc[-1]:.2f}")
     st.markdown(f"信号: **{signals['Supertrend']['signal']}** - {signals['Supertrend']['reason']}")
     
     # 动量
@@ -300,6 +195,22 @@ def render_technical_analysis(df):
     
     return signals
 
+def render_similar(hist, code, daily):
+    """最近m根K线在历史中的相似段及其后续收益；全库只索引本地日线"""
+    c1, c2 = st.columns(2)
+    m = c1.selectbox("相似形态窗口", [20, 30, 60], index=1, key="sim_m")
+    scope = c2.radio("查找范围", ["本品种", "本地全库"] if daily else ["本品种"], horizontal=True, key="sim_scope")
+    with stage("pattern_similarity", rows=len(hist)):
+        sim = analysis.similar_patterns(hist, code, m, 8, scope == "本地全库")
+    if not sim['matches']:
+        st.caption("没有找到足够的历史相似段")
+        return
+    fmt = lambda v: f"{v*100:+.1f}%" if v is not None else "-"
+    st.markdown("相似段后续: " + " | ".join(f"{h}根 均值{fmt(x['mean'])} 上涨{x['up']*100:.0f}%" for h, x in sim['summary'].items() if x['n']))
+    rows = [{"代码": x['symbol'], "起": (x['start_date'] or str(x['start']))[:10], "止": (x['end_date'] or str(x['end']))[:10],
+             "距离": round(x['distance'], 2), **{f"+{h}": fmt(r) for h, r in x['forward'].items()}} for x in sim['matches']]
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+
 def render_liquidity(df):
     st.markdown("## 四、流动性分析")
     d = df.tail(20)
@@ -313,62 +224,66 @@ def render_news():
     st.markdown("## 五、消息面")
     st.info("财经新闻模块开发中...")
 
-def render_backtest(signals):
+def render_backtest(signals, hist):
     st.markdown("## 六、回测汇总")
+    bt = backtest_frame(hist).set_index("indicator")
     data = []
-    for name, s in signals.items():
-        import random
-        acc = random.randint(55, 78)
-        data.append({"技术指标": name, "准确率": f"{acc}%", "信号": s['signal']})
+    for name, s in list(signals.items()) + [("综合", {"signal": "-"})]:
+        r = bt.loc[name]
+        data.append({"技术指标": name, "胜率": f"{r['hit_rate']*100:.0f}%" if r['trades'] else "N/A", "交易次数": int(r['trades']),
+                     "累计收益": f"{r['total_return']*100:+.1f}%", "最大回撤": f"{r['max_drawdown']*100:.1f}%", "信号": s['signal']})
     st.table(pd.DataFrame(data))
-    st.markdown(f"**综合准确率**: ~65%")
+    acc = bt.loc["综合", "hit_rate"]
+    st.markdown(f"**综合胜率**: {acc*100:.0f}%（{len(hist)}根K线，收盘调仓，单边费率0.05%）" if bt.loc["综合", "trades"] else "**综合胜率**: 历史不足")
 
-def render_conclusion(signals, info, current_price):
+def render_conclusion(signals, info, current_price, daily=None, code=None):
     st.markdown("## 七、综合结论")
     
-    buy = sum(1 for s in signals.values() if s['signal'] == '买入')
-    sell = sum(1 for s in signals.values() if s['signal'] == '卖出')
-    
-    if buy >= 4: overall = "🟢 强烈看涨"
-    elif buy > sell: overall = "🟡 偏多"
-    elif sell > buy: overall = "🔴 偏空"
-    else: overall = "⚪ 中性"
+    c = conclusion(signals)
+    buy, sell, overall = c['buy'], c['sell'], c['overall']
     
     st.markdown(f"### 🎯 综合信号: {overall}")
     st.markdown(f"买入: {buy}个 | 卖出: {sell}个")
+    if daily is None or len(daily) < 120: return
+    
+    scope = st.radio("历史统计范围", ["本品种", "本地全库"], horizontal=True, key="horizon_scope")
+    with stage("horizon_stats", rows=len(daily)):
+        h = analysis.horizon_advice(daily, code, scope == "本地全库")
+    state = {1: "买入", 0: "观望", -1: "卖出"}.get(h['state'], "未知")
+    st.caption(f"以下按历史上综合信号为「{state}」时的前瞻收益分布（{scope}日线，样本为逐日重叠窗口）")
     
     # 成本区间
     st.markdown("### 7.2 不同成本区间操作")
-    if info:
-        low52 = info.get('fiftyTwoWeekLow', current_price * 0.8)
-        ranges = [
-            (f"<${low52*0.9:.0f}", "持有", "严重低估"),
-            (f"${low52*0.9:.0f}-${low52:.0f}", "持有/加仓", "接近底部"),
-            (f"${low52:.0f}-${current_price*1.1:.0f}", "持有", "合理区间"),
-            (f">${current_price*1.1:.0f}", "减仓", "偏高"),
-        ]
-        for cost, action, reason in ranges:
-            st.markdown(f"- **{cost}**: {action} - {reason}")
+    for r in h['costs']:
+        st.markdown(f"- **{r['cost']}**: {r['action']} - {r['reason']}")
     
     # 8种风格
     st.markdown("### 7.4 操作建议（8种风格）")
     cols = st.columns(4)
-    styles = [("价值投资", "持有1年+", "低估"), ("短线1日", "观望", "波动不足"), 
-              ("短线3日", "观望", "待突破"), ("短线7日", "买入", "区间"),
-              ("短线1月", "买入", "反弹"), ("中线3月", "买入", "估值修复"),
-              ("中线6月", "买入", "增长"), ("长线1年", "持有", "龙头")]
+    v = analysis.valuation(code, daily) or {}
+    year = h['advice'][-1]
+    value_action = {"低估": "买入持有", "合理": "持有", "高估": "回避"}.get(v.get('valuation'), "观望")
+    value_reason = f"估值{v['valuation']}" if v.get('valuation') else "无估值数据"
+    if year.get('up') is not None: value_reason += f"，1年上涨{year['up']*100:.0f}%"
+    styles = [("价值投资", value_action, value_reason)] + [(a['style'], a['action'], a['reason']) for a in h['advice']]
     for i, (style, action, reason) in enumerate(styles):
         with cols[i % 4]: st.markdown(f"**{style}**: {action} ({reason})")
 
-def main():
-    render_header()
-    query, period = render_search()
-    
-    period_map = {"1个月": "1mo", "3个月": "3mo", "6个月": "6mo", "1年": "1y", "2年": "2y"}
-    code = get_stock_code(query) if query else "MSFT"
-    
-    with st.spinner('加载数据...'):
-        df, info = get_stock_data(code, period_map[period])
+def render_page():
+    with stage("render_search"):
+        render_header()
+        query, period, interval = render_search()
+    
+    period_map = {"1个月": "1mo", "3个月": "3mo", "6个月": "6mo", "1年": "1y", "2年": "2y", "5年": "5y"}
+    interval_map = {"日线": "1d", "周线": "1wk", "月线": "1mo"}
+    with stage("resolve_symbol"):
+        code = get_stock_code(query) if query else "MSFT"
+    
+    with st.spinner('加载数据...'), stage("fetch") as s:
+        df, info = get_stock_data(code, period_map[period], interval_map[interval])
+        s["rows"] = len(df) if df is not None else 0
+    m = instrument.current()
+    if "stock_data" not in m.cache: m.cache_result("stock_data", True)
     
     if df is None or len(df) == 0:
         st.error("❌ 无法获取数据")
@@ -390,16 +305,49 @@ def main():
     c3.metric("最低", f"${df['Low'].min():.2f}")
     c4.metric("成交量", f"{df['Volume'].iloc[-1]/1e6:.2f}M")
     
-    render_company_info(info, code)
-    render_fundamental(df, info)
-    signals = render_technical_analysis(df)
-    render_liquidity(df)
-    render_news()
-    render_backtest(signals)
-    render_conclusion(signals, info, current_price)
+    with stage("render_company_info"): render_company_info(info, code)
+    hist, _ = get_stock_data(code, "max", interval_map[interval])
+    with stage("render_fundamental"): render_fundamental(hist, info, code)
+    with stage("render_technical_analysis"): signals = render_technical_analysis(df, code, hist, interval == "日线")
+    with stage("render_liquidity"): render_liquidity(df)
+    with stage("render_news"): render_news()
+    with stage("render_backtest", rows=len(hist)): render_backtest(signals, hist)
+    daily = hist if interval == "日线" else get_stock_data(code, "max", "1d")[0]
+    with stage("render_conclusion"): render_conclusion(signals, info, current_price, daily, code)
     
     st.markdown("---")
     st.caption(f"⚠️ 免责声明: 本分析仅供参考 | 数据更新: {datetime.now().strftime('%Y-%m-%d')}")
 
+def render_debug(metrics):
+    with st.sidebar:
+        if not st.checkbox("🛠 调试面板", value=instrument.DEBUG, key="debug"): return
+        st.checkbox("慢请求采样分析", value=instrument.PROFILE, key="profile")
+        st.markdown(f"**本次总耗时**: {metrics.total_ms:.0f} ms")
+        st.table(pd.DataFrame([{"阶段": "　" * s["depth"] + s["stage"], "耗时(ms)": f"{s['ms']:.1f}",
+                                "行数": str(s["rows"] or "")} for s in metrics.stages]))
+        for name, (hit, miss) in instrument.REGISTRY.cache.items():
+            st.markdown(f"缓存 `{name}` 命中率: {hit / (hit + miss) * 100:.0f}% ({hit}/{hit + miss})")
+        sc = analysis.get_shared_cache().stats()
+        st.markdown(f"共享缓存: {sc['entries']} 项" + (f" / {sc['bytes'] / 2 ** 20:.1f} MB" if sc['bytes'] is not None else "")
+                    + f"，合并等待 {sc.get('coalesced', 0)} 次")
+        if metrics.profile:
+            with st.expander("慢请求热点（采样）"):
+                st.code("\n".join(f"{p * 100:5.1f}%  {k}" for k, p, _ in metrics.profile))
+        with st.expander("JSON"): st.json(metrics.summary())
+        with st.expander("Prometheus"): st.code(instrument.REGISTRY.prometheus())
+
+def main():
+    metrics = instrument.begin("main")
+    profiler = instrument.SamplingProfiler().start() if st.session_state.get("profile", instrument.PROFILE) else None
+    try:
+        render_page()
+    finally:
+        metrics.finish()
+        if profiler:
+            profiler.stop()
+            if metrics.total_ms >= instrument.SLOW_MS: metrics.profile = profiler.top()
+        instrument.log_request(metrics)
+    render_debug(metrics)
+
 if __name__ == "__main__":
     main()
@@ -3,11 +3,11 @@
 """
 
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import numpy as np
 from datetime import datetime
-import plotly.graph_objects as go
+from analysis import get_base_data, get_fundamentals, get_timeframes, calculate_indicators
+from chan import analyze_chan, chan_signal
+from chart_data import zoom, price_figure, line_figure
 
 st.set_page_config(page_title="股票分析工具", page_icon="📈", layout="wide")
 
@@ -23,22 +23,22 @@ with st.sidebar:
     
     timeframe_map = {"日线":"1d", "1周":"5d", "1月":"1mo", "3月":"3mo", "6月":"6mo", "1年":"1y", "2年":"2y", "5年":"5y"}
     period = timeframe_map[timeframe]
+    bar = st.selectbox("K线", ["日线", "周线", "月线"], index=0)
+    interval = {"日线": "1d", "周线": "1wk", "月线": "1mo"}[bar]
 
-@st.cache_data(ttl=300)
-def get_data(sym, per):
-    try:
-        t = yf.Ticker(sym)
-        df = t.history(period=per)
-        info = {}
-        try:
-            info = t.info or {}
-        except:
-            pass
-        return df, info
-    except:
-        return None, {}
-
-df, info = get_data(symbol, period)
+@st.cache_resource(ttl=300)
+def get_base(sym):
+    # 全量序列按代码缓存一次，切换周期只做切片/聚合
+    return get_base_data(sym)
+
+def get_data(sym, per, interval):
+    base, info = get_base(sym)
+    if base is None or len(base) == 0: return base, info
+    # 基本面不阻塞K线，首次可能为空；后台取到后从本地记录补上
+    info = info or get_fundamentals().get(sym, timeout=0)
+    return get_timeframes().derive(sym, base, per, interval), info
+
+df, info = get_data(symbol, period, interval)
 
 if df is None or len(df) == 0:
     st.error(f"❌ 无法获取 {symbol} 数据")
@@ -59,32 +59,19 @@ c4.metric("成交量", f"{float(df['Volume'].iloc[-1])/1e6:.1f}M")
 
 # K线
 st.subheader("📊 K线图")
-fig = go.Figure(data=[go.Candlestick(x=df.index, open=df['Open'], high=df['High'], low=df['Low'], close=df['Close'])])
-fig.update_layout(template='plotly_dark', height=400)
+fig = price_figure(zoom(df, "kline_zoom"), height=400)
 st.plotly_chart(fig, use_container_width=True)
 
 # 技术指标
 st.markdown("---")
 st.header("📈 技术分析")
 
-d = df.copy()
-d['MA5'] = d['Close'].rolling(5).mean()
-d['MA20'] = d['Close'].rolling(20).mean()
-
-e1 = d['Close'].ewm(span=12).mean()
-e2 = d['Close'].ewm(span=26).mean()
-d['MACD'] = e1 - e2
-d['Signal'] = d['MACD'].ewm(span=9).mean()
-
-dl = d['Close'].diff()
-g = dl.where(dl>0,0).rolling(14).mean()
-l = (-dl.where(dl<0,0)).rolling(14).mean()
-d['RSI'] = 100 - (100/(1+g/l))
+d = calculate_indicators(df)
 
 ma5 = float(d['MA5'].iloc[-1]) if pd.notna(d['MA5'].iloc[-1]) else 0
 ma20 = float(d['MA20'].iloc[-1]) if pd.notna(d['MA20'].iloc[-1]) else 0
 macd = float(d['MACD'].iloc[-1]) if pd.notna(d['MACD'].iloc[-1]) else 0
-sig = float(d['Signal'].iloc[-1]) if pd.notna(d['Signal'].iloc[-1]) else 0
+sig = float(d['MACD_Signal'].iloc[-1]) if pd.notna(d['MACD_Signal'].iloc[-1]) else 0
 rsi = float(d['RSI'].iloc[-1]) if pd.notna(d['RSI'].iloc[-1]) else 50
 
 # 信号
@@ -102,11 +89,7 @@ else: signals.append(("RSI", "正常", "🟡"))
 # 显示
 c1, c2 = st.columns([3,1])
 with c1:
-    f = go.Figure()
-    f.add_trace(go.Scatter(x=d.index, y=d['MA5'], name='MA5', line=dict(color='yellow')))
-    f.add_trace(go.Scatter(x=d.index, y=d['MA20'], name='MA20', line=dict(color='red')))
-    f.add_trace(go.Scatter(x=d.index, y=d['Close'], name='价格', line=dict(color='white')))
-    f.update_layout(template='plotly_dark', height=250)
+    f = line_figure(d, [('MA5', 'yellow', 'MA5'), ('MA20', 'red', 'MA20'), ('Close', 'white', '价格')])
     st.plotly_chart(f, use_container_width=True)
 with c2:
     st.markdown("### 信号")
@@ -117,17 +100,14 @@ with c2:
 st.markdown("---")
 st.header("🀄 缠论分析")
 
-fr = {'t':[], 'b':[]}
-for i in range(2, len(df)-2):
-    if df['High'].iloc[i-2] < df['High'].iloc[i-1] > df['High'].iloc[i] < df['High'].iloc[i+1] > df['High'].iloc[i+2]:
-        fr['t'].append(i)
-    if df['Low'].iloc[i-2] > df['Low'].iloc[i-1] < df['Low'].iloc[i] > df['Low'].iloc[i+1] < df['Low'].iloc[i+2]:
-        fr['b'].append(i)
-
-tc, bc = len(fr['t']), len(fr['b'])
+chan = analyze_chan(df)
+fr = chan.fractals
+tc, bc = sum(1 for f in fr if f['type'] == 'top'), sum(1 for f in fr if f['type'] == 'bottom')
 if bc > tc: st.success(f"🟢 底分型多({bc}>{tc}) - 关注买入")
 elif tc > bc: st.error(f"🔴 顶分型多({tc}>{bc}) - 注意风险")
 else: st.info("▬ 分型均衡")
+pos, chan_sig = chan_signal(chan, cp)
+st.write(f"笔: {len(chan.strokes)} | 线段: {len(chan.segments())} | 中枢: {len(chan.pivots())} | 位置: **{pos}** ({chan_sig})")
 
 # 基本面
 if info:
@@ -0,0 +1,150 @@
+"""
+向量化回测 - 按 analyze_technical 的信号规则逐根生成信号，整段历史一次算出进出场、收益、胜率、回撤
+参数扫描模式把网格点分发到进程池，每个进程一次回测全部品种
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from panel import _prefix, rolling_mean, rolling_std, ewm_mean, rsi, kdj
+from trail import supertrend
+
+# 默认参数与 calculate_indicators 一致
+DEFAULT_PARAMS = {
+    "ma_fast": 5, "ma_mid": 10, "ma_slow": 20,
+    "macd_fast": 12, "macd_slow": 26, "macd_signal": 9,
+    "rsi_n": 14, "rsi_low": 30, "rsi_high": 70,
+    "kdj_n": 9, "kdj_m": 3,
+    "bb_n": 20, "bb_k": 2.0,
+    "st_n": 14, "st_mult": 3.0,
+}
+SIGNAL_NAMES = ['均线', 'MACD', 'RSI', 'KDJ', '布林带', 'Supertrend', '综合']
+# render_conclusion 只统计信号文字恰为"买入"/"卖出"的指标，RSI和布林带的"超卖买入"/"超卖"等不计票
+VOTING = ['均线', 'MACD', 'KDJ', 'Supertrend']
+
+
+def compute_signals(close, high, low, **params):
+    """(N, T) 数组 -> {指标: (N, T) int8 信号}，1买入 -1卖出 0观望；逐根复现 analyze_technical 的判断"""
+    p = {**DEFAULT_PARAMS, **params}
+    close, high, low = (np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in (close, high, low))
+    sig = {}
+    prefix = _prefix(close)
+    f, m, s = (rolling_mean(close, p[k], prefix) for k in ("ma_fast", "ma_mid", "ma_slow"))
+    sig['均线'] = np.where((f > m) & (m > s), 1, np.where((f < m) & (m < s), -1, 0))
+
+    macd = ewm_mean(close, p["macd_fast"]) - ewm_mean(close, p["macd_slow"])
+    sig['MACD'] = np.where(macd > ewm_mean(macd, p["macd_signal"]), 1, -1)
+
+    r = rsi(close, p["rsi_n"])
+    sig['RSI'] = np.where(r < p["rsi_low"], 1, np.where(r > p["rsi_high"], -1, 0))
+
+    k, d, _ = kdj(close, high, low, p["kdj_n"], p["kdj_m"])
+    sig['KDJ'] = np.where(k > d, 1, -1)
+
+    mid, std = rolling_mean(close, p["bb_n"], prefix), rolling_std(close, p["bb_n"], prefix)
+    sig['布林带'] = np.where(close > mid + p["bb_k"] * std, -1, np.where(close < mid - p["bb_k"] * std, 1, 0))
+
+    _, direction = supertrend(high, low, close, p["st_n"], p["st_mult"])
+    sig['Supertrend'] = np.where(direction == 1, 1, -1)
+
+    buy = sum((sig[n] == 1).astype(np.int8) for n in VOTING)
+    sell = sum((sig[n] == -1).astype(np.int8) for n in VOTING)
+    sig['综合'] = np.sign(buy - sell)
+    return {n: v.astype(np.int8) for n, v in sig.items()}
+
+
+def run_backtest(close, signal, fee=0.0005, allow_short=False, warmup=60):
+    """
+    t日收盘按信号调仓，赚取t到t+1的收益；fee为单边费率。warmup 从每行首个有效收盘起算（面板中上市晚的品种同样跳过指标未稳定的前几根）
+    胜率与平均每笔收益计入开仓和平仓两次费用，期末未平仓的一笔按末根收盘平仓计。返回 {指标: (N,) 数组}：total_return, trades, hit_rate, avg_trade, max_drawdown, exposure
+    """
+    close = np.atleast_2d(np.asarray(close, dtype=np.float64))
+    pos = np.atleast_2d(signal).astype(np.float64)
+    if not allow_short: pos = np.maximum(pos, 0)
+    N, T = close.shape
+    valid = ~np.isnan(close)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), T)
+    pos[np.arange(T) < (first + warmup)[:, None]] = 0
+    pos[~valid] = 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ret = np.nan_to_num(close[:, 1:] / close[:, :-1] - 1, nan=0.0, posinf=0.0, neginf=0.0)
+    pos = pos[:, :-1]
+    turnover = np.abs(np.diff(pos, axis=1, prepend=0))
+    strat = pos * ret - fee * turnover
+
+    equity = np.cumprod(1 + strat, axis=1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1
+
+    # 每段连续同向持仓为一笔交易，用段编号分组求和；开仓费记在首根，平仓费记在末根（反手时两笔各担一次）
+    zero = np.zeros((N, 1))
+    prev = np.concatenate([zero, pos[:, :-1]], axis=1)
+    nxt = np.concatenate([pos[:, 1:], zero], axis=1)
+    in_trade = pos != 0
+    start = in_trade & (pos != prev)
+    end = in_trade & (pos != nxt)
+    size = np.abs(pos)
+    bar_log = np.log1p(pos * ret - fee * size * start) + np.log1p(-fee * size * end)
+    trade_id = np.cumsum(start.ravel()) - 1
+    mask = in_trade.ravel()
+    n_trades = int(start.sum())
+    trade_log = np.bincount(trade_id[mask], weights=bar_log.ravel()[mask], minlength=n_trades)
+    trade_row = np.nonzero(start)[0]
+    trades = np.bincount(trade_row, minlength=N)
+    wins = np.bincount(trade_row, weights=trade_log > 0, minlength=N)
+    sum_ret = np.bincount(trade_row, weights=np.expm1(trade_log), minlength=N)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "total_return": equity[:, -1] - 1 if T > 1 else np.zeros(N),
+            "trades": trades,
+            "hit_rate": np.where(trades > 0, wins / trades, np.nan),
+            "avg_trade": np.where(trades > 0, sum_ret / trades, np.nan),
+            "max_drawdown": drawdown.min(axis=1) if T > 1 else np.zeros(N),
+            "exposure": in_trade.mean(axis=1) if T > 1 else np.zeros(N),
+        }
+
+
+def backtest_frame(df, fee=0.0005, allow_short=False, **params):
+    """单品种回测，返回每个指标一行的 DataFrame"""
+    sig = compute_signals(df['Close'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy(), **params)
+    close = df['Close'].to_numpy()
+    rows = []
+    for name in SIGNAL_NAMES:
+        res = run_backtest(close, sig[name], fee=fee, allow_short=allow_short)
+        rows.append({"indicator": name, **{k: v[0] for k, v in res.items()}})
+    return pd.DataFrame(rows)
+
+
+_DATA = {}
+
+
+def _init_worker(close, high, low, fee, allow_short):
+    _DATA.update(close=close, high=high, low=low, fee=fee, allow_short=allow_short)
+
+
+def _run_point(params):
+    sig = compute_signals(_DATA["close"], _DATA["high"], _DATA["low"], **params)
+    out = {}
+    for name in SIGNAL_NAMES:
+        out[name] = run_backtest(_DATA["close"], sig[name], fee=_DATA["fee"], allow_short=_DATA["allow_short"])
+    return params, out
+
+
+def sweep(close, high, low, grid, symbols=None, processes=None, fee=0.0005, allow_short=False):
+    """
+    参数网格扫描：grid 为 {参数名: 候选值列表}，未给出的参数取默认值。
+    行情数组只在进程初始化时传一次，每个任务回测全部品种；返回每个(参数, 品种, 指标)一行。
+    """
+    close, high, low = (np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in (close, high, low))
+    symbols = symbols or list(range(close.shape[0]))
+    keys = list(grid)
+    points = [dict(zip(keys, vals)) for vals in itertools.product(*(grid[k] for k in keys))]
+    processes = processes or os.cpu_count() or 1
+    frames = []
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(close, high, low, fee, allow_short)) as ex:
+        chunk = max(1, len(points) // (processes * 4))
+        for params, out in ex.map(_run_point, points, chunksize=chunk):
+            for name, res in out.items():
+                frames.append(pd.DataFrame({**params, "symbol": symbols, "indicator": name, **res}))
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,186 @@
+"""
+本地K线存储 - 每个品种一组内存映射文件，首次拉全量历史，之后只补尾部
+目录结构: <root>/<symbol>/ts.<代>.i8 (UTC纳秒时间戳) + ohlcv.<代>.f8 (T×5) + meta.json
+每次写入生成新一代文件，写完再原子替换 meta.json 指向它；已映射旧文件的读取方仍持有旧inode，数据不会在其下变化
+"""
+
+import os
+import re
+import json
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+STORE_DIR = os.environ.get("STOCK_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".bar_store"))
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# yfinance 周期 -> 切片方式（整数为最近N根K线，DateOffset为日历区间）
+PERIOD_OFFSETS = {
+    "1d": 1, "5d": 5,
+    "1mo": pd.DateOffset(months=1), "3mo": pd.DateOffset(months=3), "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1), "2y": pd.DateOffset(years=2), "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+# 复权价格会在分红/拆股后整体改变，重叠K线偏差超过该比例时重拉全量
+ADJUST_TOLERANCE = 1e-4
+
+
+def period_start(ts, period, tz=None):
+    """UTC纳秒时间戳序列中该周期窗口的起始下标（"max"或未知周期为0）"""
+    if len(ts) == 0: return 0
+    off = PERIOD_OFFSETS.get(period)
+    if isinstance(off, int): return max(0, len(ts) - off)
+    if off is None and period != "ytd": return 0
+    last = pd.Timestamp(int(ts[-1]), tz="UTC").tz_convert(tz or "UTC")
+    begin = last.normalize().replace(month=1, day=1) if period == "ytd" else last - off
+    return int(np.searchsorted(ts, begin.tz_convert("UTC").value, side="left"))
+
+
+def yahoo_history(symbol, start=None):
+    """从Yahoo拉取日线，start为None时拉全量历史"""
+    import yfinance as yf
+    ticker = yf.Ticker(symbol)
+    if start is None:
+        df = ticker.history(period="max", timeout=10)
+    else:
+        df = ticker.history(start=start, timeout=10)
+    if df is None or len(df) == 0:
+        # 备用：直接下载CSV
+        import requests
+        from io import StringIO
+        period1 = 0 if start is None else int(pd.Timestamp(start).tz_localize(None).tz_localize("UTC").timestamp())
+        url = f"https://query1.finance.yahoo.com/v7/finance/download/{symbol}?period1={period1}&period2=9999999999&interval=1d&events=history"
+        resp = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=15)
+        if resp.status_code == 200:
+            df = pd.read_csv(StringIO(resp.text), parse_dates=['Date'], index_col='Date')
+    return df
+
+
+class BarStore:
+    """按品种落盘的OHLCV存储，读取为只读内存映射，周期请求返回零拷贝切片"""
+
+    def __init__(self, root=STORE_DIR, max_age=300):
+        self.root = root
+        self.max_age = max_age
+
+    def _dir(self, symbol):
+        return os.path.join(self.root, re.sub(r'[^A-Za-z0-9._^=-]', '_', symbol))
+
+    def _meta(self, symbol):
+        path = os.path.join(self._dir(symbol), "meta.json")
+        if not os.path.exists(path): return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_meta(self, symbol, meta):
+        path = os.path.join(self._dir(symbol), "meta.json")
+        tmp = path + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def symbols(self):
+        """已落盘的品种（目录名即代码）"""
+        if not os.path.isdir(self.root): return []
+        return sorted(d for d in os.listdir(self.root) if os.path.exists(os.path.join(self.root, d, "meta.json")))
+
+    def version(self, symbol):
+        """不读K线的轻量版本：(行数, 文件代数)，无数据时返回None"""
+        meta = self._meta(symbol)
+        if meta is None or meta.get("rows", 0) == 0: return None
+        return meta["rows"], meta.get("gen")
+
+    @staticmethod
+    def _files(gen):
+        """第 gen 代的 (时间戳文件, OHLCV文件)；gen 为None是早期不分代的文件名"""
+        return ("ts.i8", "ohlcv.f8") if gen is None else (f"ts.{gen}.i8", f"ohlcv.{gen}.f8")
+
+    def load(self, symbol):
+        """返回 (时间戳, OHLCV矩阵, meta)，无数据时返回None"""
+        for attempt in range(3):
+            meta = self._meta(symbol)
+            if meta is None or meta.get("rows", 0) == 0: return None
+            d, n = self._dir(symbol), meta["rows"]
+            ts_file, ohlcv_file = self._files(meta.get("gen"))
+            try:
+                ts = np.memmap(os.path.join(d, ts_file), dtype=np.int64, mode="r", shape=(n,))
+                values = np.memmap(os.path.join(d, ohlcv_file), dtype=np.float64, mode="r", shape=(n, len(COLUMNS)))
+                return ts, values, meta
+            except FileNotFoundError:
+                # 读 meta 与打开文件之间写入方换了一代并删掉了旧文件，重读 meta
+                if attempt == 2: raise
+
+    def write(self, symbol, df, keep=0):
+        """保留已存的前keep根K线，其后写入df（keep=0为整体重写）
+        不改动已有文件：保留部分与新数据一起写成新一代文件，再替换 meta，最后删掉旧代文件"""
+        d = self._dir(symbol)
+        os.makedirs(d, exist_ok=True)
+        idx = df.index if isinstance(df.index, pd.DatetimeIndex) else pd.DatetimeIndex(df.index)
+        tz = str(idx.tz) if idx.tz is not None else None
+        if idx.tz is None: idx = idx.tz_localize("UTC")
+        ts = idx.tz_convert("UTC").as_unit("ns").asi8
+        values = np.ascontiguousarray(df[COLUMNS].to_numpy(dtype=np.float64))
+        stored = self.load(symbol) if keep else None
+        old = self._meta(symbol) or {}
+        gen = (old.get("gen") or 0) + 1
+        tmp = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        for name, kept, arr in zip(self._files(gen), stored[:2] if stored else (None, None), (ts, values)):
+            path = os.path.join(d, name)
+            with open(path + tmp, "wb") as f:
+                if kept is not None: f.write(np.ascontiguousarray(kept[:keep]).tobytes())
+                f.write(arr.tobytes())
+            os.replace(path + tmp, path)
+        self._write_meta(symbol, {"tz": tz or old.get("tz"), "rows": keep + len(ts), "fetched_at": time.time(), "gen": gen})
+        self._drop_old(d, gen)
+
+    def _drop_old(self, d, gen):
+        """删掉早于 gen 的文件；仍被映射的旧文件在 POSIX 上删除后读取方照常可用，删不掉（如Windows下被映射）的留待下次"""
+        for name in os.listdir(d):
+            parts = name.split(".")
+            old = parts[0] in ("ts", "ohlcv") and (len(parts) == 2 or (len(parts) == 3 and parts[1].isdigit() and int(parts[1]) < gen))
+            if not old: continue
+            try: os.remove(os.path.join(d, name))
+            except OSError: pass
+
+    def refresh(self, symbol, fetch=yahoo_history):
+        """无数据时拉全量；已有数据时从最后一根K线所在日起补齐尾部（覆盖可能未收盘的最后一根）"""
+        stored = self.load(symbol)
+        if stored is None:
+            df = fetch(symbol)
+            if df is not None and len(df): self.write(symbol, df)
+            return
+        ts, values, meta = stored
+        last = pd.Timestamp(int(ts[-1]), tz="UTC").tz_convert(meta.get("tz") or "UTC")
+        df = fetch(symbol, start=last.strftime("%Y-%m-%d"))
+        if df is None or len(df) == 0:
+            # 重读 meta 再写，避免把期间其他写入方换上的新一代指回旧文件
+            meta = self._meta(symbol) or meta
+            meta["fetched_at"] = time.time()
+            self._write_meta(symbol, meta)
+            return
+        idx = df.index if df.index.tz is not None else df.index.tz_localize("UTC")
+        new_ts = idx.tz_convert("UTC").as_unit("ns").asi8
+        keep = int(np.searchsorted(ts, new_ts[0], side="left"))
+        # 重叠K线收盘价不一致，说明期间发生了分红/拆股复权，整体重拉
+        if keep < len(ts) and ts[keep] == new_ts[0]:
+            old_close, new_close = values[keep, 3], float(df['Close'].iloc[0])
+            if abs(new_close - old_close) > ADJUST_TOLERANCE * abs(old_close):
+                full = fetch(symbol)
+                if full is not None and len(full): self.write(symbol, full)
+                return
+        self.write(symbol, df, keep=keep)
+
+    def get(self, symbol, period="1y", fetch=yahoo_history):
+        """按周期返回K线，数据过期时先增量刷新；fetch=None 时只读本地"""
+        meta = self._meta(symbol)
+        if fetch is not None and (meta is None or time.time() - meta.get("fetched_at", 0) > self.max_age):
+            self.refresh(symbol, fetch)
+        stored = self.load(symbol)
+        if stored is None: return None
+        ts, values, meta = stored
+        start = period_start(ts, period, meta.get("tz"))
+        idx = pd.DatetimeIndex(pd.to_datetime(ts[start:], utc=True)).tz_convert(meta.get("tz") or "UTC")
+        if meta.get("tz") is None: idx = idx.tz_localize(None)
+        return pd.DataFrame(values[start:], index=idx, columns=COLUMNS, copy=False)
@@ -0,0 +1,292 @@
+"""
+性能基准 - 完全离线，使用固定种子的合成K线，测量各热点路径的耗时、峰值内存与净存活内存块数
+用法: python bench.py                                   # 默认 1k,100k
+      python bench.py --sizes 1k,100k,10m --save bench_baseline.json
+      python bench.py --compare bench_baseline.json --threshold 1.25
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+
+def synthetic_ohlcv(n, seed=0, start="2000-01-03"):
+    """几何随机游走的分钟K线，OHLC关系自洽"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.concatenate([[100.0], close[:-1]]) * np.exp(rng.normal(0, 0.0005, n))
+    spread = np.abs(rng.normal(0, 0.002, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(1_000, 100_000, n).astype(np.float64)
+    idx = pd.date_range(start, periods=n, freq="min")
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=idx)
+
+
+def synthetic_panel(n_symbols, n_bars, seed=0, ragged=True):
+    """多品种面板 (N, T)，ragged 时部分品种行首为NaN（上市较晚）"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_symbols, n_bars)), axis=1))
+    high = close * (1 + np.abs(rng.normal(0, 0.01, close.shape)))
+    low = close * (1 - np.abs(rng.normal(0, 0.01, close.shape)))
+    volume = rng.integers(1_000, 100_000, close.shape).astype(np.float64)
+    if ragged:
+        starts = rng.integers(0, n_bars // 2, n_symbols) * (rng.random(n_symbols) < 0.3)
+        mask = np.arange(n_bars)[None, :] < starts[:, None]
+        for a in (close, high, low, volume): a[mask] = np.nan
+    return {"Close": close, "High": high, "Low": low, "Volume": volume}
+
+
+def synthetic_universe(n, seed=0):
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    hanzi = np.array(list("海信视像新华百货兆易创新三花智控芯原股份贵州茅台阿里巴腾讯美团中国平安银行招商科技电子"))
+    universe = {}
+    for i in range(n):
+        if i % 2:
+            code = f"{i:06d}"
+            universe[code] = {"name": "".join(rng.choice(hanzi, 4)), "market": "A", "full_code": f"{code}.SS",
+                              "pinyin": "".join(rng.choice(letters, 10)).lower(), "initials": "".join(rng.choice(letters, 4)).lower()}
+        else:
+            code = "".join(rng.choice(letters, rng.integers(2, 6)))
+            universe[code] = {"name": f"{code} Holdings Inc", "market": "US", "full_code": code}
+    return universe
+
+
+# ---- 基准用例：setup(n) 在计时外准备参数，返回传给 fn 的参数元组 ----
+
+def _indicators(df):
+    from analysis import calculate_indicators
+    return calculate_indicators(df)
+
+
+def _indicators_pandas(df):
+    from analysis import calculate_indicators
+    return calculate_indicators(df, backend="pandas")
+
+
+def _indicators_f32(df):
+    from analysis import calculate_indicators
+    return calculate_indicators(df, dtype=np.float32)
+
+
+def _analyze(df):
+    from analysis import analyze_technical
+    return analyze_technical(df)
+
+
+def _chan(df):
+    from chan import analyze_chan
+    e = analyze_chan(df)
+    return e.segments(), e.pivots()
+
+
+def _wyckoff(df):
+    from wyckoff import analyze_wyckoff
+    e = analyze_wyckoff(df)
+    return e.profile.value_area(), e.events
+
+
+def _streaming(df):
+    from streaming import StreamingIndicators
+    return StreamingIndicators.from_frame(df)
+
+
+def _signals(df):
+    from backtest import compute_signals, run_backtest
+    sig = compute_signals(df['Close'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy())
+    return run_backtest(df['Close'].to_numpy(), sig['综合'])
+
+
+def _panel(p):
+    from panel import calculate_indicators_panel
+    return calculate_indicators_panel(p["Close"], p["High"], p["Low"], p["Volume"])
+
+
+def _similarity_setup(n):
+    """n根K线拆成每段2500根的多个品种建索引（建索引不计时），查询取某段中间60根"""
+    from similarity import PatternIndex
+    close = synthetic_ohlcv(n)['Close'].to_numpy()
+    index = PatternIndex()
+    for i in range(0, n, 2500): index.add(f"S{i}", close[i:i + 2500])
+    return index.build(), close[n // 2:n // 2 + 60]
+
+
+def _similarity(index, query):
+    return index.search(query, 10)
+
+
+def _watchlist_setup(n):
+    from watchlist import Watchlist
+    close = synthetic_panel(max(2, n // 500), 500)["Close"]
+    return Watchlist(pd.DataFrame(close.T, index=pd.bdate_range("2020-01-01", periods=500))), close[:, -1] * 1.01
+
+
+def _watchlist(wl, last):
+    """推入一个新交易日并取相关矩阵（增量路径）"""
+    wl.cov.push(np.log(last / wl.closes.iloc[-1].to_numpy()))
+    return wl.correlation(), wl.relative_strength()
+
+
+def _valuation_setup(n):
+    """n 个代码的合成基本面记录表（10个行业）"""
+    from fundamentals import NUMERIC, TEXT
+    rng = np.random.default_rng(0)
+    n = max(10, min(n, 100_000))
+    df = pd.DataFrame({k: rng.lognormal(2, 1, n) for k in NUMERIC}, index=[f"S{i}" for i in range(n)])
+    df["earningsGrowth"], df["beta"] = rng.normal(0.08, 0.1, n), rng.uniform(0.5, 1.8, n)
+    for k in TEXT: df[k] = ""
+    df["sector"] = [f"行业{i % 10}" for i in range(n)]
+    return (df,)
+
+
+def _valuation(df):
+    from fundamentals import valuate
+    return valuate(df)
+
+
+def _forward(df):
+    from forward import samples, summarize
+    return summarize(samples(df['Close'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy()))
+
+
+def _ticks_setup(n):
+    """n 笔逐笔，2000个代码，按0.25秒数据时间分批"""
+    from ticks import SyntheticTicks
+    src = SyntheticTicks(2000, rate=20_000, seconds=max(0.25, n / 20_000))
+    return src.symbols, [b for b in src][:max(1, -(-n // 5000))]
+
+
+def _ticks(symbols, batches):
+    """每次从空缓冲开始，避免重复运行时全部成为迟到数据"""
+    from ticks import TickIngest
+    ingest = TickIngest(symbols, capacity=60)
+    for b in batches: ingest.ingest(*b)
+    return ingest.counts
+
+
+def _trail(p):
+    """路径依赖指标（ATR/Supertrend/SAR/吊灯止损）；未装 numba 时走跨品种向量化实现，品种少时切重叠窗口"""
+    from trail import trail_indicators
+    return trail_indicators(p["High"], p["Low"], p["Close"])
+
+
+QUERIES = ["MSFT", "AB", "茅台", "600", "holdings", "gzmt", "XYZ", "00012", "科技", "A"]
+
+
+def _search(index):
+    return [index.search(q, 5) for q in QUERIES]
+
+
+def _search_setup(n):
+    from symbol_search import SymbolIndex
+    return (SymbolIndex(synthetic_universe(min(n, 100_000))),)
+
+
+CASES = {
+    # 名称: (准备函数, 被测函数, 最大行数)
+    "calculate_indicators": (lambda n: (synthetic_ohlcv(n),), _indicators, None),
+    "indicators_pandas": (lambda n: (synthetic_ohlcv(n),), _indicators_pandas, None),
+    "indicators_float32": (lambda n: (synthetic_ohlcv(n),), _indicators_f32, None),
+    "analyze_technical": (lambda n: (synthetic_ohlcv(n),), _analyze, None),
+    "chan_engine": (lambda n: (synthetic_ohlcv(n),), _chan, 1_000_000),
+    "wyckoff_engine": (lambda n: (synthetic_ohlcv(n),), _wyckoff, None),
+    "streaming_replay": (lambda n: (synthetic_ohlcv(n),), _streaming, 100_000),
+    "signals_backtest": (lambda n: (synthetic_ohlcv(n),), _signals, None),
+    "panel_indicators": (lambda n: (synthetic_panel(max(1, n // 1250), 1250),), _panel, None),
+    "trail_kernels": (lambda n: (synthetic_panel(max(1, n // 1250), 1250),), _trail, None),
+    "symbol_search": (_search_setup, _search, None),
+    "similarity_search": (_similarity_setup, _similarity, None),
+    "watchlist_matrix": (_watchlist_setup, _watchlist, None),
+    "valuation_batch": (_valuation_setup, _valuation, None),
+    "forward_stats": (lambda n: (synthetic_ohlcv(n),), _forward, 1_000_000),
+    "tick_ingest": (_ticks_setup, _ticks, 10_000_000),
+}
+
+
+def measure(fn, args, min_time=0.2, max_repeat=50):
+    """耗时取多次运行的最小值；内存在单独一次 tracemalloc 运行中测量
+    net_blocks 为调用前后存活内存块数之差（含返回结果），不是调用期间的分配次数"""
+    gc.collect()
+    t0 = time.perf_counter()
+    fn(*args)
+    first = time.perf_counter() - t0
+    best = first
+    for _ in range(min(max_repeat, int(min_time / max(first, 1e-9)))):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn(*args)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    net_blocks = sum(s.count_diff for s in after.compare_to(before, "filename"))
+    del result
+    return {"time_s": best, "peak_mb": peak / 2 ** 20, "net_blocks": net_blocks}
+
+
+def parse_size(s):
+    s = s.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1], 1)
+    return int(float(s[:-1] if s[-1] in "km" else s) * mult)
+
+
+def run(sizes, cases=None, verbose=True):
+    results = {}
+    for name, (setup, fn, max_rows) in CASES.items():
+        if cases and name not in cases: continue
+        for label in sizes:
+            n = parse_size(label)
+            key = f"{name}@{label}"
+            if max_rows and n > max_rows:
+                if verbose: print(f"{key:<32} 跳过（超过 {max_rows} 行上限）")
+                continue
+            r = measure(fn, setup(n))
+            results[key] = r
+            if verbose: print(f"{key:<32} {r['time_s'] * 1000:>10.2f} ms {r['peak_mb']:>10.1f} MB {r['net_blocks']:>10d} net blocks")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """耗时或峰值内存超过基线 threshold 倍记为退化"""
+    regressions = []
+    for key, r in results.items():
+        b = baseline.get(key)
+        if not b: continue
+        for metric in ("time_s", "peak_mb"):
+            if b[metric] > 0 and r[metric] / b[metric] > threshold:
+                regressions.append((key, metric, b[metric], r[metric]))
+    for key, metric, old, new in regressions:
+        print(f"退化 {key} {metric}: {old:.4g} -> {new:.4g} ({new / old:.2f}x)")
+    if not regressions: print(f"无退化（阈值 {threshold}x）")
+    return regressions
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="热点路径性能基准")
+    p.add_argument("--sizes", default="1k,100k", help="K线行数，逗号分隔，如 1k,100k,10m")
+    p.add_argument("--cases", help="只运行指定用例，逗号分隔")
+    p.add_argument("--save", help="结果写入JSON作为基线")
+    p.add_argument("--compare", help="与基线JSON比较")
+    p.add_argument("--threshold", type=float, default=1.25)
+    args = p.parse_args(argv)
+
+    results = run(args.sizes.split(","), args.cases.split(",") if args.cases else None)
+    if args.save:
+        with open(args.save, "w") as f: json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f: baseline = json.load(f)
+        return 1 if compare(results, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+缠论结构引擎 - 包含处理、分型、笔、线段、中枢
+K线包含关系与路径相关，逐根合并（每根O(1)）；分型在合并后的数组上向量化识别；
+笔、线段、中枢在分型/笔端点序列上构建，规模远小于K线数。支持追加K线后增量更新。
+"""
+
+import numpy as np
+
+TOP, BOTTOM = 1, -1
+MIN_STROKE_GAP = 4  # 笔的两个分型之间（合并后）至少相隔4根，即中间至少一根独立K线
+
+
+class ChanEngine:
+    """缠论结构，extend() 追加K线，fractals/strokes/segments()/pivots() 读取结果（下标为原始K线位置）"""
+
+    def __init__(self):
+        self.n = 0
+        # 合并后的K线：高、低，以及高点/低点来自的原始K线位置
+        self.mh, self.ml, self.hi_idx, self.lo_idx = [], [], [], []
+        self._scanned = 1
+        self._fractals = []  # (合并位置, 类型, 价格, 原始位置)
+        self.points = []     # 笔端点，相邻类型交替
+
+    def extend(self, high, low):
+        mh, ml, hi, lo = self.mh, self.ml, self.hi_idx, self.lo_idx
+        for h, l in zip(np.asarray(high, dtype=float).tolist(), np.asarray(low, dtype=float).tolist()):
+            i = self.n
+            self.n += 1
+            if h != h or l != l: continue
+            if mh:
+                H, L = mh[-1], ml[-1]
+                if (h <= H and l >= L) or (h >= H and l <= L):
+                    # 包含关系：向上取高高，向下取低低
+                    if len(mh) < 2 or H > mh[-2]:
+                        if h > H: mh[-1], hi[-1] = h, i
+                        if l > L: ml[-1], lo[-1] = l, i
+                    else:
+                        if h < H: mh[-1], hi[-1] = h, i
+                        if l < L: ml[-1], lo[-1] = l, i
+                    continue
+            mh.append(h); ml.append(l); hi.append(i); lo.append(i)
+        self._scan()
+        return self
+
+    def _scan(self):
+        # 合并位置j的分型在j+1出现后不再变化（j+1只会沿远离j的方向合并）
+        end = len(self.mh) - 1
+        j0 = max(self._scanned, 1)
+        if end <= j0: return
+        H = np.asarray(self.mh[j0 - 1:end + 1])
+        L = np.asarray(self.ml[j0 - 1:end + 1])
+        top = (H[1:-1] > H[:-2]) & (H[1:-1] > H[2:])
+        bottom = (L[1:-1] < L[:-2]) & (L[1:-1] < L[2:])
+        for k in np.flatnonzero(top | bottom).tolist():
+            j = j0 + k
+            f = (j, TOP, self.mh[j], self.hi_idx[j]) if top[k] else (j, BOTTOM, self.ml[j], self.lo_idx[j])
+            self._fractals.append(f)
+            self._feed(f)
+        self._scanned = end
+
+    def _feed(self, f):
+        """笔的状态机：同类分型保留更极端者，异类分型间隔足够且高低关系成立时成笔"""
+        pts = self.points
+        if not pts: pts.append(f); return
+        last = pts[-1]
+        if f[1] == last[1]:
+            if (f[2] > last[2]) if f[1] == TOP else (f[2] < last[2]): pts[-1] = f
+        elif f[0] - last[0] >= MIN_STROKE_GAP and ((f[2] > last[2]) if f[1] == TOP else (f[2] < last[2])):
+            pts.append(f)
+
+    @property
+    def fractals(self):
+        return [{"index": f[3], "type": "top" if f[1] == TOP else "bottom", "price": f[2]} for f in self._fractals]
+
+    @property
+    def strokes(self):
+        """笔列表，最后一笔在出现反向分型前仍可能延伸"""
+        p = self.points
+        return [{"start": a[3], "end": b[3], "direction": "up" if b[1] == TOP else "down",
+                 "high": max(a[2], b[2]), "low": min(a[2], b[2])} for a, b in zip(p[:-1], p[1:])]
+
+    def segments(self):
+        """线段：至少三笔，以特征序列（反向笔，先做包含处理）出现分型为结束（不处理缺口情形）"""
+        pts, segs, s = self.points, [], 0
+        while s + 3 < len(pts):
+            up = pts[s][1] == BOTTOM
+            feats, end = [], None
+            for k in range(s + 1, len(pts) - 1, 2):
+                a, b = pts[k][2], pts[k + 1][2]
+                fh, fl = max(a, b), min(a, b)
+                if feats:
+                    H, L, kk = feats[-1]
+                    if (fh <= H and fl >= L) or (fh >= H and fl <= L):
+                        if up: feats[-1] = (max(H, fh), max(L, fl), kk if H >= fh else k)
+                        else: feats[-1] = (min(H, fh), min(L, fl), kk if L <= fl else k)
+                        continue
+                feats.append((fh, fl, k))
+                if len(feats) >= 3:
+                    (h1, l1, _), (h2, l2, k2), (h3, l3, _) = feats[-3:]
+                    if (up and h2 > h1 and h2 > h3) or (not up and l2 < l1 and l2 < l3):
+                        end = k2
+                        break
+            if end is None: break
+            prices = [p[2] for p in pts[s:end + 1]]
+            segs.append({"start": pts[s][3], "end": pts[end][3], "direction": "up" if up else "down",
+                         "high": max(prices), "low": min(prices)})
+            s = end
+        return segs
+
+    def pivots(self):
+        """笔中枢：连续三笔的重叠区间[ZD, ZG]，后续笔与之重叠则延伸"""
+        pts = self.points
+        if len(pts) < 4: return []
+        p = np.array([x[2] for x in pts])
+        hi, lo = np.maximum(p[:-1], p[1:]), np.minimum(p[:-1], p[1:])
+        zg = np.minimum(np.minimum(hi[:-2], hi[1:-1]), hi[2:])
+        zd = np.maximum(np.maximum(lo[:-2], lo[1:-1]), lo[2:])
+        starts = np.flatnonzero(zg > zd)
+        res, i, n = [], 0, len(hi)
+        while True:
+            k = np.searchsorted(starts, i)
+            if k == len(starts): break
+            i = int(starts[k])
+            g, d, e = zg[i], zd[i], i + 2
+            while e + 1 < n and hi[e + 1] >= d and lo[e + 1] <= g: e += 1
+            res.append({"start": pts[i][3], "end": pts[e + 1][3], "zg": float(g), "zd": float(d),
+                        "gg": float(hi[i:e + 1].max()), "dd": float(lo[i:e + 1].min()), "strokes": e - i + 1})
+            i = e + 1
+        return res
+
+
+def analyze_chan(df):
+    return ChanEngine().extend(df['High'].to_numpy(), df['Low'].to_numpy())
+
+
+def chan_signal(engine, price):
+    """根据最后一笔方向与最近中枢位置给出走势判断"""
+    strokes, pivots = engine.strokes, engine.pivots()
+    if not pivots:
+        if not strokes: return "结构不足", "观望"
+        return ("向上笔", "买入") if strokes[-1]["direction"] == "up" else ("向下笔", "卖出")
+    p = pivots[-1]
+    if price > p["zg"]: return "中枢上方", "买入"
+    if price < p["zd"]: return "中枢下方", "卖出"
+    return "中枢震荡", "观望"
@@ -0,0 +1,100 @@
+"""
+图表数据管线 - 按像素宽度把K线聚合为OHLC桶，均线用LTTB降采样，折线走WebGL
+无论历史多长，每条曲线发送到浏览器的点数不超过 max_points；缩放时只对所选区间重新取样
+"""
+
+import numpy as np
+import pandas as pd
+
+MAX_POINTS = 800  # 约等于图表的像素宽度
+
+
+def ohlc_buckets(df, max_points=MAX_POINTS):
+    """连续K线按桶聚合：开=首根开，高=最高，低=最低，收=末根收，量=求和"""
+    n = len(df)
+    if n <= max_points: return df
+    k = -(-n // max_points)
+    starts = np.arange(0, n, k)
+    ends = np.minimum(starts + k, n) - 1
+    out = {
+        "Open": df['Open'].to_numpy()[starts],
+        "High": np.maximum.reduceat(df['High'].to_numpy(), starts),
+        "Low": np.minimum.reduceat(df['Low'].to_numpy(), starts),
+        "Close": df['Close'].to_numpy()[ends],
+    }
+    if 'Volume' in df: out["Volume"] = np.add.reduceat(df['Volume'].to_numpy(), starts)
+    return pd.DataFrame(out, index=df.index[starts])
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets，返回保留点的下标"""
+    n = len(x)
+    if n_out >= n or n_out < 3: return np.arange(n)
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (n_out - 2)
+    edges = (np.arange(n_out - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1], a = 0, n - 1, 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        # 以上一保留点和下一桶均值为底，取本桶中三角形面积最大的点
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def downsample_line(s, max_points=MAX_POINTS):
+    """序列去掉NaN后按位置做LTTB，返回 (x, y)"""
+    valid = s.notna().to_numpy()
+    pos = np.flatnonzero(valid)
+    y = s.to_numpy()[valid]
+    keep = lttb(pos, y, max_points)
+    return s.index[pos[keep]], y[keep]
+
+
+def slice_range(df, start=None, end=None):
+    """按（不带时区的）起止时间切片，用于缩放后的细节重取"""
+    if start is None and end is None: return df
+    idx = df.index.tz_localize(None) if getattr(df.index, "tz", None) is not None else df.index
+    lo = idx.searchsorted(pd.Timestamp(start)) if start is not None else 0
+    hi = idx.searchsorted(pd.Timestamp(end), side="right") if end is not None else len(df)
+    return df.iloc[lo:hi]
+
+
+def zoom(d, key, max_points=MAX_POINTS):
+    """超过 max_points 时在图下方放日期区间滑块，返回所选区间的原始数据（重新取样后细节更多）"""
+    if len(d) <= max_points: return d
+    import streamlit as st
+    naive = d.index.tz_localize(None) if getattr(d.index, "tz", None) is not None else d.index
+    lo, hi = naive[0].to_pydatetime(), naive[-1].to_pydatetime()
+    start, end = st.slider("缩放区间", min_value=lo, max_value=hi, value=(lo, hi), format="YYYY-MM-DD", key=key)
+    return slice_range(d, start, end)
+
+
+def price_figure(d, overlays=(), max_points=MAX_POINTS, height=350):
+    """K线（OHLC桶）+ 叠加线（LTTB + Scattergl）；overlays 为 [(列名, 颜色)]"""
+    import plotly.graph_objects as go
+    b = ohlc_buckets(d, max_points)
+    fig = go.Figure(data=[go.Candlestick(x=b.index, open=b['Open'], high=b['High'], low=b['Low'], close=b['Close'], name='K线')])
+    for col, color in overlays:
+        if col not in d or d[col].notna().sum() == 0: continue
+        x, y = downsample_line(d[col], max_points)
+        fig.add_trace(go.Scattergl(x=x, y=y, name=col, mode='lines', line=dict(color=color, width=1)))
+    fig.update_layout(template='plotly_dark', height=height, xaxis_rangeslider_visible=False)
+    return fig
+
+
+def line_figure(d, lines, max_points=MAX_POINTS, height=250):
+    """多条折线，lines 为 [(列名, 颜色, 图例名)]"""
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    for col, color, name in lines:
+        if d[col].notna().sum() == 0: continue
+        x, y = downsample_line(d[col], max_points)
+        fig.add_trace(go.Scattergl(x=x, y=y, name=name, mode='lines', line=dict(color=color)))
+    fig.update_layout(template='plotly_dark', height=height)
+    return fig
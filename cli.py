@@ -0,0 +1,74 @@
+"""
+批量分析命令行 - 不启动 Web 界面，直接对一批代码跑完整分析
+用法: python cli.py MSFT 茅台 9988 --period 1y -o result.json
+      python cli.py -f symbols.txt --format parquet -o result.parquet
+"""
+
+import argparse
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+def analyze_symbols(symbols, period="1y", with_info=False, workers=8, interval="1d"):
+    """并发分析多个代码，单个失败不影响其他"""
+    import analysis
+
+    def one(query):
+        code = analysis.get_stock_code(query) or query.strip().upper()
+        df, info = analysis.get_stock_data(code, period, with_info=with_info, interval=interval)
+        if df is None or len(df) == 0:
+            return {"query": query, "symbol": code, "error": info.get("error", "无数据")}
+        try:
+            return {"query": query, "symbol": code, **analysis.analyze(df, info)}
+        except Exception as e:
+            return {"query": query, "symbol": code, "error": str(e)}
+
+    with ThreadPoolExecutor(workers) as ex:
+        return list(ex.map(one, symbols))
+
+
+def flatten(r):
+    """嵌套结果展开为一行，用于列式输出"""
+    row = {k: r.get(k) for k in ("query", "symbol", "name", "price", "change_pct", "bars", "date", "error")}
+    for name, s in (r.get("signals") or {}).items(): row[f"{name}_signal"] = s["signal"]
+    for group, keys in (("chan", ("trend", "position", "chan_signal")), ("wyckoff", ("phase", "signal", "last_event")),
+                        ("pattern", ("pattern", "signal")), ("conclusion", ("overall", "buy", "sell"))):
+        for k in keys: row[f"{group}_{k}"] = (r.get(group) or {}).get(k)
+    return row
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="批量股票分析")
+    p.add_argument("symbols", nargs="*", help="代码或名称")
+    p.add_argument("-f", "--file", help="代码列表文件，每行一个")
+    p.add_argument("--period", default="1y", help="1mo/3mo/6mo/1y/2y/5y/max")
+    p.add_argument("--interval", default="1d", help="K线周期 1d/1wk/1mo")
+    p.add_argument("--format", choices=["json", "parquet"], default="json")
+    p.add_argument("-o", "--output", help="输出文件，json 缺省时写到标准输出")
+    p.add_argument("--info", action="store_true", help="同时获取基本面信息（较慢）")
+    p.add_argument("-j", "--workers", type=int, default=8)
+    args = p.parse_args(argv)
+
+    symbols = list(args.symbols)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            symbols += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not symbols: p.error("请提供代码或 --file")
+    if args.format == "parquet" and not args.output: p.error("parquet 输出需要 -o")
+
+    results = analyze_symbols(symbols, args.period, args.info, args.workers, args.interval)
+    if args.format == "parquet":
+        import pandas as pd
+        pd.DataFrame([flatten(r) for r in results]).to_parquet(args.output, index=False)
+    else:
+        text = json.dumps(results, ensure_ascii=False, indent=2, default=str)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f: f.write(text)
+        else:
+            sys.stdout.write(text + "\n")
+    return 0 if all("error" not in r for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
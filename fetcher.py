@@ -0,0 +1,169 @@
+"""
+数据抓取层 - K线与基本面信息并发获取，连接池复用，按数据源限速、超时、退避重试
+K线走 Yahoo chart 接口（地址可通过 STOCK_CHART_URL 指向本地桩服务做离线测试），基本面走可替换的 info_fn
+"""
+
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+CHART_URL = os.environ.get("STOCK_CHART_URL", "https://query1.finance.yahoo.com")
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """令牌桶，rate 为每秒请求数，burst 为允许的突发数；clock/sleep 可替换（测试用假时钟）"""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate, self.capacity = rate, burst or max(1, int(rate))
+        self.clock, self.sleep = clock, sleep
+        self.tokens, self.last = float(self.capacity), clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+def transient(e):
+    """网络层错误、超时与 429/5xx 值得重试；解析错误、4xx、info_fn 自身的异常重试也是同样结果"""
+    if type(e).__name__ == "YFRateLimitError": return True  # yfinance 的 429，不为判断类型而导入 yfinance
+    if isinstance(e, ValueError) or not isinstance(e, OSError): return False
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    return status is None or status in RETRY_STATUS
+
+
+def _new_session():
+    # Yahoo 会拦截普通 requests 的指纹，优先用 yfinance 自带的 curl_cffi
+    try:
+        from curl_cffi import requests as cffi_requests
+        return cffi_requests.Session(impersonate="chrome")
+    except ImportError:
+        import requests
+        s = requests.Session()
+        s.headers["User-Agent"] = "Mozilla/5.0"
+        return s
+
+
+def yahoo_info(symbol):
+    import yfinance as yf
+    return yf.Ticker(symbol).info or {}
+
+
+def parse_chart(payload):
+    """chart 接口JSON -> 复权后的OHLCV（与 yfinance auto_adjust 一致，日线索引为交易所时区零点）"""
+    result = (payload.get("chart") or {}).get("result") or []
+    if not result or not result[0].get("timestamp"): return None
+    r = result[0]
+    q = r["indicators"]["quote"][0]
+    df = pd.DataFrame({c.capitalize(): np.asarray(q.get(c) or [np.nan] * len(r["timestamp"]), dtype=np.float64)
+                       for c in ("open", "high", "low", "close", "volume")})
+    tz = r.get("meta", {}).get("exchangeTimezoneName") or "UTC"
+    idx = pd.to_datetime(np.asarray(r["timestamp"], dtype=np.int64), unit="s", utc=True).tz_convert(tz)
+    if r.get("meta", {}).get("dataGranularity", "1d") in ("1d", "5d", "1wk", "1mo", "3mo"): idx = idx.normalize()
+    df.index = idx
+    adj = (r["indicators"].get("adjclose") or [{}])[0].get("adjclose")
+    if adj is not None:
+        ratio = np.asarray(adj, dtype=np.float64) / df["Close"].to_numpy()
+        for c in ("Open", "High", "Low"): df[c] = df[c] * ratio
+        df["Close"] = np.asarray(adj, dtype=np.float64)
+    df = df[df["Close"].notna()]
+    return df[~df.index.duplicated(keep="last")]
+
+
+class Fetcher:
+    """线程池 + 每线程一个长连接会话；history/info 各自限速，可一次提交多个代码"""
+
+    def __init__(self, base_url=CHART_URL, timeout=10, info_timeout=8, retries=3, backoff=0.5,
+                 history_rate=5, info_rate=2, max_workers=8, info_fn=yahoo_info, fallback=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout, self.info_timeout = timeout, info_timeout
+        self.retries, self.backoff = retries, backoff
+        self.limits = {"history": RateLimiter(history_rate), "info": RateLimiter(info_rate)}
+        self.pool = ThreadPoolExecutor(max_workers, thread_name_prefix="fetch")
+        self.info_fn, self.fallback = info_fn, fallback
+        self._local = threading.local()
+
+    def _session(self):
+        s = getattr(self._local, "session", None)
+        if s is None: s = self._local.session = _new_session()
+        return s
+
+    def _retry(self, source, fn):
+        """限速后调用，网络错误或可重试状态码（见 transient）时指数退避，其他异常直接抛出"""
+        for attempt in range(self.retries + 1):
+            self.limits[source].acquire()
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == self.retries or not transient(e): raise
+            time.sleep(self.backoff * (2 ** attempt) * (1 + random.random() * 0.2))
+
+    def _get_json(self, url, params):
+        resp = self._session().get(url, params=params, timeout=self.timeout)
+        if resp.status_code in RETRY_STATUS: raise IOError(f"HTTP {resp.status_code}")
+        if resp.status_code != 200: return None
+        return resp.json()
+
+    def history(self, symbol, start=None):
+        """日线；start 为 None 时拉全量历史（与 BarStore 的 fetch 签名一致）"""
+        params = {"interval": "1d", "events": "div,splits", "includeAdjustedClose": "true"}
+        if start is None: params["range"] = "max"
+        else: params.update(period1=int(pd.Timestamp(start, tz="UTC").timestamp()), period2=int(time.time()) + 86400)
+        try:
+            payload = self._retry("history", lambda: self._get_json(f"{self.base_url}/v8/finance/chart/{symbol}", params))
+            df = parse_chart(payload) if payload else None
+        except Exception:
+            if self.fallback is None: raise
+            df = None
+        if (df is None or len(df) == 0) and self.fallback is not None:
+            return self.fallback(symbol, start)
+        return df
+
+    def info(self, symbol):
+        return self._retry("info", lambda: self.info_fn(symbol))
+
+    def submit_history(self, symbol, start=None):
+        return self.pool.submit(self.history, symbol, start)
+
+    def submit_info(self, symbol):
+        return self.pool.submit(self.info, symbol)
+
+    def wait_info(self, future, timeout=None):
+        """等待基本面结果（timeout 缺省为 info_timeout，0 为不等），超时或失败返回空字典"""
+        try:
+            return future.result(timeout=self.info_timeout if timeout is None else timeout) or {}
+        except Exception:
+            return {}
+
+    def fetch(self, symbol, get_bars=None):
+        """K线与基本面并发获取；get_bars 可替换K线路径（如走 BarStore）
+        K线到手即返回，基本面未完成时为空字典，请求在后台继续（需要留存结果用 FundamentalsStore.fetch）"""
+        info_future = self.submit_info(symbol)
+        df = get_bars(symbol) if get_bars else self.history(symbol)
+        return df, self.wait_info(info_future, timeout=0)
+
+    def batch_history(self, symbols, start=None):
+        """多个代码并发拉取，返回 {代码: DataFrame或None}"""
+        futures = {s: self.submit_history(s, start) for s in symbols}
+        out = {}
+        for s, f in futures.items():
+            try: out[s] = f.result()
+            except Exception: out[s] = None
+        return out
+
+    def batch_info(self, symbols):
+        futures = {s: self.submit_info(s) for s in symbols}
+        return {s: self.wait_info(f) for s, f in futures.items()}
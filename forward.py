@@ -0,0 +1,144 @@
+"""
+条件前瞻收益统计 - 按当前综合信号状态，从历史（单品种或全库）取各持有期的前瞻收益分布，作为操作建议的依据
+所有持有期一次算出：对数收盘价补齐尾部后，用 (T, H) 的错位下标一次取出 log(P[t+h]) - log(P[t])
+样本为逐日重叠窗口，n 表示样本数而非独立观测数
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# 持有期（交易日）：7日约5个交易日，1月约21个
+HORIZONS = {"短线1日": 1, "短线3日": 3, "短线7日": 5, "短线1月": 21, "中线3月": 63, "中线6月": 126, "长线1年": 252}
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+STATES = {1: "买入", 0: "观望", -1: "卖出"}
+MIN_SAMPLES = 30
+WARMUP = 60  # 指标尚未稳定的前60根不计入样本
+
+
+def forward_returns(close, horizons=tuple(HORIZONS.values()), dtype=np.float64):
+    """(T,) 或 (N, T) 收盘价 -> (..., T, H) 对数前瞻收益，超出末尾为NaN"""
+    lc = np.log(np.atleast_2d(np.asarray(close, dtype=np.float64)))
+    h = np.asarray(horizons)
+    padded = np.concatenate([lc, np.full((lc.shape[0], h.max()), np.nan)], axis=1)
+    out = (padded[:, np.arange(lc.shape[1])[:, None] + h] - lc[:, :, None]).astype(dtype, copy=False)
+    return out[0] if np.ndim(close) == 1 else out
+
+
+def signal_state(close, high, low):
+    """逐根综合信号（1/0/-1），与回测同一套规则；预热期记为 -128 不参与统计"""
+    from backtest import compute_signals
+    state = compute_signals(close, high, low)['综合']
+    state[..., :WARMUP] = -128
+    return state
+
+
+def samples(close, high, low, dtype=np.float32):
+    """单品种 -> {状态: (M, H) 前瞻收益样本}"""
+    fwd = forward_returns(close, dtype=dtype)
+    state = signal_state(close, high, low)[0]
+    return {s: fwd[state == s] for s in STATES}
+
+
+def summarize(samples_by_state, horizons=tuple(HORIZONS.values())):
+    """{状态: 样本} -> {状态: {n, mean, up, q: (Q, H)}}，另有 None 键为不分状态的全部样本"""
+    groups = dict(samples_by_state)
+    groups[None] = np.concatenate([v for v in groups.values()]) if groups else np.empty((0, len(horizons)))
+    out = {}
+    for s, x in groups.items():
+        n = (~np.isnan(x)).sum(axis=0)
+        # 逐列去掉NaN后用 quantile（选择算法），比 nanquantile 整块处理快一个数量级
+        q = np.full((len(QUANTILES), x.shape[1]), np.nan)
+        for j in range(x.shape[1]):
+            col = x[:, j][~np.isnan(x[:, j])]
+            if len(col): q[:, j] = np.quantile(col, QUANTILES)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[s] = {"n": n, "mean": np.where(n > 0, np.nansum(x, axis=0, dtype=np.float64) / n, np.nan),
+                      "up": np.where(n > 0, (x > 0).sum(axis=0) / n, np.nan), "q": q}
+    return out
+
+
+def _version(df):
+    from timeframe import version
+    return version(df)
+
+
+class ForwardStats:
+    """按代码缓存统计结果，基础序列版本不变时直接返回；universe() 合并多个代码的样本，
+    各代码样本按版本常驻（全库约 行数×7×4 字节），只有版本变化的代码重新计算"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.memo = OrderedDict()  # 代码 -> (版本, 统计)
+        self.parts = {}  # 全库统计用：代码 -> (版本, 样本或None)
+        self.pooled = (None, None)  # (各代码版本, 合并统计)
+        self.lock = threading.Lock()
+
+    def get(self, symbol, df):
+        v = _version(df)
+        with self.lock:
+            hit = self.memo.get(symbol)
+            if hit and hit[0] == v:
+                self.memo.move_to_end(symbol)
+                return hit[1]
+        stats = summarize(samples(df['Close'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy()))
+        with self.lock:
+            self.memo[symbol] = (v, stats)
+            while len(self.memo) > self.max_entries: self.memo.popitem(last=False)
+        return stats
+
+    def universe(self, versions, load):
+        """{代码: 版本} 的样本合并后统计；版本未变的代码复用缓存样本，其余经 load(代码) 取日线重算
+        全库样本不进单品种缓存，避免挤掉页面正在用的代码"""
+        key = tuple(sorted(versions.items()))
+        with self.lock:
+            if self.pooled[0] == key: return self.pooled[1]
+            parts = {s: self.parts[s] for s, v in versions.items() if s in self.parts and self.parts[s][0] == v}
+        for s in versions.keys() - parts.keys():
+            df = load(s)
+            ok = df is not None and len(df) > WARMUP
+            parts[s] = (versions[s], samples(df['Close'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy()) if ok else None)
+        found = [p for _, p in parts.values() if p is not None]
+        out = summarize({s: np.concatenate([p[s] for p in found]) for s in STATES} if found else {})
+        with self.lock: self.parts, self.pooled = parts, (key, out)
+        return out
+
+
+def advise(stats, state, min_samples=MIN_SAMPLES, up=0.55, down=0.45):
+    """当前状态下各持有期的建议：上涨比例与中位收益同向时给出买入/卖出，否则观望；样本不足时退回不分状态的分布"""
+    out = []
+    for i, (style, h) in enumerate(HORIZONS.items()):
+        st = stats.get(state)
+        pooled = st is None or st["n"][i] < min_samples
+        if pooled: st = stats[None]
+        n, p, med = int(st["n"][i]), st["up"][i], st["q"][QUANTILES.index(0.5), i]
+        if n < min_samples or np.isnan(p):
+            out.append({"style": style, "horizon": h, "action": "观望", "reason": "样本不足", "n": n})
+            continue
+        action = "买入" if p >= up and med > 0 else "卖出" if p <= down and med < 0 else "观望"
+        q10, q90 = st["q"][0, i], st["q"][-1, i]
+        out.append({"style": style, "horizon": h, "action": action, "n": n, "up": float(p), "median": float(np.expm1(med)),
+                    "q10": float(np.expm1(q10)), "q90": float(np.expm1(q90)), "conditioned": not pooled,
+                    "reason": f"上涨{p*100:.0f}% 中位{np.expm1(med)*100:+.1f}% (n={n}{'' if not pooled else ', 不分信号'})"})
+    return out
+
+
+def cost_ranges(stats, state, price, style="中线3月", min_samples=MIN_SAMPLES):
+    """按持有期前瞻收益的分位把成本价分段：每段给出持有期末收盘在成本价以上的经验概率
+    只看期末一个时点，期间曾涨回成本又跌下的不算回本，概率低于"期间触及成本"的概率"""
+    i = list(HORIZONS).index(style)
+    st = stats.get(state)
+    if st is None or st["n"][i] < min_samples: st = stats[None]
+    if st["n"][i] < min_samples: return []
+    q = np.expm1(st["q"][:, i])
+    levels = price * (1 + q[[0, 1, 3, 4]])  # 10%/25%/75%/90% 分位对应的价格
+    bounds = [0.0, *levels, np.inf]
+    probs = [1.0, 0.9, 0.75, 0.25, 0.1, 0.0]  # 成本恰为各分界价时的期末回本概率（由分位定义）
+    actions = ["持有", "持有", "持有/观望", "减仓", "止损/减仓"]
+    rows = []
+    for k in range(5):
+        lo, hi = bounds[k], bounds[k + 1]
+        text = f"<${hi:.2f}" if k == 0 else f">${lo:.2f}" if k == 4 else f"${lo:.2f}-${hi:.2f}"
+        prob = f">{probs[1] * 100:.0f}%" if k == 0 else f"<{probs[4] * 100:.0f}%" if k == 4 else f"{probs[k + 1] * 100:.0f}%-{probs[k] * 100:.0f}%"
+        rows.append({"cost": text, "action": actions[k], "reason": f"持有{style[2:]}期末回本概率{prob}", "low": lo, "high": hi})
+    return rows
@@ -0,0 +1,296 @@
+"""
+基本面存储与批量估值 - 基本面按天变化，单独存一份长TTL的定长记录，过期时先返回旧值并在后台刷新
+估值对整张表做数组运算：同行业PE分位区间、三阶段（高速/衰减/永续）DCF、52周位置
+用法: python fundamentals.py                   # 刷新整个代码表中过期的记录，输出按估值排序的结果
+      python fundamentals.py MSFT AAPL --force
+环境变量: STOCK_FUNDAMENTALS_DIR（默认 .fundamentals），STOCK_FUNDAMENTALS_TTL（秒，默认86400）
+"""
+
+import argparse
+import atexit
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+FUNDAMENTALS_DIR = os.environ.get("STOCK_FUNDAMENTALS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".fundamentals"))
+FUNDAMENTALS_TTL = float(os.environ.get("STOCK_FUNDAMENTALS_TTL", "86400"))
+
+# 字段名与 yfinance info 一致，页面代码可直接按原键读取
+NUMERIC = ["trailingPE", "forwardPE", "priceToBook", "marketCap", "dividendYield", "returnOnEquity",
+           "epsTrailingTwelveMonths", "forwardEps", "fiftyTwoWeekLow", "fiftyTwoWeekHigh", "currentPrice",
+           "freeCashflow", "sharesOutstanding", "totalCash", "totalDebt", "earningsGrowth", "revenueGrowth", "beta"]
+TEXT = ["longName", "sector", "industry", "currency", "financialCurrency", "businessSummary"]
+
+RISK_FREE, EQUITY_PREMIUM = 0.04, 0.055
+TERMINAL_GROWTH = 0.025
+DEFAULT_PE_BAND = (15.0, 20.0, 30.0)
+
+
+def to_record(info):
+    """yfinance info -> 定长记录：数值统一为 float（缺失为NaN），文本为 str"""
+    rec = {}
+    for k in NUMERIC:
+        try: rec[k] = float(info.get(k))
+        except (TypeError, ValueError): rec[k] = np.nan
+    for k in TEXT: rec[k] = str(info.get(k) or "")
+    if not rec["businessSummary"]: rec["businessSummary"] = str(info.get("longBusinessSummary") or "")[:500]
+    if np.isnan(rec["currentPrice"]):
+        try: rec["currentPrice"] = float(info.get("regularMarketPrice"))
+        except (TypeError, ValueError): pass
+    return rec
+
+
+def to_info(rec):
+    """记录 -> 页面使用的 info 字典，NaN/空串还原为 None"""
+    if rec is None: return {}
+    return {k: (None if (v != v or v == "") else v) for k, v in rec.items() if k != "updated"}
+
+
+class FundamentalsStore:
+    """内存中 {代码: 记录}，持久化为一个 Arrow 文件；文件被其他进程更新后下次访问时重新读取
+    后台刷新不立即写文件，save_delay 秒内的刷新合并为一次写；写时持文件锁重读磁盘版本合并，多进程不丢记录
+    version 在记录每次变化（本进程刷新或读入其他进程的写入）时递增，供估值等按版本缓存"""
+
+    def __init__(self, fetcher, root=FUNDAMENTALS_DIR, ttl=FUNDAMENTALS_TTL, workers=2, retry_after=300, save_delay=5.0):
+        self.fetcher, self.root, self.ttl, self.retry_after, self.save_delay = fetcher, root, ttl, retry_after, save_delay
+        self.path = os.path.join(root, "fundamentals.arrow")
+        self.records, self.mtime, self.version = {}, None, 0
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.timer = None  # 待执行的合并写
+        self.pending = {}  # 代码 -> 正在刷新的 Future
+        self.failed = {}  # 代码 -> 最近一次获取失败的时间，retry_after 秒内不再后台重试
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="fundamentals")
+        self._reload()
+        atexit.register(self.flush)
+
+    def _reload(self, force=False):
+        try: mtime = os.path.getmtime(self.path)
+        except OSError: return
+        if mtime == self.mtime and not force: return
+        import pyarrow as pa
+        table = pa.ipc.open_file(pa.memory_map(self.path, "r")).read_all()
+        with self.lock:
+            changed = False
+            for rec in table.to_pylist():
+                s = rec.pop("symbol")
+                if rec["updated"] > self.records.get(s, {}).get("updated", -1): self.records[s], changed = rec, True
+            self.mtime = mtime
+            if changed: self.version += 1
+
+    def save(self):
+        """持文件锁重读磁盘上的版本，按更新时间合并后写临时文件并原子替换"""
+        import pyarrow as pa
+        os.makedirs(self.root, exist_ok=True)
+        with self.save_lock, open(self.path + ".lock", "a") as lock_file:
+            try: import fcntl
+            except ImportError: fcntl = None  # Windows 下只有进程内互斥
+            if fcntl: fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._reload(force=True)
+            with self.lock: rows = [{"symbol": s, **r} for s, r in self.records.items()]
+            schema = pa.schema([("symbol", pa.string()), *((k, pa.float64()) for k in NUMERIC),
+                                *((k, pa.dictionary(pa.int32(), pa.string())) for k in TEXT), ("updated", pa.float64())])
+            table = pa.Table.from_pylist(rows, schema=schema)
+            tmp = self.path + f".{os.getpid()}.tmp"
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd")) as w:
+                w.write_table(table)
+            os.replace(tmp, self.path)
+            self.mtime = os.path.getmtime(self.path)
+
+    def current_version(self):
+        """先读入其他进程的写入，再返回当前版本号"""
+        self._reload()
+        return self.version
+
+    def _schedule_save(self):
+        with self.lock:
+            if self.timer is not None: return
+            self.timer = threading.Timer(self.save_delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        """立即执行待写的合并写（进程退出时也会调用）"""
+        with self.lock:
+            timer, self.timer = self.timer, None
+        if timer is None: return
+        timer.cancel()
+        self.save()
+
+    def _fetch(self, symbol, save=True):
+        try:
+            info = self.fetcher.info(symbol)
+        except Exception:
+            info = None
+        with self.lock:
+            self.pending.pop(symbol, None)
+            if not info:
+                self.failed[symbol] = time.time()
+                return self.records.get(symbol)
+            self.failed.pop(symbol, None)
+            rec = self.records[symbol] = {**to_record(info), "updated": time.time()}
+            self.version += 1
+        if save: self._schedule_save()
+        return rec
+
+    def _submit(self, symbol):
+        with self.lock:
+            future = self.pending.get(symbol)
+            if future is None: future = self.pending[symbol] = self.pool.submit(self._fetch, symbol)
+        return future
+
+    def stale(self, symbol, now=None):
+        rec = self.records.get(symbol)
+        return rec is None or (now or time.time()) - rec["updated"] > self.ttl
+
+    def get(self, symbol, timeout=None):
+        """已有记录立即返回（过期则后台刷新）；没有记录时同步获取，最多等 timeout 秒（缺省 info_timeout，0 为不等）"""
+        self._reload()
+        rec = self.records.get(symbol)
+        retry = time.time() - self.failed.get(symbol, 0) > self.retry_after
+        if rec is not None:
+            if retry and self.stale(symbol): self._submit(symbol)
+            return to_info(rec)
+        if not retry and symbol not in self.pending: return {}
+        try: return to_info(self._submit(symbol).result(timeout=self.fetcher.info_timeout if timeout is None else timeout))
+        except Exception: return {}
+
+    def fetch(self, symbol, get_bars):
+        """与 Fetcher.fetch 相同签名：缺记录时基本面与K线并发获取，K线到手即返回
+        基本面未完成时为空字典，后台完成后写入记录，之后的 get 即可读到"""
+        self._reload()
+        if symbol not in self.records and symbol not in self.failed: self._submit(symbol)
+        df = get_bars(symbol)
+        return df, self.get(symbol, timeout=0)
+
+    def refresh(self, symbols, force=False, workers=8):
+        """批量刷新（默认只刷过期的），全部完成后写一次文件，返回刷新的个数"""
+        self._reload()
+        now = time.time()
+        todo = [s for s in symbols if force or self.stale(s, now)]
+        if not todo: return 0
+        with ThreadPoolExecutor(workers) as ex:
+            list(ex.map(lambda s: self._fetch(s, save=False), todo))
+        with self.lock:
+            timer, self.timer = self.timer, None
+        if timer is not None: timer.cancel()
+        self.save()
+        return len(todo)
+
+    def frame(self, symbols=None):
+        """记录表（代码为索引），数值列为 float64"""
+        self._reload()
+        with self.lock: recs = dict(self.records)
+        symbols = list(recs) if symbols is None else list(symbols)
+        df = pd.DataFrame([recs.get(s, {}) for s in symbols], index=pd.Index(symbols, name="symbol"))
+        for k in NUMERIC: df[k] = df[k].astype(np.float64) if k in df else np.nan
+        for k in TEXT: df[k] = df[k].fillna("") if k in df else ""
+        return df
+
+
+def pe_bands(eps, pe, sector, q=(0.25, 0.5, 0.75), min_peers=3):
+    """合理价格区间 = EPS × 同行业正PE的分位数；同行业不足 min_peers 家用全表分位，仍不足用默认倍数"""
+    pe = pd.Series(pe, dtype=np.float64)
+    ok = (pe > 0) & (pe < 200)
+    sector = np.asarray(sector).astype(str)
+    groups = pd.Series(sector, index=pe.index).where(ok & (sector != ""))
+    overall = pe[ok].quantile(list(q)).to_numpy() if ok.sum() >= min_peers else np.array(DEFAULT_PE_BAND)
+    by = pe[ok].groupby(groups[ok])
+    table = by.quantile(list(q)).unstack()
+    table = table[by.size() >= min_peers] if len(table) else table
+    bands = np.tile(overall, (len(pe), 1))
+    if len(table):
+        hit = np.isin(sector, table.index)
+        bands[hit] = table.reindex(sector[hit]).to_numpy()
+    eps = np.asarray(eps, dtype=np.float64)
+    return np.where((eps > 0)[:, None], eps[:, None] * bands, np.nan)
+
+
+def dcf(fcf_per_share, growth, discount, high_years=5, fade_years=5, terminal=TERMINAL_GROWTH):
+    """三阶段DCF：前 high_years 年按 growth 增长，之后 fade_years 年线性衰减到 terminal，再按永续增长折现"""
+    fcf, g1, r = (np.asarray(a, dtype=np.float64) for a in (fcf_per_share, growth, discount))
+    fade = np.linspace(0, 1, fade_years + 2)[1:-1]
+    g = np.hstack([np.repeat(g1[:, None], high_years, axis=1), g1[:, None] * (1 - fade) + terminal * fade])
+    cf = fcf[:, None] * np.cumprod(1 + g, axis=1)
+    disc = (1 + r)[:, None] ** -np.arange(1, g.shape[1] + 1)
+    tv = cf[:, -1] * (1 + terminal) / (r - terminal) * disc[:, -1]
+    value = (cf * disc).sum(axis=1) + tv
+    return np.where(fcf > 0, value, np.nan)
+
+
+def valuate(funds, price=None, low52=None, high52=None, bands=None):
+    """对记录表整体估值，返回 DataFrame（索引同 funds）；price/low52/high52 缺省取记录中的值
+    bands 给出时直接使用（n×3 的PE法价格区间），否则按 funds 内同行业分位计算
+    财报货币（financialCurrency）与交易货币不同的不做DCF：现金流与股价不在同一货币下"""
+    f = lambda k: funds[k].to_numpy(dtype=np.float64)
+    price = f("currentPrice") if price is None else np.asarray(price, dtype=np.float64)
+    low52 = f("fiftyTwoWeekLow") if low52 is None else np.asarray(low52, dtype=np.float64)
+    high52 = f("fiftyTwoWeekHigh") if high52 is None else np.asarray(high52, dtype=np.float64)
+    eps = f("epsTrailingTwelveMonths")
+    pe = np.where(np.isnan(f("trailingPE")), price / np.where(eps > 0, eps, np.nan), f("trailingPE"))
+    if bands is None: bands = pe_bands(eps, pe, funds["sector"].to_numpy())
+    shares = np.where(f("sharesOutstanding") > 0, f("sharesOutstanding"), np.nan)
+    growth = np.clip(np.where(np.isnan(f("earningsGrowth")), f("revenueGrowth"), f("earningsGrowth")), -0.2, 0.3)
+    growth = np.where(np.isnan(growth), 0.08, growth)
+    discount = np.clip(RISK_FREE + np.nan_to_num(f("beta"), nan=1.0) * EQUITY_PREMIUM, 0.06, 0.15)
+    net_cash = (np.nan_to_num(f("totalCash")) - np.nan_to_num(f("totalDebt"))) / shares
+    value = dcf(f("freeCashflow") / shares, growth, discount) + net_cash
+    fin, cur = (funds[k].to_numpy().astype(str) for k in ("financialCurrency", "currency"))
+    value = np.where((fin == "") | (cur == "") | (fin == cur), value, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        upside = value / price - 1
+        pos = (price - low52) / (high52 - low52)
+    votes = (np.nan_to_num(upside) > 0.2).astype(int) + (price < bands[:, 0]) - (np.nan_to_num(upside) < -0.2) - (price > bands[:, 2])
+    known = ~np.isnan(upside) | ~np.isnan(bands[:, 0])
+    label = np.where(~known, None, np.where(votes > 0, "低估", np.where(votes < 0, "高估", "合理")))
+    return pd.DataFrame({"price": price, "pe": pe, "pe_low": bands[:, 0], "pe_mid": bands[:, 1], "pe_high": bands[:, 2],
+                         "dcf": value, "dcf_upside": upside, "discount_rate": discount, "growth": growth,
+                         "pos_52w": np.clip(pos, 0, 1), "valuation": label}, index=funds.index)
+
+
+def price_ranges(store, symbols, days=252):
+    """本地K线的最新收盘与近 days 根的最高/最低，没有K线的为NaN"""
+    out = np.full((len(symbols), 3), np.nan)
+    for i, s in enumerate(symbols):
+        stored = store.load(s)
+        if stored is None: continue
+        values = stored[1][-days:]
+        out[i] = values[-1, 3], np.nanmin(values[:, 2]), np.nanmax(values[:, 1])
+    return out.T
+
+
+def universe_valuation(symbols, funds_store, bar_store=None):
+    """代码列表的基本面 + 估值；有本地K线时价格与52周区间取K线"""
+    funds = funds_store.frame(symbols)
+    if bar_store is None: return funds.join(valuate(funds))
+    price, low, high = price_ranges(bar_store, list(funds.index))
+    pick = lambda a, k: np.where(np.isnan(a), funds[k].to_numpy(dtype=np.float64), a)
+    return funds.join(valuate(funds, pick(price, "currentPrice"), pick(low, "fiftyTwoWeekLow"), pick(high, "fiftyTwoWeekHigh")))
+
+
+def main(argv=None):
+    import analysis
+    from snapshot import universe_symbols
+    p = argparse.ArgumentParser(description="刷新基本面并按估值排序")
+    p.add_argument("symbols", nargs="*", help="代码，缺省为整个代码表")
+    p.add_argument("--force", action="store_true", help="忽略TTL全部重新获取")
+    p.add_argument("-n", "--top", type=int, default=30)
+    args = p.parse_args(argv)
+
+    symbols = [s.upper() for s in args.symbols] or [info.get("full_code") or c for c, info in universe_symbols().items()]
+    store = analysis.get_fundamentals()
+    t0 = time.perf_counter()
+    n = store.refresh(symbols, args.force)
+    df = universe_valuation(symbols, store, analysis.get_store())
+    print(f"刷新 {n}/{len(symbols)} 个，耗时 {time.perf_counter() - t0:.1f}s")
+    cols = ["longName", "price", "pe", "pe_mid", "dcf", "dcf_upside", "pos_52w", "valuation"]
+    print(df.sort_values("dcf_upside", ascending=False)[cols].head(args.top).to_string(float_format=lambda v: f"{v:.2f}"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
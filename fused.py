@@ -0,0 +1,132 @@
+"""
+单品种融合指标内核 - 收盘/最高/最低/成交量各读一次，全部指标写入一块预分配的 (指标数, T) 缓冲区
+中间量只保留少量长度为T的float64临时数组；dtype=np.float32 时输出占用减半
+列名与 calculate_indicators 相同；输入含NaN时退回面板引擎（同一套公式）
+"""
+
+import numpy as np
+import pandas as pd
+from panel import COLUMNS, calculate_indicators_panel, ewm_mean
+from trail import trail_indicators
+
+ROW = {c: i for i, c in enumerate(COLUMNS)}
+
+
+def _cumsum0(x, center, out):
+    """前补0的中心化前缀和，out 长度 T+1"""
+    out[0] = 0.0
+    np.cumsum(x - center, out=out[1:])
+    return out
+
+
+def _window_mean(cs, center, m, out):
+    """由前缀和得到 rolling(m).mean()，前 m-1 个为NaN"""
+    out[:m - 1] = np.nan
+    if len(out) >= m:
+        np.subtract(cs[m:], cs[:-m], out=out[m - 1:])
+        out[m - 1:] /= m
+        out[m - 1:] += center
+    return out
+
+
+def _window_extreme(x, m, fn, out):
+    out[:m - 1] = np.nan
+    T = len(x)
+    if T >= m:
+        acc = out[m - 1:]
+        acc[:] = x[m - 1:]
+        for k in range(1, m): fn(acc, x[m - 1 - k:T - k], out=acc)
+    return out
+
+
+def fused_indicators(close, high, low, volume, dtype=np.float64, out=None):
+    """一维OHLCV -> (len(COLUMNS), T) 指标数组，行顺序同 COLUMNS"""
+    c, h, l, v = (np.ascontiguousarray(a, dtype=np.float64) for a in (close, high, low, volume))
+    T = len(c)
+    buf = out if out is not None else np.empty((len(COLUMNS), T), dtype=dtype)
+    if np.isnan(c).any() or np.isnan(h).any() or np.isnan(l).any() or np.isnan(v).any():
+        res = calculate_indicators_panel(c[None], h[None], l[None], v[None])
+        for name, i in ROW.items(): buf[i] = res[name][0]
+        return buf
+    if T == 0: return buf
+
+    cs = np.empty(T + 1)
+    tmp, tmp2 = np.empty(T), np.empty(T)
+    center = c.mean()
+    _cumsum0(c, center, cs)
+    for m in [5, 10, 20, 60]: buf[ROW[f'MA{m}']] = _window_mean(cs, center, m, tmp)
+    buf[ROW['BB_Mid']] = buf[ROW['MA20']]
+
+    # 布林带：中心化的一阶、二阶窗口和
+    sq = np.empty(T + 1)
+    np.subtract(c, center, out=tmp2)
+    np.multiply(tmp2, tmp2, out=tmp2)
+    sq[0] = 0.0
+    np.cumsum(tmp2, out=sq[1:])
+    _window_mean(cs, 0.0, 20, tmp)   # 窗口内 (c-center) 的均值
+    _window_mean(sq, 0.0, 20, tmp2)  # 窗口内 (c-center)^2 的均值
+    np.multiply(tmp, tmp, out=tmp)
+    np.subtract(tmp2, tmp, out=tmp2)
+    tmp2 *= 20 / 19
+    np.maximum(tmp2, 0.0, out=tmp2)
+    np.sqrt(tmp2, out=tmp2)
+    buf[ROW['BB_Std']] = tmp2
+    np.multiply(tmp2, 2, out=tmp)
+    np.add(buf[ROW['BB_Mid']], tmp, out=buf[ROW['BB_Up']])
+    np.subtract(buf[ROW['BB_Mid']], tmp, out=buf[ROW['BB_Down']])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.multiply(c, v, out=tmp)
+        np.cumsum(tmp, out=tmp)
+        np.cumsum(v, out=tmp2)
+        np.divide(tmp, tmp2, out=buf[ROW['VWAP']])
+
+    ewm_mean(c, 12, out=tmp)
+    tmp -= ewm_mean(c, 26, out=tmp2)
+    buf[ROW['MACD']] = tmp
+    buf[ROW['MACD_Signal']] = ewm_mean(tmp, 9, out=tmp2)
+
+    # RSI：首个差分按0计入（同 dl.where(dl>0,0)）
+    tmp[0] = 0.0
+    np.subtract(c[1:], c[:-1], out=tmp[1:])
+    np.minimum(tmp, 0.0, out=tmp2)
+    np.negative(tmp2, out=tmp2)
+    np.maximum(tmp, 0.0, out=tmp)
+    _cumsum0(tmp, 0.0, cs)
+    _cumsum0(tmp2, 0.0, sq)
+    _window_mean(cs, 0.0, 14, tmp)
+    _window_mean(sq, 0.0, 14, tmp2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.divide(tmp, tmp2, out=tmp2)
+        tmp2 += 1
+        np.divide(100, tmp2, out=tmp2)
+        np.subtract(100, tmp2, out=buf[ROW['RSI']])
+
+    # KDJ
+    lmin = _window_extreme(l, 9, np.minimum, tmp)
+    hmax = _window_extreme(h, 9, np.maximum, tmp2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.subtract(hmax, lmin, out=tmp2)
+        np.subtract(c, lmin, out=tmp)
+        np.divide(tmp, tmp2, out=tmp)
+    tmp *= 100
+    k = tmp
+    tmp2[:2] = np.nan
+    np.add(k[2:], k[1:-1], out=tmp2[2:])
+    tmp2[2:] += k[:-2]
+    tmp2 /= 3
+    buf[ROW['K']], buf[ROW['D']] = k, tmp2
+    np.multiply(k, 3, out=tmp)
+    tmp2 *= 2
+    np.subtract(tmp, tmp2, out=buf[ROW['J']])
+
+    for name, values in trail_indicators(h, l, c).items(): buf[ROW[name]] = values
+    return buf
+
+
+def calculate_indicators_fused(df, dtype=np.float64):
+    """与 calculate_indicators 同列名的DataFrame；指标列共享同一块缓冲区"""
+    buf = fused_indicators(df['Close'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy(),
+                           df['Volume'].to_numpy(), dtype=dtype)
+    ind = pd.DataFrame(buf.T, index=df.index, columns=COLUMNS, copy=False)
+    return pd.concat([df, ind], axis=1)
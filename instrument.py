@@ -0,0 +1,169 @@
+"""
+性能埋点 - 记录每次请求各阶段耗时、处理行数、缓存命中，导出JSON日志或Prometheus文本
+可选的采样分析器：后台线程定期抓取主线程调用栈，慢请求时输出热点栈
+环境变量: STOCK_DEBUG=1 默认显示调试面板；STOCK_PROFILE=1 开启采样；STOCK_SLOW_MS 慢请求阈值；STOCK_METRICS_LOG JSON日志文件
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger("stock_analyzer.metrics")
+
+DEBUG = os.environ.get("STOCK_DEBUG") == "1"
+PROFILE = os.environ.get("STOCK_PROFILE") == "1"
+SLOW_MS = float(os.environ.get("STOCK_SLOW_MS", "1500"))
+METRICS_LOG = os.environ.get("STOCK_METRICS_LOG")
+
+_current = contextvars.ContextVar("stock_metrics", default=None)
+
+
+class Registry:
+    """进程内累计指标，供 Prometheus 文本导出"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}   # 阶段 -> [次数, 总秒数, 最大秒数, 总行数]
+        self.cache = {}    # 缓存名 -> [命中, 未命中]
+        self.requests = 0
+
+    def observe(self, stage, seconds, rows):
+        with self.lock:
+            s = self.stages.setdefault(stage, [0, 0.0, 0.0, 0])
+            s[0] += 1; s[1] += seconds; s[2] = max(s[2], seconds); s[3] += rows or 0
+
+    def cache_result(self, name, hit):
+        with self.lock:
+            self.cache.setdefault(name, [0, 0])[0 if hit else 1] += 1
+
+    def prometheus(self):
+        lines = ["# TYPE stock_stage_seconds summary"]
+        with self.lock:
+            for name, (n, total, mx, rows) in sorted(self.stages.items()):
+                lines.append(f'stock_stage_seconds_count{{stage="{name}"}} {n}')
+                lines.append(f'stock_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+                lines.append(f'stock_stage_seconds_max{{stage="{name}"}} {mx:.6f}')
+                lines.append(f'stock_stage_rows_total{{stage="{name}"}} {rows}')
+            lines.append("# TYPE stock_cache_requests_total counter")
+            for name, (hit, miss) in sorted(self.cache.items()):
+                lines.append(f'stock_cache_requests_total{{cache="{name}",result="hit"}} {hit}')
+                lines.append(f'stock_cache_requests_total{{cache="{name}",result="miss"}} {miss}')
+            lines.append("# TYPE stock_requests_total counter")
+            lines.append(f"stock_requests_total {self.requests}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class RequestMetrics:
+    """单次页面请求的阶段记录"""
+
+    def __init__(self, name="page"):
+        self.name, self.stages, self.cache = name, [], {}
+        self.started, self.depth = time.perf_counter(), 0
+        self.total_ms, self.profile = None, None
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        rec = {"stage": name, "rows": rows, "depth": self.depth}
+        self.stages.append(rec)
+        self.depth += 1
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            sec = time.perf_counter() - t0
+            self.depth -= 1
+            rec["ms"] = sec * 1000
+            REGISTRY.observe(name, sec, rec["rows"])
+
+    def cache_result(self, name, hit):
+        self.cache[name] = "hit" if hit else "miss"
+        REGISTRY.cache_result(name, hit)
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+        with REGISTRY.lock: REGISTRY.requests += 1
+        return self
+
+    def summary(self):
+        return {"request": self.name, "ts": time.time(), "total_ms": self.total_ms,
+                "stages": [{k: v for k, v in s.items() if k != "depth"} for s in self.stages],
+                "cache": self.cache, "profile": self.profile}
+
+
+def begin(name="page"):
+    m = RequestMetrics(name)
+    _current.set(m)
+    return m
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def stage(name, rows=None):
+    """当前请求有记录器时计时，否则为空操作（核心模块在批处理中调用无开销）"""
+    m = _current.get()
+    if m is None:
+        yield {"stage": name, "rows": rows}
+        return
+    with m.stage(name, rows) as rec:
+        yield rec
+
+
+def log_request(m):
+    line = json.dumps(m.summary(), ensure_ascii=False, default=str)
+    logger.info(line)
+    if METRICS_LOG:
+        with open(METRICS_LOG, "a", encoding="utf-8") as f: f.write(line + "\n")
+
+
+class SamplingProfiler:
+    """后台线程按固定间隔抓取目标线程的调用栈并计数"""
+
+    def __init__(self, interval=0.005, depth=8):
+        self.interval, self.depth = interval, depth
+        self.samples, self.total = Counter(), 0
+        self.thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < self.depth:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+                self.total += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="sampler")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join()
+        return self
+
+    def top(self, n=15):
+        """按最内层函数聚合的热点，返回 [(函数, 采样占比, 样例调用栈)]"""
+        leaf = Counter()
+        example = {}
+        for stack, c in self.samples.items():
+            leaf[stack[-1]] += c
+            example.setdefault(stack[-1], " > ".join(stack))
+        return [(k, c / max(self.total, 1), example[k]) for k, c in leaf.most_common(n)]
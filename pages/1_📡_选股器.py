@@ -0,0 +1,74 @@
+"""
+全市场选股器 - 读取 snapshot.py 定时生成的信号快照（内存映射），筛选排序直接在 Arrow 表上做
+"""
+
+import os
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+import snapshot
+
+st.set_page_config(page_title="选股器", page_icon="📡", layout="wide")
+
+COLUMN_NAMES = {
+    "code": "代码", "name": "名称", "market": "市场", "price": "价格", "change_pct": "涨跌%",
+    "conclusion_overall": "综合信号", "conclusion_buy": "买入票", "conclusion_sell": "卖出票",
+    "均线_signal": "均线", "MACD_signal": "MACD", "RSI_signal": "RSI", "KDJ_signal": "KDJ",
+    "布林带_signal": "布林带", "Supertrend_signal": "Supertrend", "chan_trend": "走势",
+    "wyckoff_phase": "威科夫", "pattern_pattern": "形态", "pe": "PE", "dcf_upside": "DCF空间",
+    "pos_52w": "52周位置", "valuation": "估值", "date": "日期",
+}
+
+
+@st.cache_resource(max_entries=1)
+def load(path, mtime):
+    # 同一份快照所有会话共享，文件更新（mtime变化）后才重新读取，旧快照随即释放；表的各列直接引用映射页
+    return snapshot.read(path)
+
+
+def options(table, col):
+    return sorted(v for v in table[col].unique().to_pylist() if v is not None) if col in table.column_names else []
+
+
+def keep(table, col, values):
+    return table.filter(pc.is_in(table[col], value_set=pa.array(values))) if values else table
+
+
+st.markdown("## 📡 全市场信号选股器")
+path = snapshot.latest_path()
+if not path or not os.path.exists(path):
+    st.warning("尚无快照，请先运行 `python snapshot.py`（可加入 cron 定时执行）")
+    st.stop()
+
+# 筛选排序都在 Arrow 表上做，只有展示的结果交给表格组件
+table, meta = load(path, os.path.getmtime(path))
+total = table.num_rows
+if "error" in table.column_names: table = table.filter(pc.is_null(table["error"]))
+st.caption(f"快照 {meta.get('created')} | 周期 {meta.get('period')} | {table.num_rows}/{total} 个代码")
+if table.num_rows == 0 or "conclusion_overall" not in table.column_names:
+    st.info("这份快照没有分析成功的代码（例如生成时网络不可用、本地也没有K线），请检查后重新运行 `python snapshot.py`")
+    st.stop()
+
+c1, c2, c3, c4, c5 = st.columns(5)
+with c1: overall = st.multiselect("综合信号", options(table, "conclusion_overall"))
+with c2: markets = st.multiselect("市场", options(table, "market"))
+with c3: min_buy = st.slider("最少买入票", 0, 6, 0)
+with c4: phases = st.multiselect("威科夫阶段", options(table, "wyckoff_phase"))
+with c5: valuations = st.multiselect("估值", options(table, "valuation"))
+
+view = keep(table, "conclusion_overall", overall)
+view = keep(view, "market", markets)
+if min_buy: view = view.filter(pc.greater_equal(view["conclusion_buy"], min_buy))
+view = keep(view, "wyckoff_phase", phases)
+view = keep(view, "valuation", valuations)
+
+c1, c2 = st.columns([3, 1])
+sort_names = {"买入票": "conclusion_buy", "涨跌%": "change_pct", "价格": "price", "卖出票": "conclusion_sell",
+              "DCF空间": "dcf_upside", "52周位置": "pos_52w", "PE": "pe"}
+with c1: sort_by = st.selectbox("排序", [k for k, c in sort_names.items() if c in view.column_names])
+with c2: ascending = st.checkbox("升序", value=False)
+if sort_by is None: st.info("快照中没有可排序的列，按原顺序显示")
+else: view = view.sort_by([(sort_names[sort_by], "ascending" if ascending else "descending")])
+
+cols = [c for c in COLUMN_NAMES if c in view.column_names]
+st.dataframe(view.select(cols).rename_columns([COLUMN_NAMES[c] for c in cols]), use_container_width=True, hide_index=True)
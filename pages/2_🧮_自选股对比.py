@@ -0,0 +1,66 @@
+"""
+自选股对比 - 滚动收益相关系数热力图、相对基准Beta、相对强弱排名
+矩阵对象按（代码列表, 基准, 窗口）缓存，所有会话共享；之后每次请求只把新交易日推入滚动协方差
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+import analysis
+from watchlist import Watchlist, closes_panel, cluster_order, load_frames
+
+st.set_page_config(page_title="自选股对比", page_icon="🧮", layout="wide")
+
+COLUMN_NAMES = {"close": "收盘", "beta": "Beta", "corr_benchmark": "与基准相关", "ret_63": "3月%", "ret_126": "6月%",
+                "ret_252": "12月%", "rs_score": "RS得分", "rs_rank": "RS排名"}
+
+
+@st.cache_resource(ttl=300, max_entries=32)
+def load_closes(symbols, period):
+    return closes_panel(load_frames(list(symbols), period))
+
+
+@st.cache_resource(ttl=24 * 3600, max_entries=32)
+def get_watchlist(symbols, benchmark, window, period):
+    # 过期后按最新收盘价重建一次，期间每次请求只增量推入新交易日
+    return Watchlist(load_closes(symbols, period), benchmark, window)
+
+
+st.markdown("## 🧮 自选股对比")
+default = " ".join(info["full_code"] for info in analysis.STOCK_DATABASE.values())
+c1, c2, c3 = st.columns([4, 1, 1])
+with c1: text = st.text_area("代码（空格/逗号/换行分隔）", default, height=80)
+with c2: benchmark = st.text_input("基准", "SPY").strip().upper()
+with c3: window = st.selectbox("相关窗口（交易日）", [20, 60, 120, 250], index=1)
+
+codes = [analysis.STOCK_DATABASE.get(t.upper(), {}).get("full_code", t.upper()) for t in text.replace(",", " ").split()]
+symbols = tuple(dict.fromkeys(codes + ([benchmark] if benchmark else [])))
+if len(symbols) < 2:
+    st.info("请至少输入两个代码")
+    st.stop()
+
+with st.spinner(f"加载 {len(symbols)} 个代码..."):
+    wl = get_watchlist(symbols, benchmark, window, "2y")
+    wl.extend(load_closes(symbols, "2y"))
+if len(wl.symbols) < 2:
+    st.error("有数据的代码不足两个")
+    st.stop()
+missing = [s for s in symbols if s not in wl.symbols]
+st.caption(f"{len(wl.symbols)} 个代码 | 截至 {wl.closes.index[-1].date()} | 窗口 {window} 日"
+           + (f" | 无数据: {', '.join(missing)}" if missing else ""))
+if wl.benchmark is None: st.warning(f"基准 {benchmark} 无数据，Beta 与超额强弱不可用")
+
+corr = wl.correlation()
+order = cluster_order(corr.to_numpy())
+names = [wl.symbols[i] for i in order]
+z = corr.to_numpy()[np.ix_(order, order)].astype(np.float32)
+fig = go.Figure(go.Heatmap(z=z, x=names, y=names, zmin=-1, zmax=1, colorscale="RdBu_r", hoverongaps=False))
+size = min(900, 200 + 12 * len(names))
+fig.update_layout(height=size, margin=dict(l=0, r=0, t=10, b=0), yaxis_autorange="reversed",
+                  xaxis_showticklabels=len(names) <= 80, yaxis_showticklabels=len(names) <= 80)
+st.plotly_chart(fig, use_container_width=True)
+
+table = wl.table()
+for c in ("ret_63", "ret_126", "ret_252"): table[c] = table[c] * 100
+table = table.sort_values("rs_rank", ascending=False)
+st.dataframe(table.rename(columns=COLUMN_NAMES).round(3), use_container_width=True)
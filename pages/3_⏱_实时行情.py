@@ -0,0 +1,68 @@
+"""
+实时行情 - 后台线程消费逐笔数据源聚合成分钟K线，页面中只有行情区域按秒自动刷新（st.fragment），不重跑整个脚本
+数据源：STOCK_TICK_FILE 指定的回放文件，或随机游走的合成行情
+"""
+
+import streamlit as st
+from chart_data import price_figure
+from ticks import TICK_FILE, FileReplay, SyntheticTicks, TickIngest
+
+st.set_page_config(page_title="实时行情", page_icon="⏱", layout="wide")
+
+
+def _stop(feed):
+    feed.stop.set()
+
+
+@st.cache_resource(max_entries=1, on_release=_stop)
+def get_feed(kind, path, speed, n_symbols):
+    # 同一参数的行情流所有会话共享；只保留一个，换参数或点击重新开始时新建，被替换的接收线程随即停止
+    source = FileReplay(path, speed=speed) if kind == "文件回放" else SyntheticTicks(n_symbols, rate=n_symbols * 20, seconds=6.5 * 3600, realtime=True)
+    return TickIngest(source.symbols).start(source)
+
+
+st.markdown("## ⏱ 实时行情")
+c1, c2, c3, c4 = st.columns([1, 2, 1, 1])
+with c1: kind = st.radio("数据源", ["文件回放", "合成行情"], index=0 if TICK_FILE else 1)
+with c2: path = st.text_input("回放文件（csv/parquet）", TICK_FILE or "", disabled=kind != "文件回放")
+with c3: speed = st.select_slider("回放倍速", [1, 10, 60, 300, 0], value=60, format_func=lambda v: "最快" if v == 0 else f"{v}x",
+                                  disabled=kind != "文件回放")
+with c4: n_symbols = st.number_input("合成代码数", 10, 10_000, 500, step=100, disabled=kind != "合成行情")
+
+if kind == "文件回放" and not path:
+    st.info("请填写回放文件路径，或设置环境变量 STOCK_TICK_FILE")
+    st.stop()
+try:
+    feed = get_feed(kind, path, speed or None, n_symbols)
+except (OSError, KeyError, ValueError) as e:
+    st.error(f"无法打开数据源: {e}")
+    st.stop()
+if st.button("重新开始"):
+    get_feed.clear()
+    st.rerun()
+
+c1, c2 = st.columns([3, 1])
+with c1: symbol = st.selectbox("代码", feed.symbols)
+with c2: interval = st.radio("周期", list(feed.rings), horizontal=True)
+
+
+@st.fragment(run_every=1.0)
+def live(feed, symbol, interval):
+    s = feed.stats()
+    status = "已结束" if s.get("done") else "接收中"
+    st.caption(f"{status} | 数据时间 {s['last_ts']} | 逐笔 {s.get('ticks', 0):,} | 批次 {s.get('batches', 0):,} | "
+               f"迟到丢弃 {s.get('dropped', 0):,} | 活跃代码 {s['active']}/{s['symbols']}")
+    if s["error"]: st.error(f"数据源异常: {s['error']}")
+    d = feed.frame(symbol, interval)
+    if len(d):
+        fig = price_figure(d, height=380)
+        fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', xaxis_rangeslider_visible=False)
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("该代码暂无成交")
+    st.markdown("#### 涨跌幅榜（缓冲区内）")
+    st.dataframe(feed.movers(interval, 10).round(3).rename(columns={"price": "最新价", "change_pct": "涨跌%", "volume": "成交量"}),
+                 use_container_width=True)
+
+
+live(feed, symbol, interval)
@@ -0,0 +1,169 @@
+"""
+多品种面板指标引擎 - N个品种 × T根K线的对齐二维数组一次算完全部指标
+与 analysis.calculate_indicators 同一套公式，结果与该品种单独计算一致
+按日期并集对齐后，某品种不存在的日期（上市前、停牌、各市场假日不同）收盘/最高/最低/成交量全为NaN，
+计算前把每行存在的K线压缩到一起，窗口不会被这些空位打断，算完再放回原位置
+"""
+
+import numpy as np
+import pandas as pd
+from trail import _compress, _expand, trail_indicators
+
+COLUMNS = ["MA5", "MA10", "MA20", "MA60", "VWAP", "MACD", "MACD_Signal", "RSI", "K", "D", "J",
+           "BB_Mid", "BB_Std", "BB_Up", "BB_Down", "ATR", "Supertrend", "Supertrend_Dir", "PSAR",
+           "Chandelier_Long", "Chandelier_Short"]
+
+
+def _prefix(x):
+    """按行前缀和与有效计数；先减去行均值再累加，降低长序列累加的精度损失"""
+    valid = ~np.isnan(x)
+    center = np.where(valid, x, 0.0).sum(axis=1, keepdims=True) / np.maximum(valid.sum(axis=1, keepdims=True), 1)
+    return np.cumsum(np.where(valid, x - center, 0.0), axis=1), np.cumsum(valid, axis=1), center
+
+
+def _window_sum(prefix, m):
+    """窗口内m个值全部有效才输出，等价于 rolling(m).sum()"""
+    cs, cn, center = prefix
+    s, n = cs.copy(), cn.copy()
+    s[:, m:] -= cs[:, :-m]
+    n[:, m:] -= cn[:, :-m]
+    s += m * center
+    s[n < m] = np.nan
+    return s
+
+
+def rolling_mean(x, m, prefix=None):
+    return _window_sum(prefix or _prefix(x), m) / m
+
+
+def rolling_std(x, m, prefix=None):
+    """样本标准差(ddof=1)，与 rolling(m).std() 一致"""
+    prefix = prefix or _prefix(x)
+    center = prefix[2]
+    s1 = _window_sum(prefix, m) - m * center
+    s2 = _window_sum(_prefix((x - center) ** 2), m)
+    var = (s2 - s1 * s1 / m) / (m - 1)
+    return np.sqrt(np.maximum(var, 0.0))
+
+
+def _rolling_reduce(x, m, fn):
+    # 错位两两比较，窗口内有NaN时结果为NaN，与 min_periods=m 一致
+    out = np.full(x.shape, np.nan)
+    T = x.shape[1]
+    if T >= m:
+        acc = x[:, m - 1:].copy()
+        for k in range(1, m): fn(acc, x[:, m - 1 - k:T - k], out=acc)
+        out[:, m - 1:] = acc
+    return out
+
+
+def rolling_min(x, m):
+    return _rolling_reduce(x, m, np.minimum)
+
+
+def rolling_max(x, m):
+    return _rolling_reduce(x, m, np.maximum)
+
+
+def ewm_mean(x, span, out=None):
+    """ewm(span).mean()，adjust=True；NaN处沿用上一个值，首个有效值之前为NaN
+    分块闭式递推：块内 num_j = w^j (w*num_prev + cumsum(x_i w^-i))，块长保证 w^-B 不溢出
+    """
+    w = 1 - 2.0 / (span + 1)
+    x = np.asarray(x, dtype=np.float64)
+    valid = ~np.isnan(x)
+    if w == 0:
+        last = np.maximum.accumulate(np.where(valid, np.arange(x.shape[-1]), 0), axis=-1)
+        return np.take_along_axis(x, last, axis=-1)
+    # 无NaN时分母只与位置有关，不必再分配一份有效标记数组
+    xs, vs = (x, None) if valid.all() else (np.where(valid, x, 0.0), valid.astype(np.float64))
+    del valid
+    T = x.shape[-1]
+    B = max(1, min(T, int(200 / -np.log(w))))
+    up, down = w ** -np.arange(B), w ** np.arange(B)
+    cu = np.cumsum(up)
+    num, den = np.zeros(x.shape[:-1]), np.zeros(x.shape[:-1])
+    if out is None: out = np.empty(x.shape)
+    for s in range(0, T, B):
+        e = min(s + B, T)
+        u, dn = up[:e - s], down[:e - s]
+        bn = dn * (w * num[..., None] + np.cumsum(xs[..., s:e] * u, axis=-1))
+        bd = dn * (w * den[..., None] + (cu[:e - s] if vs is None else np.cumsum(vs[..., s:e] * u, axis=-1)))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            np.divide(bn, bd, out=out[..., s:e])
+        num, den = bn[..., -1], bd[..., -1]
+    return out
+
+
+def _started(x):
+    """每个品种首个有效值及之后为True"""
+    return np.maximum.accumulate(~np.isnan(x), axis=1)
+
+
+def rsi(close, n=14):
+    """差分NaN按0计入（同 dl.where(dl>0,0)），上市前的位置不计入窗口"""
+    started = _started(close)
+    dl = np.diff(close, axis=1, prepend=np.nan)
+    g = np.where(dl > 0, dl, 0.0)
+    l = np.where(dl < 0, -dl, 0.0)
+    g[~started], l[~started] = np.nan, np.nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return 100 - (100 / (1 + rolling_mean(g, n) / rolling_mean(l, n)))
+
+
+def kdj(close, high, low, n=9, m=3):
+    low_min, high_max = rolling_min(low, n), rolling_max(high, n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        k = 100 * (close - low_min) / (high_max - low_min)
+    d = rolling_mean(k, m)
+    return k, d, 3 * k - 2 * d
+
+
+def calculate_indicators_panel(close, high, low, volume):
+    """输入 (N, T) 数组，返回 {指标名: (N, T) 数组}；四列全为NaN的位置视为该品种当天没有K线，输出NaN"""
+    close, high, low, volume = (np.asarray(a, dtype=np.float64) for a in (close, high, low, volume))
+    present = ~(np.isnan(close) & np.isnan(high) & np.isnan(low) & np.isnan(volume))
+    (close, high, low, volume), index = _compress(present, close, high, low, volume)
+    out = {}
+    prefix = _prefix(close)
+    for m in [5, 10, 20, 60]: out[f'MA{m}'] = rolling_mean(close, m, prefix)
+
+    # VWAP: 累加时跳过NaN，NaN处输出NaN
+    pv = close * volume
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vwap = np.nancumsum(pv, axis=1) / np.nancumsum(volume, axis=1)
+    vwap[np.isnan(pv) | np.isnan(volume)] = np.nan
+    out['VWAP'] = vwap
+
+    out['MACD'] = ewm_mean(close, 12) - ewm_mean(close, 26)
+    out['MACD_Signal'] = ewm_mean(out['MACD'], 9)
+
+    out['RSI'] = rsi(close, 14)
+    out['K'], out['D'], out['J'] = kdj(close, high, low, 9, 3)
+
+    out['BB_Mid'] = out['MA20']
+    out['BB_Std'] = rolling_std(close, 20, prefix)
+    out['BB_Up'], out['BB_Down'] = out['BB_Mid'] + 2 * out['BB_Std'], out['BB_Mid'] - 2 * out['BB_Std']
+
+    out.update(trail_indicators(high, low, close))
+    return {k: _expand(index, v, 0.0 if k == 'Supertrend_Dir' else np.nan) for k, v in out.items()}
+
+
+def panel_from_frames(frames):
+    """{代码: OHLCV DataFrame} 按日期并集对齐，返回 (symbols, index, {列: (N, T) 数组})"""
+    symbols = list(frames)
+    index = frames[symbols[0]].index
+    for s in symbols[1:]: index = index.union(frames[s].index)
+    arrays = {c: np.vstack([frames[s][c].reindex(index).to_numpy(dtype=np.float64) for s in symbols])
+              for c in ["Open", "High", "Low", "Close", "Volume"]}
+    return symbols, index, arrays
+
+
+def panel_frame(result, symbols, index, symbol, arrays=None):
+    """取出单个品种的结果为DataFrame，列名与 calculate_indicators 相同"""
+    i = symbols.index(symbol)
+    cols = {}
+    if arrays is not None: cols.update({c: a[i] for c, a in arrays.items()})
+    cols.update({c: result[c][i] for c in COLUMNS})
+    df = pd.DataFrame(cols, index=index)
+    return df.loc[df['Close'].first_valid_index():] if arrays is not None else df
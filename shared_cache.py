@@ -0,0 +1,205 @@
+"""
+跨进程共享缓存 - 多个 Streamlit worker 共用一份缓存，同一键的并发未命中只触发一次上游请求
+后端：本地 SQLite（默认，WAL模式，写入累计超过容量1/16时按总字节数LRU淘汰）或 Redis（需安装 redis，淘汰交给服务端 maxmemory-policy）
+合并分两层：进程内同键线程等待领头线程的结果（领头失败时抛同一异常，超过租约未完成由一个等待方接替）；
+进程间通过带过期时间的租约，拿不到租约的一方轮询结果，租约释放或过期后由下一个抢到租约的进程执行
+值用 pickle 序列化，只应指向受信任的本地文件或内网 Redis
+环境变量: STOCK_CACHE_URL（sqlite:///路径 或 redis://主机），STOCK_CACHE_MAX_MB（SQLite容量，默认512）
+"""
+
+import os
+import time
+import uuid
+import pickle
+import sqlite3
+import threading
+from collections import Counter
+
+CACHE_URL = os.environ.get("STOCK_CACHE_URL")
+CACHE_MAX_MB = float(os.environ.get("STOCK_CACHE_MAX_MB", "512"))
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".shared_cache.sqlite")
+
+
+class SQLiteBackend:
+    """entries 表存值，leases 表做跨进程租约；每线程一个连接
+    淘汰要对全表求和，不在每次 set 时做：本进程写入累计超过 max_bytes/16 时才检查一次"""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=int(CACHE_MAX_MB * 2 ** 20)):
+        self.path, self.max_bytes = path, max_bytes
+        self.written, self.evict_every = 0, max_bytes // 16
+        self._local = threading.local()
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL, size INTEGER)")
+        db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+        db.execute("CREATE INDEX IF NOT EXISTS entries_expires ON entries(expires)")
+        db.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT, expires REAL)")
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def get(self, key):
+        now = time.time()
+        row = self._db().execute("SELECT value, expires, accessed FROM entries WHERE key=?", (key,)).fetchone()
+        if row is None or row[1] < now: return None
+        # 访问时间精确到秒即可，减少写放大
+        if now - row[2] > 1: self._db().execute("UPDATE entries SET accessed=? WHERE key=?", (now, key))
+        return row[0]
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        db = self._db()
+        db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", (key, value, now + ttl, now, len(value)))
+        self.written += len(value)
+        if self.written > self.evict_every: self.evict(now)
+
+    def evict(self, now=None, batch=64):
+        """先删过期项，总大小仍超限时沿 accessed 索引从最旧开始分批删除"""
+        self.written = 0
+        db = self._db()
+        db.execute("DELETE FROM entries WHERE expires < ?", (now or time.time(),))
+        excess = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0] - self.max_bytes
+        while excess > 0:
+            rows = db.execute("SELECT key, size FROM entries ORDER BY accessed LIMIT ?", (batch,)).fetchall()
+            if not rows: break
+            drop = []
+            for key, size in rows:
+                if excess <= 0: break
+                drop.append((key,))
+                excess -= size
+            db.executemany("DELETE FROM entries WHERE key=?", drop)
+
+    def acquire(self, key, owner, lease):
+        now = time.time()
+        db = self._db()
+        db.execute("DELETE FROM leases WHERE key=? AND expires < ?", (key, now))
+        return db.execute("INSERT OR IGNORE INTO leases VALUES (?, ?, ?)", (key, owner, now + lease)).rowcount == 1
+
+    def release(self, key, owner):
+        self._db().execute("DELETE FROM leases WHERE key=? AND owner=?", (key, owner))
+
+    def size(self):
+        return self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+
+class RedisBackend:
+    """键带前缀；租约用 SET NX PX，释放时校验持有者"""
+
+    _RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+    def __init__(self, url, prefix="stock:"):
+        import redis
+        self.r, self.prefix = redis.Redis.from_url(url), prefix
+        self._release = self.r.register_script(self._RELEASE)
+
+    def get(self, key):
+        return self.r.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.r.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    def acquire(self, key, owner, lease):
+        return bool(self.r.set(self.prefix + "lease:" + key, owner, nx=True, px=int(lease * 1000)))
+
+    def release(self, key, owner):
+        self._release(keys=[self.prefix + "lease:" + key], args=[owner])
+
+    def size(self):
+        return self.r.dbsize(), None
+
+
+def from_url(url=CACHE_URL):
+    if url and url.startswith("redis"): return SharedCache(RedisBackend(url))
+    path = url[len("sqlite:///"):] if url and url.startswith("sqlite:///") else DEFAULT_PATH
+    return SharedCache(SQLiteBackend(path))
+
+
+class _Flight:
+    """进程内一次未命中的执行，等待方从这里取结果或异常
+    owner 是这次执行的租约令牌：接替的执行用新令牌，原领头线程晚些结束时释放不掉接替方的租约"""
+
+    def __init__(self):
+        self.event, self.started = threading.Event(), time.monotonic()
+        self.owner = uuid.uuid4().hex
+        self.value, self.error = None, None
+
+
+class SharedCache:
+    """get_or_compute 为唯一入口；stats 统计命中、未命中（=上游请求数）、被合并的等待次数"""
+
+    def __init__(self, backend, name="shared_cache", lease=30, poll=0.05):
+        self.backend, self.name = backend, name
+        self.lease, self.poll = lease, poll
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+    def _load(self, key):
+        raw = self.backend.get(key)
+        return None if raw is None else (pickle.loads(raw),)
+
+    def _record(self, hit, coalesced=False):
+        import instrument
+        with self.lock:
+            self.counts["hits" if hit else "misses"] += 1
+            if coalesced: self.counts["coalesced"] += 1
+        instrument.REGISTRY.cache_result(self.name, hit)
+        m = instrument.current()
+        if m: m.cache[self.name] = "hit" if hit else "miss"
+
+    def get_or_compute(self, key, fn, ttl=300, cache_if=None):
+        """命中直接返回；未命中时同键只有一个调用方执行 fn，其余等待其结果。cache_if(结果) 为假时不写缓存"""
+        found = self._load(key)
+        if found:
+            self._record(True)
+            return found[0]
+        while True:
+            with self.lock:
+                flight = self.flights.get(key)
+                # 领头线程超过租约仍未完成时，第一个发现的等待方接替领头，其余继续等新的领头
+                leader = flight is None or time.monotonic() - flight.started > self.lease
+                if leader: flight = self.flights[key] = _Flight()
+            if leader: break
+            if not flight.event.wait(max(0.0, flight.started + self.lease - time.monotonic())): continue
+            if flight.error is not None: raise flight.error
+            # 已写缓存时各自反序列化一份，避免多个调用方共享同一对象；cache_if 拒绝的结果直接共用
+            found = self._load(key)
+            self._record(True, coalesced=True)
+            return found[0] if found else flight.value
+        try:
+            flight.value = self._lead(key, fn, ttl, cache_if, flight.owner)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                if self.flights.get(key) is flight: del self.flights[key]
+            flight.event.set()
+
+    def _lead(self, key, fn, ttl, cache_if, owner):
+        # 其他进程持有租约时轮询其结果；对方释放（含失败）或租约过期后，只有一个进程能抢到租约接着执行
+        while not self.backend.acquire(key, owner, self.lease):
+            time.sleep(self.poll)
+            found = self._load(key)
+            if found:
+                self._record(True, coalesced=True)
+                return found[0]
+        try:
+            self._record(False)
+            value = fn()
+            if cache_if is None or cache_if(value):
+                self.backend.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+            return value
+        finally:
+            self.backend.release(key, owner)
+
+    def stats(self):
+        entries, size = self.backend.size()
+        with self.lock: counts = dict(self.counts)
+        total = counts.get("hits", 0) + counts.get("misses", 0)
+        return {**counts, "hit_rate": counts.get("hits", 0) / total if total else None, "entries": entries, "bytes": size}
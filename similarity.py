@@ -0,0 +1,194 @@
+"""
+历史形态相似度搜索 - 给定最近N根K线，在单个品种或整个本地库中找出Z标准化后最相近的K段，并统计其后走势
+距离用 MASS（FFT滑动点积 + 窗口均值/标准差），索引预先保存各品种的分块FFT与各窗口长度的滚动统计，
+每次查询每种块长只需一次查询序列FFT和一次逆FFT，百万级窗口也在交互延迟内；品种K线更新时只重算该品种的FFT
+"""
+
+import numpy as np
+
+HORIZONS = (5, 10, 20)
+
+
+BLOCK = 1 << 16  # 分块FFT长度（overlap-save），查询FFT只需这么长
+
+
+class PatternIndex:
+    """多个品种的对数收盘价首尾拼接成一条序列；跨品种、含NaN、零波动的窗口不参与匹配"""
+
+    def __init__(self, max_len=256):
+        self.max_len = max_len
+        self.series = {}  # 代码 -> (对数收盘价, 时间索引)
+        self.versions = {}  # 代码 -> 本地库版本（from_store/updated 填入）
+        self._parts = {}  # 代码 -> 去均值序列、NaN掩码、块长与分块FFT，序列不变时沿用
+        self._built = False
+
+    def add(self, symbol, close, index=None):
+        close = np.asarray(close, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.series[symbol] = (np.log(close), index)
+        self._parts.pop(symbol, None)
+        self._built = False
+        return self
+
+    @classmethod
+    def from_store(cls, store, symbols=None, max_len=256):
+        return cls(max_len).updated(store, {s: store.version(s) for s in symbols or store.symbols()})
+
+    def updated(self, store, versions):
+        """按 {代码: 版本} 得到新索引：版本未变的品种沿用本索引的序列与分块FFT，只从 store 读取变化的品种；
+        全无变化时返回自身。返回新对象而不原地修改，正在查询旧索引的线程不受影响"""
+        if versions == self.versions and self._built: return self
+        import pandas as pd
+        idx = PatternIndex(self.max_len)
+        for s, v in versions.items():
+            if s in self.series and self.versions.get(s) == v:
+                idx.series[s] = self.series[s]
+                if s in self._parts: idx._parts[s] = self._parts[s]
+            else:
+                stored = store.load(s)
+                if stored is None: continue
+                ts, values, meta = stored
+                index = pd.to_datetime(np.asarray(ts), utc=True).tz_convert(meta.get("tz") or "UTC")
+                idx.add(s, values[:, 3], index)
+            idx.versions[s] = v
+        return idx.build()
+
+    def _part(self, symbol):
+        """单个品种去均值（窗口不跨品种，z标准化不受影响，减小FFT与前缀和的数值误差）后的分块FFT（overlap-save）"""
+        if symbol not in self._parts:
+            p = self.series[symbol][0]
+            x = p - np.nanmean(p) if np.isfinite(p).any() else p
+            nan = ~np.isfinite(x)
+            x = np.where(nan, 0.0, x)
+            B = min(BLOCK, 1 << int(np.ceil(np.log2(max(len(x) + self.max_len, 2)))))
+            S = B - self.max_len + 1
+            blocks = np.zeros((max(1, -(-len(x) // S)), B))
+            for b in range(len(blocks)):
+                chunk = x[b * S:b * S + B]
+                blocks[b, :len(chunk)] = chunk
+            self._parts[symbol] = (x, nan, B, np.fft.rfft(blocks, axis=1))
+        return self._parts[symbol]
+
+    def build(self):
+        """拼接各品种序列与前缀和；分块FFT按品种计算并缓存，块长相同的品种叠在一起，查询时每种块长一次逆FFT"""
+        self.symbols = list(self.series)
+        parts = [self._part(s) for s in self.symbols]
+        self.starts = np.cumsum([0] + [len(p[0]) for p in parts])
+        self.x = np.concatenate([p[0] for p in parts]) if parts else np.zeros(0)
+        self.nan = np.concatenate([p[1] for p in parts]) if parts else np.zeros(0, dtype=bool)
+        self.seg = np.repeat(np.arange(len(parts)), np.diff(self.starts))
+        self.nblocks = [len(p[3]) for p in parts]
+        self.groups = {}  # 块长 -> 该块长的品种序号
+        for g, p in enumerate(parts): self.groups.setdefault(p[2], []).append(g)
+        self.XB = {}
+        for B, gs in self.groups.items():
+            self.XB[B] = np.concatenate([parts[g][3] for g in gs])
+            # 品种缓存改指叠好的数组中的视图，避免同一份FFT存两份
+            off = 0
+            for g in gs:
+                s, (x, nan, _, _) = self.symbols[g], parts[g]
+                self._parts[s] = (x, nan, B, self.XB[B][off:off + self.nblocks[g]])
+                off += self.nblocks[g]
+        self.cs = np.concatenate([[0.0], np.cumsum(self.x)])
+        self.cs2 = np.concatenate([[0.0], np.cumsum(self.x * self.x)])
+        self.cnan = np.concatenate([[0], np.cumsum(self.nan)])
+        self._stats = {}
+        self._built = True
+        return self
+
+    def _window_stats(self, m):
+        """长度m的窗口 1/(m*标准差) 与无效窗口下标（缓存）"""
+        if m not in self._stats:
+            n = len(self.x) - m + 1
+            mu = (self.cs[m:] - self.cs[:-m]) / m
+            var = (self.cs2[m:] - self.cs2[:-m]) / m - mu * mu
+            sigma = np.sqrt(np.maximum(var, 0.0))
+            s = np.arange(n)
+            valid = (self.seg[s] == self.seg[s + m - 1]) & (self.cnan[m:] == self.cnan[:-m]) & (sigma > 1e-9)
+            with np.errstate(divide="ignore"):
+                inv = np.where(valid, 1.0 / (m * sigma), 0.0)
+            self._stats[m] = (inv, valid)
+        return self._stats[m]
+
+    def _invalid(self, m, future):
+        """无效窗口下标；future>0 时还要求匹配段之后同一品种内至少有 future 根K线"""
+        key = (m, future)
+        if key not in self._stats:
+            inv, valid = self._window_stats(m)
+            if future:
+                n = len(inv)
+                valid = valid & (np.arange(n) + m - 1 + future < self.starts[self.seg[:n] + 1])
+            self._stats[key] = np.flatnonzero(~valid)
+        return self._stats[key]
+
+    def _correlation(self, query, future=0):
+        """查询与每个窗口的皮尔逊相关系数，无效窗口为 -inf；z标准化欧氏距离 d = sqrt(2m(1-corr))"""
+        if not self._built: self.build()
+        q = np.log(np.asarray(query, dtype=np.float64))
+        m = len(q)
+        if m > self.max_len: raise ValueError(f"查询长度超过索引上限 {self.max_len}")
+        n = max(len(self.x) - m + 1, 0)
+        q = q - q.mean()
+        qs = np.sqrt((q * q).mean())
+        if m < 3 or n == 0 or not qs > 1e-12: return np.full(n, -np.inf)
+        inv, _ = self._window_stats(m)
+        # 查询已去均值，sum(q_i * x_{s+i}) 即协方差项，无需再减 m*mu_q*mu_x
+        qt = np.zeros(n)
+        for B, gs in self.groups.items():
+            S = B - self.max_len + 1
+            full = np.fft.irfft(self.XB[B] * np.fft.rfft(q[::-1], B), B, axis=1)[:, m - 1:m - 1 + S].ravel()
+            off = 0
+            for g in gs:
+                a, k = int(self.starts[g]), max(int(self.starts[g + 1] - self.starts[g]) - m + 1, 0)
+                qt[a:a + k] = full[off:off + k]
+                off += self.nblocks[g] * S
+        qt *= inv
+        qt *= 1.0 / qs
+        qt[self._invalid(m, future)] = -np.inf
+        return qt
+
+    def distance_profile(self, query):
+        """z标准化欧氏距离，对每个窗口起点一个值；无效窗口为 inf"""
+        corr = self._correlation(query)
+        return np.sqrt(np.maximum(2 * len(query) * (1 - np.minimum(corr, 1.0)), 0.0))
+
+    def search(self, query, k=10, horizons=HORIZONS, exclude=None, require_future=True):
+        """返回最相近的k段：代码、起止位置与时间、距离及之后各周期收益
+        exclude=(代码, 起点) 排除查询自身附近的窗口；相邻匹配之间至少相隔 m/2 根，避免同一段重复命中
+        """
+        m = len(query)
+        corr = self._correlation(query, max(horizons) if require_future else 0)
+        if exclude is not None and exclude[0] in self.series:
+            base = int(self.starts[self.symbols.index(exclude[0])]) + exclude[1]
+            corr[max(0, base - m):max(0, base + m)] = -np.inf
+        zone = max(1, m // 2)
+        # 贪心选第j个时最多排除了 (j-1)(2*zone+1) 个窗口，候选取前 (k-1)(2*zone+1)+1 个即足够
+        top = min(len(corr), (k - 1) * (2 * zone + 1) + 1)
+        if top == 0: return []
+        cand = np.argpartition(-corr, top - 1)[:top]
+        cand = cand[np.argsort(-corr[cand], kind="stable")]
+        picked = []
+        for i in cand.tolist():
+            if len(picked) == k or not np.isfinite(corr[i]): break
+            if all(abs(i - j) > zone for j in picked): picked.append(i)
+        out = []
+        for i in picked:
+            g = int(self.seg[i])
+            sym, start = self.symbols[g], i - int(self.starts[g])
+            logp, index = self.series[sym]
+            end = start + m - 1
+            fwd = {h: float(np.exp(logp[end + h] - logp[end]) - 1) if end + h < len(logp) else None for h in horizons}
+            out.append({"symbol": sym, "start": start, "end": end, "distance": float(np.sqrt(max(2 * m * (1 - min(corr[i], 1.0)), 0.0))),
+                        "start_date": str(index[start]) if index is not None else None,
+                        "end_date": str(index[end]) if index is not None else None, "forward": fwd})
+        return out
+
+
+def summarize(matches, horizons=HORIZONS):
+    """各周期后续收益的均值、中位数与上涨比例"""
+    out = {}
+    for h in horizons:
+        r = np.array([x["forward"][h] for x in matches if x["forward"].get(h) is not None])
+        out[h] = {"n": len(r), "mean": float(r.mean()) if len(r) else None,
+                  "median": float(np.median(r)) if len(r) else None, "up": float((r > 0).mean()) if len(r) else None}
+    return out
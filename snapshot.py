@@ -0,0 +1,161 @@
+"""
+全市场信号快照 - 定时批处理，对代码表跑完整信号栈（技术信号/威科夫/形态/多空票数）与批量估值，写入带版本号的列式文件
+文件为未压缩的 Arrow IPC，读取端内存映射后列直接引用映射页（压缩文件须整表解压，做不到）；
+latest 指针文件原子替换，读者永远看到完整快照
+用法: python snapshot.py                          # 代码表取 STOCK_UNIVERSE，未设置时用内置列表
+      python snapshot.py -f symbols.txt -j 8 --keep 7
+定时: */30 9-16 * * 1-5  cd /path/to/stock-analyzer && python snapshot.py
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+SNAPSHOT_DIR = os.environ.get("STOCK_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshots"))
+SCHEMA_VERSION = 1
+LATEST = "latest"
+
+
+def universe_symbols():
+    """{代码: 信息}，与搜索索引同一份代码表"""
+    import analysis
+    if os.environ.get("STOCK_UNIVERSE"):
+        from symbol_search import load_universe
+        return {**load_universe(os.environ["STOCK_UNIVERSE"]), **analysis.STOCK_DATABASE}
+    return dict(analysis.STOCK_DATABASE)
+
+
+def _refresh(symbols, workers):
+    """父进程先并发补齐本地K线（共享限速），子进程只读内存映射文件；返回 {代码: 失败原因}"""
+    import analysis
+    store, fetcher = analysis.get_store(), analysis.get_fetcher()
+
+    def one(s):
+        try: store.get(s, "max", fetch=fetcher.history)
+        except Exception as e: return s, str(e)
+
+    with ThreadPoolExecutor(workers) as ex: failed = dict(r for r in ex.map(one, symbols) if r)
+    if failed:
+        print(f"补齐K线失败 {len(failed)}/{len(symbols)} 个，沿用本地已有数据：" + "；".join(f"{s} {e}" for s, e in list(failed.items())[:5]),
+              file=sys.stderr)
+    return failed
+
+
+def _analyze_one(item):
+    """只读本地K线：补数据已在父进程 _refresh 中完成，子进程不再各自联网、各自限速"""
+    code, info, period = item
+    import analysis
+    from cli import flatten
+    symbol = info.get("full_code") or code
+    row = {"code": code, "market": info.get("market", "")}
+    try:
+        df = analysis.get_store().get(symbol, period, fetch=None)
+        if df is None or len(df) < 2: return {**row, "symbol": symbol, "error": "无数据"}
+        r = analysis.analyze(df)
+        r["name"] = info.get("name")
+        return {**row, **flatten({"query": code, "symbol": symbol, **r})}
+    except Exception as e:
+        return {**row, "symbol": symbol, "error": str(e)}
+
+
+VALUATION_COLUMNS = ["pe", "pe_mid", "dcf", "dcf_upside", "pos_52w", "valuation"]
+
+
+def _valuation(symbols):
+    """过期的基本面先刷新，再对整个代码表做一次批量估值"""
+    import analysis
+    from fundamentals import universe_valuation
+    store = analysis.get_fundamentals()
+    store.refresh(symbols)
+    return universe_valuation(symbols, store, analysis.get_store())[VALUATION_COLUMNS]
+
+
+def build(universe, period="1y", processes=None, refresh_workers=8, fundamentals=True):
+    """多进程计算全部代码，返回 pandas.DataFrame（每个代码一行）"""
+    import pandas as pd
+    symbols = [info.get("full_code") or c for c, info in universe.items()]
+    failed = _refresh(symbols, refresh_workers)
+    items = [(c, info, period) for c, info in universe.items()]
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(processes) as ex:
+        rows = list(ex.map(_analyze_one, items, chunksize=max(1, len(items) // (processes * 4))))
+    # 本地也没有数据的代码，把补齐失败的原因记到快照里
+    for r in rows:
+        if r.get("error") == "无数据" and r["symbol"] in failed: r["error"] = f"补齐K线失败: {failed[r['symbol']]}"
+    df = pd.DataFrame(rows)
+    if "query" in df: df = df.drop(columns="query")
+    if fundamentals: df = df.join(_valuation(symbols), on="symbol")
+    return df
+
+
+def write(df, out_dir=SNAPSHOT_DIR, keep=7, meta=None):
+    """写入 snapshot-<时间>.arrow，更新 latest 指针，只保留最近 keep 份（至少保留刚写的一份）"""
+    import pyarrow as pa
+    os.makedirs(out_dir, exist_ok=True)
+    created = time.strftime("%Y%m%dT%H%M%S")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"schema_version": str(SCHEMA_VERSION).encode(),
+                                           b"created": created.encode(), **{k.encode(): str(v).encode() for k, v in (meta or {}).items()}})
+    name = f"snapshot-{created}.arrow"
+    tmp = os.path.join(out_dir, name + ".tmp")
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as w:
+        w.write_table(table)
+    os.replace(tmp, os.path.join(out_dir, name))
+    with open(os.path.join(out_dir, LATEST + ".tmp"), "w") as f: f.write(name)
+    os.replace(os.path.join(out_dir, LATEST + ".tmp"), os.path.join(out_dir, LATEST))
+    snapshots = sorted(f for f in os.listdir(out_dir) if f.startswith("snapshot-") and f.endswith(".arrow"))
+    for old in snapshots[:max(0, len(snapshots) - max(1, keep))]:
+        os.remove(os.path.join(out_dir, old))
+    return os.path.join(out_dir, name)
+
+
+def latest_path(out_dir=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(out_dir, LATEST)) as f: return os.path.join(out_dir, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def read(path):
+    """内存映射打开快照，返回 (pyarrow.Table, 元数据字典)；未压缩的文件各列零拷贝引用映射页"""
+    import pyarrow as pa
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    meta = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items() if k != b"pandas"}
+    if int(meta.get("schema_version", 0)) != SCHEMA_VERSION: raise ValueError(f"快照版本不兼容: {meta.get('schema_version')}")
+    return table, meta
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="生成全市场信号快照")
+    p.add_argument("symbols", nargs="*", help="代码，缺省为整个代码表")
+    p.add_argument("-f", "--file", help="代码列表文件，每行一个")
+    p.add_argument("--period", default="1y")
+    p.add_argument("-j", "--processes", type=int, help="计算进程数，默认CPU核数")
+    p.add_argument("-o", "--out-dir", default=SNAPSHOT_DIR)
+    p.add_argument("--keep", type=int, default=7, help="保留的历史快照份数（至少1）")
+    p.add_argument("--no-fundamentals", action="store_true", help="不刷新基本面、不计算估值列")
+    args = p.parse_args(argv)
+
+    universe = universe_symbols()
+    codes = list(args.symbols)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            codes += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if codes:
+        # 代码或完整代码（如 600519 / 600519.SS）都能匹配到代码表
+        by_full = {info.get("full_code", c).upper(): (c, info) for c, info in universe.items()}
+        found = [by_full.get(c.upper()) or (c.upper(), universe.get(c.upper(), {"full_code": c.upper()})) for c in codes]
+        universe = dict(found)
+
+    t0 = time.perf_counter()
+    df = build(universe, args.period, args.processes, fundamentals=not args.no_fundamentals)
+    path = write(df, args.out_dir, args.keep, {"period": args.period})
+    failed = int(df["error"].notna().sum()) if "error" in df else 0
+    print(f"{path}: {len(df)} 个代码，失败 {failed}，耗时 {time.perf_counter() - t0:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+流式指标引擎 - 每来一根K线按O(1)更新全部指标，支持修正未收盘的最后一根
+状态只保存已收盘K线，最新一根作为待定值叠加计算，因此修正时无需回滚
+输出与 analysis.calculate_indicators 在同一根K线上的结果一致
+"""
+
+import math
+from collections import deque
+from panel import COLUMNS
+from trail import _atr_step, _chandelier_step, _psar_step, _supertrend_step, _tr
+
+NAN = float("nan")
+
+
+def _div(a, b):
+    """与numpy浮点除法一致：除以0得到inf或NaN"""
+    if b == 0: return NAN if a == 0 or a != a else math.copysign(math.inf, a) * math.copysign(1, b)
+    return a / b
+
+
+class _Rolling:
+    """最近m根的滚动均值（运行和），保存已收盘的m-1根"""
+
+    def __init__(self, m):
+        self.m, self.buf, self.sum, self.nan = m, deque(), 0.0, 0
+
+    def peek(self, x):
+        if len(self.buf) < self.m - 1 or self.nan or x != x: return NAN
+        return (self.sum + x) / self.m
+
+    def push(self, x):
+        self.buf.append(x)
+        if x != x: self.nan += 1
+        else: self.sum += x
+        if len(self.buf) > self.m - 1:
+            y = self.buf.popleft()
+            if y != y: self.nan -= 1
+            else: self.sum -= y
+
+
+class _RollingStd:
+    """滑动窗口Welford方差，ddof=1"""
+
+    def __init__(self, m):
+        self.m, self.buf, self.mean, self.m2, self.nan = m, deque(), 0.0, 0.0, 0
+
+    def peek(self, x):
+        if len(self.buf) < self.m - 1 or self.nan or x != x: return NAN
+        d = x - self.mean
+        mean = self.mean + d / self.m
+        return math.sqrt(max(self.m2 + d * (x - mean), 0.0) / (self.m - 1))
+
+    def push(self, x):
+        self.buf.append(x)
+        if x != x: self.nan += 1
+        else:
+            n = len(self.buf) - self.nan
+            d = x - self.mean
+            self.mean += d / n
+            self.m2 += d * (x - self.mean)
+        if len(self.buf) > self.m - 1:
+            y = self.buf.popleft()
+            if y != y: self.nan -= 1; return
+            n = len(self.buf) - self.nan
+            if n == 0: self.mean, self.m2 = 0.0, 0.0; return
+            d = y - self.mean
+            self.mean -= d / n
+            self.m2 -= d * (y - self.mean)
+
+
+class _Extreme:
+    """单调队列求窗口最小/最大值"""
+
+    def __init__(self, m, is_max):
+        self.m, self.is_max = m, is_max
+        self.q, self.nans, self.n = deque(), deque(), 0
+
+    def _better(self, a, b):
+        return a >= b if self.is_max else a <= b
+
+    def peek(self, x):
+        if self.n < self.m - 1 or self.nans or x != x: return NAN
+        if not self.q: return x
+        return x if self._better(x, self.q[0][1]) else self.q[0][1]
+
+    def push(self, x):
+        i = self.n
+        self.n += 1
+        if x != x: self.nans.append(i)
+        else:
+            while self.q and self._better(x, self.q[-1][1]): self.q.pop()
+            self.q.append((i, x))
+        lo = self.n - (self.m - 1)
+        while self.q and self.q[0][0] < lo: self.q.popleft()
+        while self.nans and self.nans[0] < lo: self.nans.popleft()
+
+
+class _Ewm:
+    """ewm(span).mean() 递推，adjust=True"""
+
+    def __init__(self, span):
+        self.w, self.num, self.den = 1 - 2.0 / (span + 1), 0.0, 0.0
+
+    def _next(self, x):
+        if x != x: return self.w * self.num, self.w * self.den
+        return self.w * self.num + x, self.w * self.den + 1.0
+
+    def peek(self, x):
+        num, den = self._next(x)
+        return num / den if den else NAN
+
+    def push(self, x):
+        self.num, self.den = self._next(x)
+
+
+class StreamingIndicators:
+    """逐根K线更新指标；update() 追加新K线，revise() 修正最后一根"""
+
+    def __init__(self):
+        self.ma = {m: _Rolling(m) for m in [5, 10, 20, 60]}
+        self.bb_std = _RollingStd(20)
+        self.ema12, self.ema26, self.signal = _Ewm(12), _Ewm(26), _Ewm(9)
+        self.gain, self.loss = _Rolling(14), _Rolling(14)
+        self.low9, self.high9 = _Extreme(9, False), _Extreme(9, True)
+        self.k3 = _Rolling(3)
+        # 路径依赖指标的状态元组（见 trail），吊灯止损的窗口只推入有效K线
+        self.atr14, self.atr22 = (NAN, 0, 0.0), (NAN, 0, 0.0)
+        self.st, self.chandelier = (NAN, NAN, 0), (NAN, NAN, 0)
+        self.sar, self.prev_hl = (NAN, NAN, 0.02, 0), (NAN, NAN, NAN, NAN)
+        self.low22, self.high22 = _Extreme(22, False), _Extreme(22, True)
+        self.last_close = NAN
+        self.cum_pv, self.cum_v = 0.0, 0.0
+        self.prev_close = NAN
+        self._pending = None
+        self.values = {c: NAN for c in COLUMNS}
+
+    @classmethod
+    def from_frame(cls, df):
+        """用历史K线预热"""
+        s = cls()
+        for h, l, c, v in zip(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(), df['Volume'].to_numpy()):
+            s.update({'High': h, 'Low': l, 'Close': c, 'Volume': v})
+        return s
+
+    def update(self, bar):
+        """追加一根新K线，上一根视为已收盘"""
+        if self._pending is not None: self._commit()
+        return self._compute(bar)
+
+    def revise(self, bar):
+        """用新数据替换最后一根K线（盘中K线仍在变化）"""
+        if self._pending is None: return self.update(bar)
+        return self._compute(bar)
+
+    def _compute(self, bar):
+        h, l, c, v = (float(bar[k]) for k in ('High', 'Low', 'Close', 'Volume'))
+        out = {}
+        for m, r in self.ma.items(): out[f'MA{m}'] = r.peek(c)
+
+        # VWAP: 累计和跳过NaN
+        pv = c * v
+        out['VWAP'] = NAN if pv != pv or v != v else _div(self.cum_pv + pv, self.cum_v + v)
+
+        macd = self.ema12.peek(c) - self.ema26.peek(c)
+        out['MACD'], out['MACD_Signal'] = macd, self.signal.peek(macd)
+
+        # RSI: 差分为NaN时按0计入（同 dl.where(dl>0,0)）
+        dl = c - self.prev_close
+        g = dl if dl > 0 else 0.0
+        ls = -dl if dl < 0 else 0.0
+        out['RSI'] = 100 - _div(100, 1 + _div(self.gain.peek(g), self.loss.peek(ls)))
+
+        low_min, high_max = self.low9.peek(l), self.high9.peek(h)
+        k = 100 * _div(c - low_min, high_max - low_min)
+        d = self.k3.peek(k)
+        out['K'], out['D'], out['J'] = k, d, 3 * k - 2 * d
+
+        out['BB_Mid'], out['BB_Std'] = out['MA20'], self.bb_std.peek(c)
+        out['BB_Up'], out['BB_Down'] = out['BB_Mid'] + 2 * out['BB_Std'], out['BB_Mid'] - 2 * out['BB_Std']
+
+        trail = self._trail(h, l, c, out)
+
+        self._pending = (h, l, c, v, g, ls, macd, k, trail)
+        self.values = out
+        return out
+
+    def _trail(self, h, l, c, out):
+        """ATR/Supertrend/SAR/吊灯止损：由已收盘状态推一步，返回待提交的新状态"""
+        for name in ('ATR', 'Supertrend', 'PSAR', 'Chandelier_Long', 'Chandelier_Short'): out[name] = NAN
+        out['Supertrend_Dir'] = 0.0
+        ok = h == h and l == l and c == c
+        atr14 = atr22 = st = chandelier = sar = None
+        if ok:
+            tr = _tr(h, l, self.last_close)
+            atr14, atr22 = _atr_step(tr, 14, *self.atr14), _atr_step(tr, 22, *self.atr22)
+            out['ATR'] = atr14[0]
+            if atr14[0] == atr14[0]:
+                st = _supertrend_step(h, l, c, atr14[0], 3.0, *self.st, self.last_close)
+                out['Supertrend'], out['Supertrend_Dir'] = st[0] if st[2] == 1 else st[1], float(st[2])
+            hh, ll = self.high22.peek(h), self.low22.peek(l)
+            if hh == hh and ll == ll and atr22[0] == atr22[0]:
+                chandelier = _chandelier_step(hh, ll, c, atr22[0], 3.0, *self.chandelier, self.last_close)
+                out['Chandelier_Long'], out['Chandelier_Short'] = chandelier[0], chandelier[1]
+        if h == h and l == l:
+            sar = _psar_step(h, l, *self.prev_hl, 0.02, 0.02, 0.2, *self.sar)
+            out['PSAR'] = sar[0]
+        return ok, atr14, atr22, st, chandelier, sar
+
+    def _commit(self):
+        h, l, c, v, g, ls, macd, k, trail = self._pending
+        for r in self.ma.values(): r.push(c)
+        self.bb_std.push(c)
+        if c * v == c * v: self.cum_pv += c * v
+        if v == v: self.cum_v += v
+        self.ema12.push(c); self.ema26.push(c); self.signal.push(macd)
+        self.gain.push(g); self.loss.push(ls)
+        self.low9.push(l); self.high9.push(h); self.k3.push(k)
+        ok, atr14, atr22, st, chandelier, sar = trail
+        if ok:
+            self.atr14, self.atr22, self.last_close = atr14, atr22, c
+            self.low22.push(l); self.high22.push(h)
+            if st is not None: self.st = st
+            if chandelier is not None: self.chandelier = chandelier
+        if sar is not None: self.sar, self.prev_hl = sar, (h, l) + self.prev_hl[:2]
+        self.prev_close = c
+        self._pending = None
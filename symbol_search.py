@@ -0,0 +1,113 @@
+"""
+股票代码搜索索引 - 支持全市场数万条代码/中文名/拼音/拼音首字母
+先用前缀（有序数组二分）和n-gram倒排表缩小候选，再对少量候选做编辑距离打分，排序规则与原 fuzzy_search 相同
+"""
+
+import bisect
+import csv
+import numpy as np
+from fuzzywuzzy import fuzz
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # 可选依赖：缺失时仅使用数据文件自带的拼音列
+    lazy_pinyin = None
+
+MAX_CANDIDATES = 128
+
+
+def _pinyin(name):
+    if lazy_pinyin is None or not name: return "", ""
+    full = lazy_pinyin(name)
+    return "".join(full).lower(), "".join(p[0] for p in lazy_pinyin(name, style=Style.FIRST_LETTER) if p).lower()
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def load_universe(path):
+    """读取CSV（列：code,name,market,full_code，可选 pinyin,initials），返回 {code: info}"""
+    universe = {}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            info = {"name": row["name"], "market": row.get("market", ""), "full_code": row.get("full_code") or row["code"]}
+            if row.get("pinyin"): info["pinyin"] = row["pinyin"]
+            if row.get("initials"): info["initials"] = row["initials"]
+            universe[row["code"].strip().upper()] = info
+    return universe
+
+
+class SymbolIndex:
+    """代码搜索索引，构建一次后每次查询只对候选集打分"""
+
+    def __init__(self, universe):
+        self.codes = list(universe)
+        self.infos = [universe[c] for c in self.codes]
+        self.pos = {c: i for i, c in enumerate(self.codes)}
+        self.names = [info["name"].lower() for info in self.infos]
+        self.pinyins, self.initials = [], []
+        for info in self.infos:
+            py, ini = (info.get("pinyin", "").lower(), info.get("initials", "").lower())
+            if not py and not ini: py, ini = _pinyin(info["name"])
+            self.pinyins.append(py)
+            self.initials.append(ini)
+
+        # 前缀索引：所有可检索字段排序后二分
+        keys = []
+        for i in range(len(self.codes)):
+            for k in (self.codes[i].lower(), self.names[i], self.pinyins[i], self.initials[i]):
+                if k: keys.append((k, i))
+        keys.sort()
+        self.prefix_keys = [k for k, _ in keys]
+        self.prefix_ids = np.array([i for _, i in keys], dtype=np.int64)
+
+        # n-gram 倒排表（单字与双字）
+        postings = {}
+        for i in range(len(self.codes)):
+            text = " ".join(k for k in (self.codes[i].lower(), self.names[i], self.pinyins[i], self.initials[i]) if k)
+            for g in _grams(text, 1) | _grams(text, 2):
+                postings.setdefault(g, []).append(i)
+        self.postings = {g: np.array(ids, dtype=np.int64) for g, ids in postings.items()}
+
+    def __contains__(self, code):
+        return code in self.pos
+
+    def __len__(self):
+        return len(self.codes)
+
+    def get(self, code):
+        i = self.pos.get(code)
+        return None if i is None else self.infos[i]
+
+    def _candidates(self, q):
+        lo = bisect.bisect_left(self.prefix_keys, q)
+        hi = bisect.bisect_left(self.prefix_keys, q + "\uffff")
+        prefix = self.prefix_ids[lo:hi][:MAX_CANDIDATES]
+        grams = [self.postings[g] for g in (_grams(q, 2) if len(q) >= 2 else _grams(q, 1)) if g in self.postings]
+        if not grams: return np.unique(prefix)
+        counts = np.bincount(np.concatenate(grams), minlength=len(self.codes))
+        hit = np.flatnonzero(counts)
+        if len(hit) > MAX_CANDIDATES:
+            # 共享n-gram最多的候选优先，同分按原始顺序
+            hit = hit[np.argsort(-counts[hit], kind="stable")[:MAX_CANDIDATES]]
+        return np.unique(np.concatenate([prefix, hit]))
+
+    def search(self, query, limit=5):
+        if not query: return []
+        query = query.upper().strip()
+        q = query.lower()
+        if not q: return []
+        # 小规模时全量打分，与逐条扫描完全一致
+        ids = range(len(self.codes)) if len(self.codes) <= MAX_CANDIDATES else self._candidates(q).tolist()
+        results = []
+        for i in ids:
+            code, info = self.codes[i], self.infos[i]
+            scores = [fuzz.ratio(q, self.names[i]), fuzz.ratio(query, code), fuzz.partial_ratio(query, code)]
+            if self.pinyins[i]: scores.append(fuzz.ratio(q, self.pinyins[i]))
+            if self.initials[i]: scores.append(fuzz.ratio(q, self.initials[i]))
+            max_score = max(scores)
+            if max_score > 50:
+                results.append({"code": code, "name": info["name"], "market": info["market"], "full_code": info["full_code"], "score": max_score})
+        results.sort(key=lambda x: x["score"], reverse=True)
+        return results[:limit]
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_bars(n, start, seed, index=None):
+    """随机游走日线；index 给出时用它代替 n 根连续交易日"""
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(start, periods=n) if index is None else index
+    n = len(idx)
+    c = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    h, l = c * (1 + rng.random(n) * 0.02), c * (1 - rng.random(n) * 0.02)
+    return pd.DataFrame({"Open": c, "High": h, "Low": l, "Close": c, "Volume": rng.integers(1e5, 1e6, n).astype(float)}, index=idx)
+
+
+def assert_same(ref, got, rtol=1e-9, atol=1e-9, cols=None):
+    """逐列对照指标结果，NaN 位置也须一致"""
+    from panel import COLUMNS
+    for c in cols or COLUMNS:
+        np.testing.assert_allclose(np.asarray(got[c], dtype=np.float64), np.asarray(ref[c], dtype=np.float64),
+                                   rtol=rtol, atol=atol, equal_nan=True, err_msg=c)
+
+
+@pytest.fixture(scope="module")
+def frames():
+    """上市时间不同的三个品种（按日期并集对齐后后两个有行首NaN），A 中间有缺失值"""
+    out = {"A": make_bars(500, "2020-01-01", 0), "B": make_bars(300, "2020-10-01", 1), "C": make_bars(100, "2021-07-01", 2)}
+    out["A"].iloc[200, 3] = np.nan
+    out["A"].iloc[300, 1] = np.nan
+    return out
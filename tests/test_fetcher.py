@@ -0,0 +1,196 @@
+"""fetcher 的重试、退避、限速：本地桩服务模拟 chart 接口，经 STOCK_CHART_URL 指向它"""
+
+import importlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+DAY = 86400
+START = 1704153600  # 2024-01-02 00:00 UTC
+
+
+def chart_payload(n=5):
+    ts = [START + i * DAY for i in range(n)]
+    close = [100.0 + i for i in range(n)]
+    quote = {"open": close, "high": [c + 1 for c in close], "low": [c - 1 for c in close], "close": close, "volume": [1e6] * n}
+    return {"chart": {"result": [{"timestamp": ts, "meta": {"exchangeTimezoneName": "UTC", "dataGranularity": "1d"},
+                                  "indicators": {"quote": [quote], "adjclose": [{"adjclose": close}]}}]}}
+
+
+class Stub:
+    """按顺序返回 statuses 中的状态码，用完后一直返回最后一个（"bad" 为 200 但内容不是JSON）；记录每次请求的时间"""
+
+    def __init__(self, statuses):
+        self.statuses, self.times = list(statuses), []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.times.append(time.monotonic())
+                status = stub.statuses[min(len(stub.times), len(stub.statuses)) - 1]
+                body = json.dumps(chart_payload() if status == 200 else {"error": status}).encode() if status != "bad" else b"<html>"
+                status = 200 if status == "bad" else status
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """serve(状态码序列) -> (桩服务, 重新加载后读到 STOCK_CHART_URL 的 fetcher 模块)"""
+    stubs = []
+
+    def start(statuses):
+        stub = Stub(statuses)
+        stubs.append(stub)
+        monkeypatch.setenv("STOCK_CHART_URL", stub.url)
+        import fetcher
+        return stub, importlib.reload(fetcher)
+
+    yield start
+    for stub in stubs: stub.close()
+    if stubs:
+        monkeypatch.undo()
+        import fetcher
+        importlib.reload(fetcher)
+
+
+def test_chart_url_override(serve):
+    stub, fetcher = serve([200])
+    assert fetcher.CHART_URL == stub.url
+    df = fetcher.Fetcher().history("TEST")
+    assert len(stub.times) == 1
+    assert list(df["Close"]) == [100.0, 101.0, 102.0, 103.0, 104.0]
+
+
+def test_retries_then_succeeds(serve):
+    stub, fetcher = serve([503, 429, 200])
+    df = fetcher.Fetcher(backoff=0.01, history_rate=1000).history("TEST")
+    assert len(stub.times) == 3 and len(df) == 5
+
+
+def test_backoff_is_exponential(serve, monkeypatch):
+    stub, fetcher = serve([500])
+    sleeps = []
+    monkeypatch.setattr(fetcher.time, "sleep", sleeps.append)
+    f = fetcher.Fetcher(retries=3, backoff=0.05, history_rate=1000)
+    with pytest.raises(IOError):
+        f.history("TEST")
+    assert len(stub.times) == 4 and len(sleeps) == 3
+    # 第 i 次重试前等待 backoff * 2^i，另加至多20%的随机抖动
+    for i, wait in enumerate(sleeps):
+        assert 0.05 * 2 ** i <= wait <= 0.05 * 2 ** i * 1.2
+
+
+def test_no_retry_on_parse_error(serve):
+    stub, fetcher = serve(["bad"])
+    with pytest.raises(ValueError):
+        fetcher.Fetcher(backoff=0.01).history("TEST")
+    assert len(stub.times) == 1
+
+
+def test_info_retries_only_transient_errors(serve):
+    _, fetcher = serve([200])
+    calls = []
+
+    def broken(symbol):
+        calls.append(symbol)
+        raise KeyError("longName")
+
+    with pytest.raises(KeyError):
+        fetcher.Fetcher(backoff=0.01, info_fn=broken).info("TEST")
+    assert len(calls) == 1
+
+    def flaky(symbol):
+        calls.append(symbol)
+        if len(calls) < 4: raise ConnectionResetError("reset")
+        return {"longName": symbol}
+
+    assert fetcher.Fetcher(backoff=0.01, info_rate=1000, info_fn=flaky).info("TEST") == {"longName": "TEST"}
+    assert len(calls) == 4
+
+
+def test_no_retry_on_client_error(serve):
+    stub, fetcher = serve([404])
+    assert fetcher.Fetcher(backoff=0.01).history("TEST") is None
+    assert len(stub.times) == 1
+
+
+def test_fallback_after_retries_exhausted(serve):
+    stub, fetcher = serve([502])
+    calls = []
+    f = fetcher.Fetcher(retries=1, backoff=0.01, history_rate=1000, fallback=lambda s, start: calls.append(s) or "fallback")
+    assert f.history("TEST") == "fallback"
+    assert calls == ["TEST"] and len(stub.times) == 2
+
+
+class FakeClock:
+    """sleep 只推进时间，不真正等待"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_rate_limiter_paces_requests(serve):
+    stub, fetcher = serve([200])
+    clock = FakeClock()
+    f = fetcher.Fetcher(history_rate=10)
+    f.limits["history"] = fetcher.RateLimiter(10, clock=clock, sleep=clock.sleep)
+    granted = []
+    for i in range(15):
+        f.history(f"S{i}")
+        granted.append(clock())
+    # 突发 10 个不等待，之后按每秒 10 个放行
+    assert len(stub.times) == 15
+    assert granted[:10] == [0.0] * 10
+    assert granted[10:] == pytest.approx([0.1, 0.2, 0.3, 0.4, 0.5])
+
+
+def test_rate_limiter_refills_while_idle():
+    import fetcher
+    clock = FakeClock()
+    limiter = fetcher.RateLimiter(2, burst=3, clock=clock, sleep=clock.sleep)
+    for _ in range(3): limiter.acquire()
+    assert clock() == 0.0
+    clock.sleep(10)  # 空闲很久也只补满到 burst
+    for _ in range(4): limiter.acquire()
+    assert clock() == pytest.approx(10.5)
+
+
+def test_fetch_does_not_wait_for_info(serve):
+    stub, fetcher = serve([200])
+    done = threading.Event()
+
+    def slow_info(symbol):
+        time.sleep(0.5)
+        done.set()
+        return {"longName": symbol}
+
+    f = fetcher.Fetcher(info_fn=slow_info)
+    t0 = time.monotonic()
+    df, info = f.fetch("TEST")
+    assert time.monotonic() - t0 < 0.4
+    assert len(df) == 5 and info == {}
+    assert done.wait(2)
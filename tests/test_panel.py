@@ -0,0 +1,43 @@
+"""面板指标引擎与 pandas 参考实现（analysis.calculate_indicators_pandas）逐品种对照"""
+
+import numpy as np
+import pandas as pd
+
+from analysis import calculate_indicators_pandas
+from conftest import assert_same, make_bars
+from panel import COLUMNS, calculate_indicators_panel, panel_frame, panel_from_frames
+
+
+def test_panel_matches_per_symbol(frames):
+    symbols, index, arrays = panel_from_frames(frames)
+    assert np.isnan(arrays["Close"][symbols.index("C")][0])  # 行首NaN：尚未上市
+    result = calculate_indicators_panel(arrays["Close"], arrays["High"], arrays["Low"], arrays["Volume"])
+    for s in symbols:
+        ref = calculate_indicators_pandas(frames[s])
+        got = panel_frame(result, symbols, index, s, arrays).reindex(ref.index)
+        assert_same(ref, got)
+
+
+def test_panel_leading_nan_rows_stay_empty(frames):
+    symbols, index, arrays = panel_from_frames(frames)
+    result = calculate_indicators_panel(arrays["Close"], arrays["High"], arrays["Low"], arrays["Volume"])
+    i = symbols.index("B")
+    lead = index < frames["B"].index[0]
+    for c in COLUMNS:
+        if c == "Supertrend_Dir": assert (result[c][i][lead] == 0).all()
+        else: assert np.isnan(result[c][i][lead]).all(), c
+
+
+def test_panel_mismatched_calendars():
+    """各品种交易日历不同：并集对齐后的空位不能打断窗口（B 每20天停牌一天，C 另有一套假日）"""
+    days = pd.bdate_range("2021-01-01", periods=300)
+    frames = {"A": make_bars(0, None, 3, index=days), "B": make_bars(0, None, 4, index=days[np.arange(300) % 20 != 7]),
+              "C": make_bars(0, None, 5, index=days[40:][np.arange(260) % 13 != 0])}
+    frames["B"].iloc[100, 3] = np.nan  # 自身K线中的缺失值仍按单独计算的方式处理
+    symbols, index, arrays = panel_from_frames(frames)
+    result = calculate_indicators_panel(arrays["Close"], arrays["High"], arrays["Low"], arrays["Volume"])
+    for s in symbols:
+        ref = calculate_indicators_pandas(frames[s])
+        assert_same(ref, panel_frame(result, symbols, index, s, arrays).reindex(ref.index))
+        absent = ~index.isin(frames[s].index)
+        assert np.isnan(result["MA5"][symbols.index(s)][absent]).all()
@@ -0,0 +1,103 @@
+"""共享缓存：同键并发只执行一次、领头失败与超时接替、租约令牌、SQLite 容量淘汰"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from shared_cache import SharedCache, SQLiteBackend
+
+
+def run_threads(n, target):
+    out = []
+    def work():
+        try: out.append(target())
+        except Exception as e: out.append(e)
+    threads = [threading.Thread(target=work) for _ in range(n)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return out
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / "cache.sqlite"))
+
+
+def test_single_flight(backend):
+    cache, calls = SharedCache(backend), []
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"v": 42}
+    out = run_threads(8, lambda: cache.get_or_compute("k", fn))
+    assert len(calls) == 1 and out == [{"v": 42}] * 8
+    # 各调用方拿到各自反序列化的副本
+    assert len({id(o) for o in out}) > 1
+    assert cache.get_or_compute("k", fn) == {"v": 42} and len(calls) == 1
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] == 8 and stats["coalesced"] >= 1
+
+
+def test_leader_error_propagates(backend):
+    cache, calls = SharedCache(backend), []
+    def boom():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("upstream")
+    out = run_threads(6, lambda: cache.get_or_compute("k", boom))
+    assert len(calls) == 1 and all(isinstance(o, ValueError) for o in out)
+    # 失败不写缓存，租约已释放，下一次重新执行
+    assert cache.get_or_compute("k", lambda: 7) == 7
+
+
+def test_uncached_result_shared(backend):
+    cache, calls = SharedCache(backend), []
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+    out = run_threads(6, lambda: cache.get_or_compute("k", fn, cache_if=lambda r: r is not None))
+    assert len(calls) == 1 and out == [None] * 6
+    assert backend.get("k") is None
+
+
+def test_takeover_keeps_its_own_lease(backend):
+    """领头超过租约后由等待方接替；原领头晚些结束时只能释放自己的租约，不能删掉接替方的"""
+    cache = SharedCache(backend, lease=0.2, poll=0.01)
+    first_running, release_first = threading.Event(), threading.Event()
+    second_running, release_second = threading.Event(), threading.Event()
+    def first():
+        first_running.set()
+        release_first.wait(5)
+        return 1
+    def second():
+        second_running.set()
+        release_second.wait(5)
+        return 2
+    results = {}
+    a = threading.Thread(target=lambda: results.update(a=cache.get_or_compute("k", first)))
+    b = threading.Thread(target=lambda: results.update(b=cache.get_or_compute("k", second)))
+    a.start()
+    assert first_running.wait(5)
+    b.start()
+    assert second_running.wait(5)
+    release_first.set()
+    a.join(5)
+    assert not backend.acquire("k", "other", 10)
+    release_second.set()
+    b.join(5)
+    assert results == {"a": 1, "b": 2}
+    assert backend.acquire("k", "other", 10)
+
+
+def test_sqlite_eviction(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite"), max_bytes=1 << 20)
+    for i in range(600): backend.set(f"k{i}", os.urandom(4096), 60)
+    entries, size = backend.size()
+    assert size <= (1 << 20) + backend.evict_every + 4096
+    # 最近写入的保留，最早的被淘汰
+    assert backend.get("k599") is not None and backend.get("k0") is None
+    backend.set("old", b"x", -1)
+    backend.evict()
+    assert backend.get("old") is None and backend.size()[1] <= 1 << 20
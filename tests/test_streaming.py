@@ -0,0 +1,38 @@
+"""流式指标引擎与 pandas 参考实现（analysis.calculate_indicators_pandas）逐根对照"""
+
+import pandas as pd
+import pytest
+
+from analysis import calculate_indicators_pandas
+from conftest import assert_same
+from streaming import StreamingIndicators
+
+
+@pytest.mark.parametrize("symbol", ["A", "B"])
+def test_streaming_update_and_revise(frames, symbol):
+    """每根先以盘中值 update，再以收盘值 revise，结果应与整段重算一致"""
+    df = frames[symbol]
+    ref = calculate_indicators_pandas(df)
+    st, rows = StreamingIndicators(), []
+    for bar in df.itertuples():
+        st.update({"High": bar.High * 0.999, "Low": bar.Low * 1.001, "Close": bar.Close * 1.0005, "Volume": bar.Volume / 2})
+        rows.append(dict(st.revise({"High": bar.High, "Low": bar.Low, "Close": bar.Close, "Volume": bar.Volume})))
+    assert_same(ref, pd.DataFrame(rows, index=df.index))
+
+
+def test_streaming_revise_last_bar(frames):
+    """预热后修正最后一根（多次），等同于用修正后的K线整段重算"""
+    df = frames["B"]
+    st = StreamingIndicators.from_frame(df)
+    assert_same(calculate_indicators_pandas(df).iloc[[-1]], pd.DataFrame([st.values]))
+    revised = df.copy()
+    for close in (df["Close"].iloc[-1] * 1.03, df["Close"].iloc[-1] * 0.97):
+        revised.iloc[-1, revised.columns.get_indexer(["High", "Low", "Close"])] = [close * 1.01, close * 0.99, close]
+        last = revised.iloc[-1]
+        out = st.revise({"High": last.High, "Low": last.Low, "Close": last.Close, "Volume": last.Volume})
+        assert_same(calculate_indicators_pandas(revised).iloc[[-1]], pd.DataFrame([out]))
+    # 修正后继续追加，状态里只应有修正后的那根
+    nxt = {"High": close * 1.02, "Low": close * 0.98, "Close": close * 1.01, "Volume": 5e5}
+    out = st.update(nxt)
+    extended = pd.concat([revised, pd.DataFrame([{**nxt, "Open": nxt["Close"]}], index=[revised.index[-1] + pd.offsets.BDay()])])
+    assert_same(calculate_indicators_pandas(extended).iloc[[-1]], pd.DataFrame([out]))
@@ -0,0 +1,245 @@
+"""
+实时行情接入 - 逐笔/报价流按批聚合为 1m/5m/15m K线，每个周期一块 (代码数 × 容量) 的环形缓冲，内存上限固定
+数据源可替换：任何可迭代对象，带 symbols 列表，每次产出一批 (代码下标, 时间戳ns, 价格, 成交量) 数组
+FileReplay 回放本地逐笔文件（离线测试/演示），SyntheticTicks 生成随机游走行情（压测）
+每批先按 (代码, 时间) 排序，归并出各代码的1分钟增量，5/15分钟再由1分钟增量归并，全部为数组运算
+内存约为 代码数 × 容量 × 周期数 × 64 字节（5000个代码、容量240、3个周期约230MB）
+环境变量: STOCK_TICK_FILE（回放文件，csv/parquet，列 symbol,ts,price,size）
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+TICK_FILE = os.environ.get("STOCK_TICK_FILE")
+INTERVALS = {"1m": 60, "5m": 300, "15m": 900}  # 周期须依次整除
+CAPACITY = 240
+
+
+def _reduce(sym, bucket, o, h, l, c, v, t_open, t_close):
+    """已按 (代码, 时间) 排序的行，相邻同 (代码, 桶) 归并为一行：开取首、收取末、高低取极值、量求和
+    t_open/t_close 为开盘、收盘那一笔的时间戳，与已有K线合并时据此判断先后
+    """
+    if len(sym) == 0: return sym, bucket, o, h, l, c, v, t_open, t_close
+    start = np.flatnonzero(np.r_[True, (sym[1:] != sym[:-1]) | (bucket[1:] != bucket[:-1])])
+    end = np.r_[start[1:], len(sym)] - 1
+    return (sym[start], bucket[start], o[start], np.maximum.reduceat(h, start), np.minimum.reduceat(l, start),
+            c[end], np.add.reduceat(v, start), t_open[start], t_close[end])
+
+
+class BarRing:
+    """单个周期的环形缓冲；bucket 为K线起点（UTC秒 // 周期），head 为各代码最新一根所在位置"""
+
+    def __init__(self, n_symbols, width, capacity=CAPACITY):
+        self.width, self.capacity = width, capacity
+        self.bucket = np.full((n_symbols, capacity), -1, dtype=np.int64)
+        self.ohlcv = np.full((n_symbols, capacity, 5), np.nan)
+        self.opened = np.zeros((n_symbols, capacity), dtype=np.int64)  # 每根K线开盘、收盘那一笔的时间戳
+        self.closed = np.zeros((n_symbols, capacity), dtype=np.int64)
+        self.head = np.full(n_symbols, -1, dtype=np.int64)
+        self.count = np.zeros(n_symbols, dtype=np.int64)
+        self.last = np.full(n_symbols, -1, dtype=np.int64)  # 最新一根的 bucket
+
+    def apply(self, sym, bucket, o, h, l, c, v, t_open, t_close):
+        """归并后的增量（按代码、时间有序）：与最新一根同桶的并入，更晚的依次开新K线，早于最新一根的迟到数据丢弃
+        同桶并入时开盘/收盘只在增量的首笔更早/末笔不早于已有的那一笔时替换，批间乱序的逐笔不会改写收盘价
+        """
+        latest = self.last[sym]
+        same = bucket == latest
+        if same.any():
+            s = sym[same]
+            k = s * self.capacity + self.head[s]  # 展平后的下标，二维花式索引每次都要重新换算
+            ohlcv, opened, closed = self.ohlcv.reshape(-1, 5), self.opened.reshape(-1), self.closed.reshape(-1)
+            bar = ohlcv[k]
+            t0, t1 = t_open[same], t_close[same]
+            bar[:, 0] = np.where(t0 < opened[k], o[same], bar[:, 0])
+            bar[:, 1] = np.maximum(bar[:, 1], h[same])
+            bar[:, 2] = np.minimum(bar[:, 2], l[same])
+            bar[:, 3] = np.where(t1 >= closed[k], c[same], bar[:, 3])
+            bar[:, 4] += v[same]
+            ohlcv[k] = bar
+            opened[k] = np.minimum(opened[k], t0)
+            closed[k] = np.maximum(closed[k], t1)
+        new = bucket > latest
+        if new.any():
+            s = sym[new]
+            first = np.r_[True, s[1:] != s[:-1]]
+            idx = np.arange(len(s))
+            rank = idx - np.maximum.accumulate(np.where(first, idx, 0))
+            pos = (self.head[s] + 1 + rank) % self.capacity
+            self.ohlcv[s, pos] = np.column_stack([o[new], h[new], l[new], c[new], v[new]])
+            self.bucket[s, pos] = bucket[new]
+            self.opened[s, pos], self.closed[s, pos] = t_open[new], t_close[new]
+            lastrow = np.r_[s[1:] != s[:-1], True]
+            u, k = s[lastrow], rank[lastrow] + 1
+            self.head[u] = pos[lastrow]
+            self.last[u] = bucket[new][lastrow]
+            self.count[u] = np.minimum(self.count[u] + k, self.capacity)
+        return int((bucket < latest).sum())
+
+    def positions(self, i):
+        """代码 i 的有效K线在环中的位置，按时间从旧到新"""
+        n = self.count[i]
+        return (self.head[i] - n + 1 + np.arange(n)) % self.capacity
+
+
+class TickIngest:
+    """多周期K线聚合；ingest() 可在任意线程调用，读取方法返回拷贝"""
+
+    def __init__(self, symbols, intervals=INTERVALS, capacity=CAPACITY):
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.intervals = dict(sorted(intervals.items(), key=lambda kv: kv[1]))
+        self.rings = {k: BarRing(len(self.symbols), w, capacity) for k, w in self.intervals.items()}
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.last_ts = None
+        self.thread, self.stop, self.error = None, threading.Event(), None
+
+    def ingest(self, sym, ts, price, size):
+        """一批逐笔：代码下标（本对象的 symbols）、UTC纳秒时间戳、价格、成交量；返回丢弃的迟到K线增量数"""
+        sym, ts = np.asarray(sym, dtype=np.int64), np.asarray(ts, dtype=np.int64)
+        price, size = np.asarray(price, dtype=np.float64), np.asarray(size, dtype=np.float64)
+        ok = (sym >= 0) & np.isfinite(price) & (price > 0)
+        if not ok.all(): sym, ts, price, size = sym[ok], ts[ok], price[ok], size[ok]
+        size = np.nan_to_num(size)
+        order = np.lexsort((ts, sym))
+        sym, ts, price, size = sym[order], ts[order], price[order], size[order]
+        sec = ts // 1_000_000_000
+        dropped = 0
+        with self.lock:
+            seg, prev = None, None
+            for k, w in self.intervals.items():
+                if seg is None: seg = _reduce(sym, sec // w, price, price, price, price, size, ts, ts)
+                else: seg = _reduce(seg[0], seg[1] * prev // w, *seg[2:])
+                dropped += self.rings[k].apply(*seg)
+                prev = w
+            self.counts["ticks"] += len(sym)
+            self.counts["batches"] += 1
+            self.counts["dropped"] += dropped
+            if len(ts): self.last_ts = max(self.last_ts or 0, int(ts.max()))
+        return dropped
+
+    def run(self, source):
+        """消费数据源直到耗尽或 stop 被设置；源的代码表与本对象不同时按名称映射，未知代码丢弃"""
+        remap = np.array([self.index.get(s, -1) for s in source.symbols], dtype=np.int64)
+        try:
+            for sym, ts, price, size in source:
+                if self.stop.is_set(): break
+                self.ingest(remap[np.asarray(sym)], ts, price, size)
+        except Exception as e:
+            self.error = e
+        self.counts["done"] = 1
+
+    def start(self, source):
+        self.thread = threading.Thread(target=self.run, args=(source,), daemon=True, name="tick-ingest")
+        self.thread.start()
+        return self
+
+    def frame(self, symbol, interval="1m", tz="UTC"):
+        """某代码某周期的K线（按时间排序的拷贝）"""
+        ring, i = self.rings[interval], self.index[symbol]
+        with self.lock:
+            pos = ring.positions(i)
+            values, bucket = ring.ohlcv[i, pos].copy(), ring.bucket[i, pos].copy()
+        idx = pd.to_datetime(bucket * ring.width, unit="s", utc=True).tz_convert(tz)
+        return pd.DataFrame(values, index=idx, columns=["Open", "High", "Low", "Close", "Volume"])
+
+    def movers(self, interval="1m", n=20):
+        """全部代码：最新价、缓冲区内首根开盘以来涨跌幅、成交量，按涨跌幅排序取前后各 n 个"""
+        ring = self.rings[interval]
+        rows = np.arange(len(self.symbols))
+        with self.lock:
+            has = ring.count > 0
+            first = (ring.head - ring.count + 1) % ring.capacity
+            last_close = ring.ohlcv[rows, ring.head, 3].copy()
+            first_open = ring.ohlcv[rows, first, 0].copy()
+            volume = np.nansum(ring.ohlcv[:, :, 4], axis=1)
+        df = pd.DataFrame({"price": last_close, "change_pct": (last_close / first_open - 1) * 100, "volume": volume},
+                          index=pd.Index(self.symbols, name="symbol"))[has]
+        df = df.sort_values("change_pct", ascending=False)
+        return pd.concat([df.head(n), df.tail(n)]) if len(df) > 2 * n else df
+
+    def stats(self):
+        with self.lock: counts = dict(self.counts)
+        active = int((self.rings[next(iter(self.rings))].count > 0).sum())
+        return {**counts, "active": active, "symbols": len(self.symbols),
+                "last_ts": pd.Timestamp(self.last_ts, tz="UTC") if self.last_ts else None,
+                "error": str(self.error) if self.error else None}
+
+
+def _paced(ts, batch, speed, step):
+    """(起, 止) 下标区间；speed 为 None 时按条数切批尽快产出，否则按数据时间每 step 秒一批并等待到对应的墙钟时刻"""
+    if not speed:
+        for i in range(0, len(ts), batch): yield i, min(i + batch, len(ts))
+        return
+    t0, wall0 = ts[0], time.monotonic()
+    width = int(step * speed * 1e9)
+    bounds = np.searchsorted(ts, np.arange(t0, ts[-1] + width, width), side="left")
+    for i, j in zip(bounds[:-1], np.r_[bounds[1:-1], len(ts)]):
+        delay = wall0 + (ts[i] - t0) / 1e9 / speed - time.monotonic()
+        if delay > 0: time.sleep(delay)
+        if j > i: yield i, j
+
+
+class FileReplay:
+    """回放逐笔文件（列 symbol, ts, price, size；ts 为时间字符串或UTC纳秒整数）
+    speed=None 尽快回放；speed=k 按原始时间间隔的 1/k 节奏产出（演示实时刷新）
+    """
+
+    def __init__(self, path, batch=50_000, speed=None, step=0.25):
+        df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+        ts = df["ts"]
+        ts = ts.to_numpy(dtype=np.int64) if pd.api.types.is_integer_dtype(ts) else pd.to_datetime(ts, utc=True).dt.as_unit("ns").astype(np.int64).to_numpy()
+        order = np.argsort(ts, kind="stable")
+        codes, uniques = pd.factorize(df["symbol"].astype(str).to_numpy()[order])
+        self.symbols = list(uniques)
+        self.sym, self.ts = codes.astype(np.int64), ts[order]
+        self.price = df["price"].to_numpy(dtype=np.float64)[order]
+        self.size = (df["size"].to_numpy(dtype=np.float64) if "size" in df else np.zeros(len(df)))[order]
+        self.batch, self.speed, self.step = batch, speed, step
+
+    def __iter__(self):
+        for i, j in _paced(self.ts, self.batch, self.speed, self.step):
+            yield self.sym[i:j], self.ts[i:j], self.price[i:j], self.size[i:j]
+
+
+class SyntheticTicks:
+    """n 个代码的随机游走逐笔，rate 为全市场每秒笔数；realtime=True 时按墙钟节奏产出"""
+
+    def __init__(self, n_symbols=1000, rate=20_000, seconds=3600, start="2024-01-02 14:30", seed=0, realtime=False, step=0.25):
+        self.symbols = [f"SYN{i:04d}" for i in range(n_symbols)]
+        self.rate, self.seconds, self.seed, self.realtime, self.step = rate, seconds, seed, realtime, step
+        self.t0 = pd.Timestamp(start, tz="UTC").value
+
+    def __iter__(self):
+        rng = np.random.default_rng(self.seed)
+        n = len(self.symbols)
+        price = 100 * np.exp(rng.normal(0, 0.5, n))
+        per = max(1, int(self.rate * self.step))
+        wall0 = time.monotonic()
+        for k in range(int(self.seconds / self.step)):
+            if self.realtime:
+                delay = wall0 + k * self.step - time.monotonic()
+                if delay > 0: time.sleep(delay)
+            sym = rng.integers(0, n, per)
+            # 同一批内同一代码多笔时依次在上一笔的价格上游走：按代码稳定排序（组内保持时间顺序）后分组累加对数收益
+            step = rng.normal(0, 0.0005, per)
+            order = np.argsort(sym, kind="stable")
+            s, r = sym[order], step[order]
+            walk = np.cumsum(r)
+            head = np.maximum.accumulate(np.where(np.r_[True, s[1:] != s[:-1]], np.arange(per), 0))
+            p = np.empty(per)
+            p[order] = price[s] * np.exp(walk - (walk - r)[head])
+            ts = self.t0 + int(k * self.step * 1e9) + np.sort(rng.integers(0, int(self.step * 1e9), per))
+            tail = np.r_[s[1:] != s[:-1], True]
+            price[s[tail]] = p[order][tail]
+            yield sym, ts, p, rng.integers(1, 50, per).astype(np.float64) * 100
+
+    def frame(self):
+        """全部逐笔为 DataFrame（可写成回放文件）"""
+        parts = [pd.DataFrame({"symbol": np.asarray(self.symbols)[s], "ts": t, "price": p, "size": v}) for s, t, p, v in self]
+        return pd.concat(parts, ignore_index=True)
@@ -0,0 +1,78 @@
+"""
+时间框架层 - 每个品种只取一次全量日线作为基础序列，各周期窗口靠切片，周线/月线/季线靠OHLCV聚合
+（日线无法聚合出分钟线，只支持日线及更长周期）；派生结果按 (代码, 基础序列版本, K线周期, 区间) 缓存
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from bar_store import period_start
+
+# K线周期 -> pandas Period 频率
+INTERVALS = {"1d": "D", "1wk": "W", "1mo": "M", "3mo": "Q"}
+
+
+def window(df, period):
+    """按 yfinance 周期名取最近一段，返回视图"""
+    if period in (None, "max") or len(df) == 0: return df
+    idx = df.index
+    ts = (idx.tz_convert("UTC") if idx.tz is not None else idx).as_unit("ns").asi8
+    return df.iloc[period_start(ts, period, str(idx.tz) if idx.tz is not None else None):]
+
+
+def _bucket_codes(idx, interval):
+    if interval not in INTERVALS: raise ValueError(f"不支持的K线周期: {interval}（基础序列为日线，只支持 {'/'.join(INTERVALS)}）")
+    local = idx.tz_localize(None) if idx.tz is not None else idx
+    return local.to_period(INTERVALS[interval]).asi8
+
+
+def resample(df, interval):
+    """OHLCV按周期聚合：开=首根，高=最高，低=最低，收=末根，量=求和；索引取桶内首根K线时间"""
+    if interval in (None, "") or len(df) == 0: return df
+    codes = _bucket_codes(df.index, interval)
+    starts = np.flatnonzero(np.concatenate([[True], codes[1:] != codes[:-1]]))
+    if len(starts) == len(df): return df
+    ends = np.append(starts[1:], len(df)) - 1
+    out = {
+        "Open": df['Open'].to_numpy()[starts],
+        "High": np.maximum.reduceat(df['High'].to_numpy(), starts),
+        "Low": np.minimum.reduceat(df['Low'].to_numpy(), starts),
+        "Close": df['Close'].to_numpy()[ends],
+        "Volume": np.add.reduceat(df['Volume'].to_numpy(), starts),
+    }
+    return pd.DataFrame(out, index=df.index[starts])
+
+
+def version(df):
+    """基础序列的轻量指纹：行数、末根时间、首末收盘（复权重写会改变首根收盘）"""
+    if df is None or len(df) == 0: return (0,)
+    return (len(df), int(df.index[-1].value), float(df['Close'].iloc[0]), float(df['Close'].iloc[-1]))
+
+
+class Timeframes:
+    """派生帧缓存，进程内共享；按基础序列版本区分，不同调用方传入不同基础序列时互不作废，旧版本条目随LRU淘汰"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.memo = OrderedDict()
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    def derive(self, symbol, base, period="1y", interval="1d"):
+        key = (symbol, version(base), interval, period)
+        with self.lock:
+            if key in self.memo:
+                self.hits += 1
+                self.memo.move_to_end(key)
+                return self.memo[key]
+            self.misses += 1
+        # 先切窗口再聚合，首个周/月桶只含窗口内的K线
+        part = window(base, period)
+        out = resample(part, interval)
+        # 未聚合时结果是基础序列的切片（可能指向内存映射的K线文件），缓存副本，不让缓存持有映射
+        if out is part: out = part.copy()
+        with self.lock:
+            self.memo[key] = out
+            while len(self.memo) > self.max_entries: self.memo.popitem(last=False)
+        return out
@@ -0,0 +1,449 @@
+"""
+路径依赖指标 - Wilder ATR、Supertrend（轨道只收紧、收盘穿越时翻转方向）、抛物线SAR、吊灯止损
+每根K线的结果依赖上一根的状态，无法整段向量化；逐根的状态转移写在 _*_step 中（流式引擎直接调用）
+安装 numba 时逐品种编译为机器码循环（导入时后台预编译，cache=True 写入磁盘缓存）；
+未安装时不逐根走Python：ATR 用分块闭式，其余指标各行有效K线左移对齐后按时间推进、每步对全部品种做数组运算，
+品种少而序列长时先把每个品种切成重叠的窗口当作面板推进（见 _chunked）
+输入 (T,) 或 (N, T)；最高/最低/收盘任一为NaN的K线输出NaN且不改变状态，行首NaN视为尚未上市
+"""
+
+import threading
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # 缺失时（如装不上 llvmlite 的平台）使用下面的纯Python/numpy实现，结果在浮点舍入以内相同
+    njit = None
+
+NAN = float("nan")
+# 未编译时长序列切成的窗口长度，相邻窗口重叠同样根数用于预热；Supertrend 闲置一侧的轨道收敛最慢
+ST_WINDOW, PSAR_WINDOW, CHANDELIER_WINDOW = 128, 64, 48
+WIDE = 16  # 超过该品种数时品种间的并行已足够，不再切窗口
+
+
+def _jit(fn):
+    return njit(cache=True, nogil=True)(fn) if njit is not None else fn
+
+
+@_jit
+def _tr(h, l, pc):
+    """真实波幅；首根没有前收盘时为 H-L"""
+    if pc != pc: return h - l
+    return max(h - l, abs(h - pc), abs(l - pc))
+
+
+@_jit
+def _atr_step(tr, n, atr, k, acc):
+    """Wilder ATR：前n根TR的均值作为种子，之后 (前值*(n-1)+TR)/n；状态 (atr, 已计数, 累加和)"""
+    if k >= n: return (atr * (n - 1) + tr) / n, k, acc
+    acc += tr
+    k += 1
+    return (acc / n if k == n else atr), k, acc
+
+
+@_jit
+def _supertrend_step(h, l, c, atr, mult, up, dn, d, pc):
+    """下轨只升不降、上轨只降不升，前收盘穿越时轨道重置；收盘突破上轨转多、跌破下轨转空
+    状态 (下轨, 上轨, 方向)，方向 1多 -1空 0未开始；首根按空头开始（同 TradingView ta.supertrend）
+    """
+    mid = (h + l) / 2
+    lo, hi = mid - mult * atr, mid + mult * atr
+    if d == 0: return lo, hi, -1
+    return _supertrend_next(lo, hi, c, up, dn, d, pc)
+
+
+@_jit
+def _supertrend_next(lo, hi, c, up, dn, d, pc):
+    """已开始后的转移，lo/hi 为本根的 中价 ∓ mult*ATR"""
+    up = max(lo, up) if pc >= up else lo
+    dn = min(hi, dn) if pc <= dn else hi
+    if d == -1: return up, dn, (1 if c > dn else -1)
+    return up, dn, (-1 if c < up else 1)
+
+
+@_jit
+def _psar_step(h, l, h1, l1, h2, l2, start, step, maximum, sar, ep, af, d):
+    """Wilder 抛物线SAR；h1/l1、h2/l2 为前一、前二根。状态 (sar, 极值点, 加速因子, 方向)
+    第一根只记录高低点；第二根按两根高低点的变化定初始方向，SAR取两根的反向极值
+    """
+    if h1 != h1: return NAN, NAN, start, 0
+    if d == 0:
+        if h - h1 >= l1 - l: return min(l, l1), max(h, h1), start, 1
+        return max(h, h1), min(l, l1), start, -1
+    sar = sar + af * (ep - sar)
+    if d == 1:
+        sar = min(sar, l1, l2)
+        if l < sar: return max(ep, h), l, start, -1
+        if h > ep: return sar, h, min(af + step, maximum), 1
+        return sar, ep, af, 1
+    sar = max(sar, h1, h2)
+    if h > sar: return min(ep, l), h, start, 1
+    if l < ep: return sar, l, min(af + step, maximum), -1
+    return sar, ep, af, -1
+
+
+@_jit
+def _chandelier_step(hh, ll, c, atr, mult, ls, ss, d, pc):
+    """n日最高价 - mult*ATR 为多头止损、n日最低价 + mult*ATR 为空头止损，前收盘在止损外侧时只收紧不放宽
+    收盘突破前一根空头止损转多、跌破前一根多头止损转空；状态 (多头止损, 空头止损, 方向)
+    """
+    nls, nss = hh - mult * atr, ll + mult * atr
+    if d == 0: return nls, nss, 1
+    return _chandelier_next(nls, nss, c, ls, ss, d, pc)
+
+
+@_jit
+def _chandelier_next(nls, nss, c, ls, ss, d, pc):
+    """已开始后的转移，nls/nss 为本根未收紧的多头/空头止损"""
+    if pc > ls: nls = max(nls, ls)
+    if pc < ss: nss = min(nss, ss)
+    return nls, nss, (1 if c > ss else -1 if c < ls else d)
+
+
+# ---------- 逐品种循环（numba 编译） ----------
+
+@_jit
+def _atr_row(h, l, c, n, out):
+    atr, k, acc, pc = NAN, 0, 0.0, NAN
+    for t in range(len(c)):
+        if h[t] != h[t] or l[t] != l[t] or c[t] != c[t]:
+            out[t] = NAN
+            continue
+        atr, k, acc = _atr_step(_tr(h[t], l[t], pc), n, atr, k, acc)
+        pc = c[t]
+        out[t] = atr
+
+
+@_jit
+def _supertrend_row(h, l, c, atr, mult, line, direction):
+    up, dn, d, pc = NAN, NAN, 0, NAN
+    for t in range(len(c)):
+        line[t], direction[t] = NAN, 0.0
+        if atr[t] != atr[t]:
+            if h[t] == h[t] and l[t] == l[t] and c[t] == c[t]: pc = c[t]
+            continue
+        up, dn, d = _supertrend_step(h[t], l[t], c[t], atr[t], mult, up, dn, d, pc)
+        pc = c[t]
+        line[t], direction[t] = (up if d == 1 else dn), d
+
+
+@_jit
+def _psar_row(h, l, start, step, maximum, sar_out, direction):
+    sar, ep, af, d, h1, l1, h2, l2 = NAN, NAN, start, 0, NAN, NAN, NAN, NAN
+    for t in range(len(h)):
+        if h[t] != h[t] or l[t] != l[t]:
+            sar_out[t], direction[t] = NAN, 0.0
+            continue
+        sar, ep, af, d = _psar_step(h[t], l[t], h1, l1, h2, l2, start, step, maximum, sar, ep, af, d)
+        h2, l2, h1, l1 = h1, l1, h[t], l[t]
+        sar_out[t], direction[t] = sar, d
+
+
+@_jit
+def _chandelier_row(h, l, c, hh, ll, atr, mult, long_out, short_out):
+    ls, ss, d, pc = NAN, NAN, 0, NAN
+    for t in range(len(c)):
+        long_out[t], short_out[t] = NAN, NAN
+        if h[t] != h[t] or l[t] != l[t] or c[t] != c[t]: continue
+        if hh[t] == hh[t] and ll[t] == ll[t] and atr[t] == atr[t]:
+            ls, ss, d = _chandelier_step(hh[t], ll[t], c[t], atr[t], mult, ls, ss, d, pc)
+            long_out[t], short_out[t] = ls, ss
+        pc = c[t]
+
+
+def _rows(kernel, inputs, n_out, *params):
+    N, T = inputs[0].shape
+    outs = [np.empty((N, T)) for _ in range(n_out)]
+    for i in range(N): kernel(*(np.ascontiguousarray(x[i]) for x in inputs), *params, *(o[i] for o in outs))
+    return outs
+
+
+# ---------- 按时间推进、跨品种向量化（未编译时） ----------
+
+def _compress(valid, *arrays):
+    """每行的有效K线左移到开头对齐，尾部补NaN；递推只需从同一列开始，循环内不再逐步判断NaN
+    逐行复制：只有行首NaN（上市较晚）的行是一次切片，中途有停牌的行才用布尔下标
+    """
+    if valid.all(): return list(arrays), None
+    count = valid.sum(axis=1)
+    first = valid.argmax(axis=1)
+    suffix = count == valid.shape[1] - first
+    out = [np.full((a.shape[0], int(count.max(initial=0))), NAN) for a in arrays]
+    for i in np.flatnonzero(count):
+        k = count[i]
+        for a, b in zip(arrays, out): b[i, :k] = a[i, first[i]:] if suffix[i] else a[i, valid[i]]
+    return out, (valid, count, first, suffix)
+
+
+def _expand(index, a, fill=NAN):
+    if index is None: return a
+    valid, count, first, suffix = index
+    out = np.full(valid.shape, fill)
+    for i in np.flatnonzero(count):
+        if suffix[i]: out[i, first[i]:] = a[i, :count[i]]
+        else: out[i, valid[i]] = a[i, :count[i]]
+    return out
+
+
+def _valid(*arrays):
+    ok = ~np.isnan(arrays[0])
+    for a in arrays[1:]: ok &= ~np.isnan(a)
+    return ok
+
+
+def _true_range(h, l, c):
+    """压缩后的 (N, W) 数组：前一列即前一根有效K线"""
+    pc = np.concatenate([np.full((c.shape[0], 1), NAN), c[:, :-1]], axis=1)
+    hl = h - l
+    return np.where(np.isnan(pc), hl, np.maximum(hl, np.maximum(np.abs(h - pc), np.abs(l - pc))))
+
+
+def _atr_cols(tr, n):
+    """第 n-1 列为前n根TR均值，之后 y = w*y + (1-w)*TR，w=(n-1)/n
+    常系数线性递推，按 panel.ewm_mean 的分块闭式计算：块内 y_j = w^j (w*y_prev + (1-w)*cumsum(TR_i w^-i))
+    """
+    if n == 1: return tr.copy()
+    out = np.full(tr.shape, NAN)
+    T = tr.shape[1]
+    if T < n: return out
+    w = (n - 1) / n
+    y = tr[:, :n].mean(axis=1)
+    out[:, n - 1] = y
+    B = max(1, int(200 / -np.log(w)))
+    up, down = w ** -np.arange(B), w ** np.arange(B)
+    for s in range(n, T, B):
+        e = min(s + B, T)
+        block = down[:e - s] * (w * y[:, None] + (1 - w) * np.cumsum(tr[:, s:e] * up[:e - s], axis=1))
+        out[:, s:e] = block
+        y = block[:, -1]
+    return out
+
+
+def _start(a):
+    """压缩后各行预热期相同，取开始有值的列"""
+    ok = ~np.isnan(a).all(axis=0)
+    return int(ok.argmax()) if ok.any() else None
+
+
+def _supertrend_cols(lo, hi, c):
+    """时间优先 (T, M)、第0行起有效 -> 状态序列 (下轨, 上轨, 方向)；每步原地写入当前行"""
+    UP, DN, bull = np.empty(c.shape), np.empty(c.shape), np.zeros(c.shape, dtype=bool)
+    UP[0], DN[0] = lo[0], hi[0]
+    with np.errstate(invalid="ignore"):
+        for t in range(1, len(c)):
+            pc, up, dn = c[t - 1], UP[t - 1], DN[t - 1]
+            np.maximum(lo[t], up, out=UP[t])
+            np.copyto(UP[t], lo[t], where=pc < up)
+            np.minimum(hi[t], dn, out=DN[t])
+            np.copyto(DN[t], hi[t], where=pc > dn)
+            bull[t] = np.where(bull[t - 1], c[t] >= UP[t], c[t] > DN[t])
+    return UP, DN, np.where(bull, 1.0, -1.0)
+
+
+def _psar_cols(H, L, start, step, maximum):
+    """时间优先 (T, M)、第0行起有效 -> 状态序列 (SAR, 极值点, 加速因子, 方向)"""
+    T, M = H.shape
+    SAR, EP, AF = (np.full((T, M), v) for v in (NAN, NAN, start))
+    up = np.zeros((T, M), dtype=bool)
+    if T >= 2:
+        up[1] = H[1] - H[0] >= L[0] - L[1]
+        SAR[1] = np.where(up[1], np.minimum(L[1], L[0]), np.maximum(H[1], H[0]))
+        EP[1] = np.where(up[1], np.maximum(H[1], H[0]), np.minimum(L[1], L[0]))
+        lo2, hi2 = np.minimum(L[1:-1], L[:-2]), np.maximum(H[1:-1], H[:-2])
+    with np.errstate(invalid="ignore"):
+        for t in range(2, T):
+            sar, ep, af, u = SAR[t - 1], EP[t - 1], AF[t - 1], up[t - 1]
+            s = sar + af * (ep - sar)
+            s = np.where(u, np.minimum(s, lo2[t - 2]), np.maximum(s, hi2[t - 2]))
+            flip = np.where(u, L[t] < s, H[t] > s)
+            # 顺势的新极值点，反转时它也正是新的SAR
+            extreme = np.where(u, np.maximum(ep, H[t]), np.minimum(ep, L[t]))
+            SAR[t] = np.where(flip, extreme, s)
+            EP[t] = np.where(flip, np.where(u, L[t], H[t]), extreme)
+            AF[t] = np.where(flip, start, np.where(extreme != ep, np.minimum(af + step, maximum), af))
+            up[t] = u ^ flip
+    D = np.where(up, 1.0, -1.0)
+    D[:1] = 0.0
+    return SAR, EP, AF, D
+
+
+def _chandelier_cols(nls, nss, c):
+    """时间优先 (T, M)、第0行起有效 -> 状态序列 (多头止损, 空头止损, 方向)；每步原地写入当前行"""
+    LS, SS, D = np.empty(c.shape), np.empty(c.shape), np.ones(c.shape)
+    LS[0], SS[0] = nls[0], nss[0]
+    with np.errstate(invalid="ignore"):
+        for t in range(1, len(c)):
+            pc, ls, ss = c[t - 1], LS[t - 1], SS[t - 1]
+            D[t] = np.where(c[t] > ss, 1.0, np.where(c[t] < ls, -1.0, D[t - 1]))
+            np.maximum(nls[t], ls, out=LS[t])
+            np.copyto(LS[t], nls[t], where=pc <= ls)
+            np.minimum(nss[t], ss, out=SS[t])
+            np.copyto(SS[t], nss[t], where=pc >= ss)
+    return LS, SS, D
+
+
+def _windows(x, K, w):
+    """(T, M) -> (2w, K*M)：第k个窗口从第 k*w 行开始，前 w 行与上一窗口后半重叠"""
+    T, M = x.shape
+    x = np.concatenate([x, np.full(((K + 1) * w - T, M), NAN)])
+    view = np.lib.stride_tricks.sliding_window_view(x, 2 * w, axis=0)[::w]  # (K, M, 2w)
+    return np.ascontiguousarray(view.transpose(2, 0, 1)).reshape(2 * w, K * M)
+
+
+def _chunked(kernel, advance, inputs, w, *params):
+    """kernel 的状态序列；品种少而序列长时每个品种切成长 2w、相邻重叠 w 根的窗口，全部窗口当作面板一起推进
+    窗口从猜测的初始状态开始，预热段末的状态与上一窗口同一根相同，则之后输入相同、轨迹也完全相同；
+    不同的窗口（轨道/反转点尚未收敛，很少见）从上一窗口的真实状态用 advance(状态, t, m) 逐根重算
+    """
+    T, M = inputs[0].shape
+    if M > WIDE or T <= 2 * w: return kernel(*inputs, *params)
+    K = -(-(T - w) // w)
+    states = [s.reshape(2 * w, K, M) for s in kernel(*(_windows(x, K, w) for x in inputs), *params)]
+    out = [np.concatenate([s[:w, 0], s[w:].transpose(1, 0, 2).reshape(K * w, M)])[:T] for s in states]
+    ok = np.ones((K - 1, M), dtype=bool)
+    for s in states: ok &= (s[w - 1, 1:] == s[-1, :-1]) | (np.isnan(s[w - 1, 1:]) & np.isnan(s[-1, :-1]))
+    for m in np.flatnonzero(~ok.all(axis=0)):
+        redone = False  # 上一窗口重算过时，本窗口要与重算后的状态比较
+        for k in range(1, K):
+            if ok[k - 1, m] and not redone: continue
+            p = (k + 1) * w - 1
+            state = tuple(o[p, m] for o in out)
+            if redone and all(a == s[w - 1, k, m] or (a != a and s[w - 1, k, m] != s[w - 1, k, m]) for a, s in zip(state, states)):
+                redone = False
+                continue
+            for t in range(p + 1, min(p + w + 1, T)):
+                state = advance(state, t, m)
+                for o, v in zip(out, state): o[t, m] = v
+            redone = True
+    return out
+
+
+def _supertrend_c(h, l, c, a, mult):
+    """压缩后的 (N, W) -> (线, 方向)"""
+    line, direction = np.full(c.shape, NAN), np.zeros(c.shape)
+    t0 = _start(a)
+    if t0 is None: return line, direction
+    mid = (h[:, t0:] + l[:, t0:]) / 2
+    lo, hi, C = (np.ascontiguousarray(x.T) for x in (mid - mult * a[:, t0:], mid + mult * a[:, t0:], c[:, t0:]))
+    up, dn, d = _chunked(_supertrend_cols, lambda s, t, m: _supertrend_next(lo[t, m], hi[t, m], C[t, m], *s, C[t - 1, m]), (lo, hi, C), ST_WINDOW)
+    line[:, t0:], direction[:, t0:] = np.where(d > 0, up, dn).T, d.T
+    return line, direction
+
+
+def _psar_c(h, l, start, step, maximum):
+    H, L = np.ascontiguousarray(h.T), np.ascontiguousarray(l.T)
+    advance = lambda s, t, m: _psar_step(H[t, m], L[t, m], H[t - 1, m], L[t - 1, m], H[t - 2, m], L[t - 2, m], start, step, maximum, *s)
+    sar, _, _, d = _chunked(_psar_cols, advance, (H, L), PSAR_WINDOW, start, step, maximum)
+    return sar.T, d.T
+
+
+def _chandelier_c(h, l, c, a, n, mult):
+    from panel import rolling_max, rolling_min
+    nls, nss = rolling_max(h, n) - mult * a, rolling_min(l, n) + mult * a
+    long_stop, short_stop = np.full(c.shape, NAN), np.full(c.shape, NAN)
+    t0 = _start(nls)
+    if t0 is None: return long_stop, short_stop
+    LS, SS, C = (np.ascontiguousarray(x[:, t0:].T) for x in (nls, nss, c))
+    ls, ss, _ = _chunked(_chandelier_cols, lambda s, t, m: _chandelier_next(LS[t, m], SS[t, m], C[t, m], *s, C[t - 1, m]), (LS, SS, C), CHANDELIER_WINDOW)
+    long_stop[:, t0:], short_stop[:, t0:] = ls.T, ss.T
+    return long_stop, short_stop
+
+
+# ---------- 接口 ----------
+
+def _panel(*arrays):
+    return [np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in arrays]
+
+
+def _shape(like, *outs):
+    res = [o[0] for o in outs] if np.ndim(like) == 1 else list(outs)
+    return res[0] if len(res) == 1 else tuple(res)
+
+
+def _extremes(h, l, c, n):
+    """n根有效K线的最高价/最低价（停牌的K线不计入窗口，与ATR一致）"""
+    from panel import rolling_max, rolling_min
+    (hc, lc), index = _compress(_valid(h, l, c), h, l)
+    return _expand(index, rolling_max(hc, n)), _expand(index, rolling_min(lc, n))
+
+
+def atr(high, low, close, n=14):
+    """Wilder ATR（RMA平滑的真实波幅），前 n-1 根为NaN；未编译时用分块闭式，不逐根循环"""
+    h, l, c = _panel(high, low, close)
+    if njit is not None: return _shape(close, _rows(_atr_row, (h, l, c), 1, n)[0])
+    (h, l, c), index = _compress(_valid(h, l, c), h, l, c)
+    return _shape(close, _expand(index, _atr_cols(_true_range(h, l, c), n)))
+
+
+def supertrend(high, low, close, n=14, mult=3.0, atr_values=None):
+    """(Supertrend线, 方向)：方向 1 时线为下轨（多头止损），-1 时为上轨；ATR预热期为NaN/0"""
+    h, l, c = _panel(high, low, close)
+    a = _panel(atr(h, l, c, n) if atr_values is None else atr_values)[0]
+    if njit is not None: return _shape(close, *_rows(_supertrend_row, (h, l, c, a), 2, mult))
+    (h, l, c, a), index = _compress(_valid(h, l, c), h, l, c, a)
+    line, direction = _supertrend_c(h, l, c, a, mult)
+    return _shape(close, _expand(index, line), _expand(index, direction, 0.0))
+
+
+def psar(high, low, start=0.02, step=0.02, maximum=0.2):
+    """(抛物线SAR, 方向)；第一根为NaN"""
+    h, l = _panel(high, low)
+    if njit is not None: return _shape(high, *_rows(_psar_row, (h, l), 2, start, step, maximum))
+    (h, l), index = _compress(_valid(h, l), h, l)
+    sar, direction = _psar_c(h, l, start, step, maximum)
+    return _shape(high, _expand(index, sar), _expand(index, direction, 0.0))
+
+
+def chandelier(high, low, close, n=22, mult=3.0, atr_values=None):
+    """(多头止损, 空头止损)：n根最高价 - mult*ATR(n) / n根最低价 + mult*ATR(n)，前收盘在止损外侧时只收紧"""
+    h, l, c = _panel(high, low, close)
+    a = _panel(atr(h, l, c, n) if atr_values is None else atr_values)[0]
+    if njit is not None: return _shape(close, *_rows(_chandelier_row, (h, l, c, *_extremes(h, l, c, n), a), 2, mult))
+    (h, l, c, a), index = _compress(_valid(h, l, c), h, l, c, a)
+    long_stop, short_stop = _chandelier_c(h, l, c, a, n, mult)
+    return _shape(close, _expand(index, long_stop), _expand(index, short_stop))
+
+
+def trail_indicators(high, low, close):
+    """calculate_indicators 中的路径依赖列，{列名: 数组}，形状同输入；向量化实现时共用一次压缩和真实波幅"""
+    h, l, c = _panel(high, low, close)
+    out = {}
+    if njit is not None:
+        out['ATR'] = atr(h, l, c, 14)
+        out['Supertrend'], out['Supertrend_Dir'] = supertrend(h, l, c, 14, 3.0, out['ATR'])
+        out['PSAR'] = psar(h, l)[0]
+        out['Chandelier_Long'], out['Chandelier_Short'] = chandelier(h, l, c, 22, 3.0)
+    else:
+        (hc, lc, cc), index = _compress(_valid(h, l, c), h, l, c)
+        tr = _true_range(hc, lc, cc)
+        a = _atr_cols(tr, 14)
+        line, direction = _supertrend_c(hc, lc, cc, a, 3.0)
+        long_stop, short_stop = _chandelier_c(hc, lc, cc, _atr_cols(tr, 22), 22, 3.0)
+        out['ATR'], out['Supertrend'], out['Supertrend_Dir'] = _expand(index, a), _expand(index, line), _expand(index, direction, 0.0)
+        out['PSAR'] = psar(h, l)[0]
+        out['Chandelier_Long'], out['Chandelier_Short'] = _expand(index, long_stop), _expand(index, short_stop)
+    return {k: _shape(close, v) for k, v in out.items()}
+
+
+def warmup():
+    """编译全部内核；cache=True 时写入磁盘缓存，之后的进程直接加载。未安装 numba 时无事可做"""
+    if njit is None: return
+    x = np.linspace(10.0, 11.0, 64)
+    trail_indicators(x + 0.1, x - 0.1, x)
+    # 流式引擎从Python直接调用单步函数
+    _atr_step(_tr(1.0, 0.5, NAN), 14, NAN, 0, 0.0)
+    _supertrend_step(1.0, 0.5, 0.8, 0.1, 3.0, NAN, NAN, 0, NAN)
+    _psar_step(1.0, 0.5, NAN, NAN, NAN, NAN, 0.02, 0.02, 0.2, NAN, NAN, 0.02, 0)
+    _chandelier_step(1.0, 0.5, 0.8, 0.1, 3.0, NAN, NAN, 0, NAN)
+
+
+if njit is not None:  # 导入时在后台编译，不落在首次渲染上；部署后运行一次 python trail.py 可预先写好磁盘缓存
+    threading.Thread(target=warmup, name="trail-warmup", daemon=True).start()
+
+
+if __name__ == "__main__":
+    import time
+    t = time.perf_counter()
+    warmup()
+    print(f"numba {'未安装' if njit is None else '内核已编译'}，耗时 {time.perf_counter() - t:.1f}s")
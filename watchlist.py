@@ -0,0 +1,225 @@
+"""
+自选股横向比较 - 滚动收益相关系数、相对基准的Beta、相对强弱排名
+收盘价按日历日对齐（各市场假期为NaN），收益取相对该品种上一个有效收盘价，相关系数按两两同时有效的日子计算
+RollingCovariance 维护窗口内的成对累加矩阵，新一天到来时做秩1加/减更新 O(N²)，不重算整个窗口
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+RS_HORIZONS = (63, 126, 252)  # 约3/6/12个月
+RS_WEIGHTS = (0.4, 0.3, 0.3)
+
+
+class RollingCovariance:
+    """X 为NaN置0的收益、V 为有效标记，窗口内维护 C=XᵀX、A=XᵀV、Q=(X²)ᵀV、K=VᵀV
+    初始化按行分块做矩阵乘；push 加入最新一行、移出最旧一行；每 rebuild_every 次整窗重算一次，消除加减累积误差
+    """
+
+    def __init__(self, n, window=60, rebuild_every=None, block=256):
+        self.n, self.window, self.block = n, window, block
+        self.rebuild_every = rebuild_every or 4 * window
+        self.buf = np.full((window, n), np.nan)  # 环形缓冲，最旧一行在 pos
+        self.pos = self.count = self.pushed = 0
+        self._zero()
+
+    def _zero(self):
+        self.C, self.A, self.Q, self.K = (np.zeros((self.n, self.n)) for _ in range(4))
+
+    def _accumulate(self, R, sign=1.0):
+        for i in range(0, len(R), self.block):
+            r = R[i:i + self.block]
+            v = ~np.isnan(r)
+            x = np.where(v, r, 0.0)
+            v = v.astype(np.float64)
+            self.C += sign * (x.T @ x)
+            self.A += sign * (x.T @ v)
+            self.Q += sign * ((x * x).T @ v)
+            self.K += sign * (v.T @ v)
+
+    def reset(self, R):
+        """用最近 window 行收益 (T, N) 整体重算"""
+        R = np.asarray(R, dtype=np.float64)[-self.window:]
+        self.buf[:] = np.nan
+        self.buf[:len(R)] = R
+        self.count, self.pos = len(R), len(R) % self.window
+        self._zero()
+        self._accumulate(R)
+        return self
+
+    def push(self, r):
+        r = np.asarray(r, dtype=np.float64)
+        if self.count == self.window:
+            self._accumulate(self.buf[self.pos][None], -1.0)
+        else:
+            self.count += 1
+        self.buf[self.pos] = r
+        self.pos = (self.pos + 1) % self.window
+        self._accumulate(r[None])
+        self.pushed += 1
+        if self.pushed % self.rebuild_every == 0: self.reset(self.rows())
+        return self
+
+    def revise(self, r):
+        """替换最新一行（最后一天的收盘价被修正），窗口其余行不动"""
+        if self.count == 0: return self.push(r)
+        r = np.asarray(r, dtype=np.float64)
+        i = (self.pos - 1) % self.window
+        self._accumulate(self.buf[i][None], -1.0)
+        self.buf[i] = r
+        self._accumulate(r[None])
+        return self
+
+    def rows(self):
+        """窗口内收益，按时间从旧到新"""
+        if self.count < self.window: return self.buf[:self.count].copy()
+        return np.roll(self.buf, -self.pos, axis=0)
+
+    def _moments(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mx = self.A / self.K  # mx[i, j]: i 在与 j 同时有效的日子上的均值
+            cov = self.C / self.K - mx * mx.T
+            var = self.Q / self.K - mx * mx  # var[i, j]: 同上的方差
+        return cov, var
+
+    def correlation(self, min_periods=20):
+        cov, var = self._moments()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.sqrt(var * var.T)
+        corr[(self.K < min_periods) | ~(var > 0) | ~(var.T > 0)] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    def beta(self, j, min_periods=20):
+        """各品种相对第j个品种的Beta"""
+        cov, var = self._moments()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            beta = cov[:, j] / var[j, :]
+        beta[(self.K[:, j] < min_periods) | ~(var[j, :] > 0)] = np.nan
+        return beta
+
+
+def closes_panel(frames):
+    """{代码: K线} 的收盘价按日历日对齐为 DataFrame（日期 × 代码），不同市场/时区只保留日期"""
+    cols = {}
+    for s, df in frames.items():
+        if df is None or len(df) == 0: continue
+        idx = df.index.tz_localize(None) if getattr(df.index, "tz", None) is not None else df.index
+        c = pd.Series(df['Close'].to_numpy(dtype=np.float64), index=idx.normalize())
+        cols[s] = c[~c.index.duplicated(keep="last")]
+    return pd.DataFrame(cols).sort_index()
+
+
+def log_returns(closes):
+    """相对各自上一个有效收盘价的对数收益，当天无收盘价为NaN"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = np.log(closes.ffill()).diff()
+    return r.where(closes.notna())
+
+
+def load_frames(symbols, period="2y", workers=8):
+    """并发取日线（走本地存储，过期才补尾部），失败的代码跳过"""
+    import analysis
+
+    def one(s):
+        try: return s, analysis.get_stock_data(s, period, with_info=False)[0]
+        except Exception: return s, None
+
+    with ThreadPoolExecutor(workers) as ex: return {s: df for s, df in ex.map(one, symbols) if df is not None and len(df)}
+
+
+class Watchlist:
+    """自选股矩阵；extend() 只把新日期的收盘价推入滚动协方差，已有窗口不重算
+    最后一天的收盘价变化（盘中取到的未收盘价、事后修正）时只替换滚动协方差中最新的一行
+    同一对象被多个会话共享：写入与读取都持有 lock（可重入，table() 内的各次读取看到同一个状态）
+    """
+
+    def __init__(self, closes, benchmark=None, window=60):
+        self.closes = closes
+        self.symbols = list(closes.columns)
+        self.benchmark = benchmark if benchmark in self.symbols else None
+        self.cov = RollingCovariance(len(self.symbols), window).reset(log_returns(closes).to_numpy()[1:])
+        self.lock = threading.RLock()
+
+    @classmethod
+    def from_frames(cls, frames, benchmark=None, window=60):
+        return cls(closes_panel(frames), benchmark, window)
+
+    def _revise_last(self, row):
+        """最后一天收盘价有变化时（新值为NaN的代码沿用旧值）替换该行，并重算该行相对前一个有效收盘价的收益"""
+        old = self.closes.iloc[-1].to_numpy(dtype=np.float64)
+        price = row.to_numpy(dtype=np.float64)
+        price = np.where(np.isnan(price), old, price)
+        if np.array_equal(price, old, equal_nan=True): return False
+        # closes 可能与调用方（页面缓存的收盘价表）是同一对象，改副本
+        self.closes = self.closes.copy()
+        self.closes.iloc[-1] = price
+        if len(self.closes) > 1:
+            prev = self.closes.iloc[:-1].ffill().iloc[-1].to_numpy(dtype=np.float64)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self.cov.revise(np.log(price / prev))
+        return True
+
+    def extend(self, closes):
+        """最后日期的收盘价有变化时先修正该行，再追加更新的日期（列按现有代码对齐，新增代码忽略），返回追加的行数"""
+        with self.lock:
+            new = closes.reindex(columns=self.symbols)
+            if len(self.closes):
+                last_date = self.closes.index[-1]
+                same = new[new.index == last_date]
+                if len(same): self._revise_last(same.iloc[-1])
+                new = new[new.index > last_date]
+            if not len(new): return 0
+            last = self.closes.ffill().iloc[-1].to_numpy()
+            for date, row in new.iterrows():
+                price = row.to_numpy(dtype=np.float64)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    self.cov.push(np.log(price / last))
+                last = np.where(np.isnan(price), last, price)
+            self.closes = pd.concat([self.closes, new])
+            return len(new)
+
+    def correlation(self, min_periods=20):
+        with self.lock: corr = self.cov.correlation(min_periods)
+        return pd.DataFrame(corr, index=self.symbols, columns=self.symbols)
+
+    def beta(self, min_periods=20):
+        if self.benchmark is None: return pd.Series(np.nan, index=self.symbols)
+        with self.lock: beta = self.cov.beta(self.symbols.index(self.benchmark), min_periods)
+        return pd.Series(beta, index=self.symbols)
+
+    def relative_strength(self, horizons=RS_HORIZONS, weights=RS_WEIGHTS):
+        """各周期收益（按各自交易日计）减基准收益后加权得分，排名为百分位 1-99"""
+        with self.lock: values = self.closes.to_numpy(dtype=np.float64)
+        rets = np.full((len(self.symbols), len(horizons)), np.nan)
+        for i in range(len(self.symbols)):
+            c = values[:, i][~np.isnan(values[:, i])]
+            rets[i] = [c[-1] / c[-1 - h] - 1 if len(c) > h else np.nan for h in horizons]
+        df = pd.DataFrame(rets, index=self.symbols, columns=[f"ret_{h}" for h in horizons])
+        excess = df - df.loc[self.benchmark] if self.benchmark else df
+        # 缺某周期的代码按已有周期的权重归一
+        w = np.array(weights, dtype=np.float64)
+        ok = excess.notna().to_numpy()
+        wsum = (ok * w).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            df["rs_score"] = np.where(wsum > 0, (excess.fillna(0).to_numpy() * w).sum(axis=1) / wsum, np.nan)
+        df["rs_rank"] = (df["rs_score"].rank(pct=True) * 98 + 1).round()
+        return df
+
+    def table(self):
+        """每个代码一行：最新收盘、Beta、与基准相关系数、相对强弱"""
+        with self.lock:
+            df = self.relative_strength()
+            df.insert(0, "close", self.closes.ffill().iloc[-1])
+            df.insert(1, "beta", self.beta())
+            if self.benchmark: df.insert(2, "corr_benchmark", self.correlation()[self.benchmark])
+        return df
+
+
+def cluster_order(corr):
+    """按相关矩阵前两个特征向量的夹角排序，相关性高的代码在热力图中相邻"""
+    c = np.nan_to_num(np.asarray(corr, dtype=np.float64))
+    if len(c) < 3: return np.arange(len(c))
+    _, vec = np.linalg.eigh(c)
+    return np.argsort(np.arctan2(vec[:, -2], vec[:, -1]), kind="stable")
@@ -0,0 +1,150 @@
+"""
+威科夫引擎 - 成交量分布（POC/价值区）+ 结构事件识别（Spring/UT/UTAD/SC/BC/放量滞涨）
+成交量分布按对数价格分箱，每根K线的量均摊到其高低点覆盖的箱，差分数组 + bincount 一次累加，追加K线时增量更新
+事件识别在整段数组上一次向量化扫描，支持一维序列或 (N, T) 面板（自选股列表）
+"""
+
+import numpy as np
+from panel import rolling_mean, rolling_min, rolling_max
+
+EVENT_NAMES = {
+    "spring": "Spring(弹簧)", "ut": "UT(上冲回落)", "utad": "UTAD(派发后上冲)",
+    "sc": "SC(抛售高潮)", "bc": "BC(购买高潮)", "evr": "放量滞涨/滞跌",
+}
+ACCUMULATION = ("spring", "sc")
+DISTRIBUTION = ("ut", "utad", "bc")
+
+
+class VolumeProfile:
+    """价格-成交量分布，step 为对数价格箱宽（0.002 ≈ 0.2%）"""
+
+    def __init__(self, step=0.002):
+        self.step = step
+        self.origin = None
+        self.vol = np.zeros(0)
+
+    def _bins(self, price):
+        return np.floor(np.log(price) / self.step).astype(np.int64)
+
+    def _ensure(self, lo, hi):
+        if self.origin is None:
+            self.origin, self.vol = lo, np.zeros(hi - lo + 1)
+            return
+        left, right = max(0, self.origin - lo), max(0, hi - (self.origin + len(self.vol) - 1))
+        if left or right:
+            self.vol = np.concatenate([np.zeros(left), self.vol, np.zeros(right)])
+            self.origin -= left
+
+    def add(self, high, low, volume, sign=1.0):
+        """累加K线（sign=-1 为移除，用于滚动窗口）"""
+        high, low, volume = (np.asarray(a, dtype=np.float64).ravel() for a in (high, low, volume))
+        ok = np.isfinite(high) & np.isfinite(low) & np.isfinite(volume) & (low > 0) & (volume > 0)
+        if not ok.any(): return self
+        lo, hi = self._bins(low[ok]), self._bins(high[ok])
+        hi = np.maximum(hi, lo)
+        self._ensure(int(lo.min()), int(hi.max()))
+        w = sign * volume[ok] / (hi - lo + 1)
+        n = len(self.vol)
+        diff = np.bincount(lo - self.origin, weights=w, minlength=n + 1) - np.bincount(hi - self.origin + 1, weights=w, minlength=n + 1)
+        self.vol += np.cumsum(diff[:n])
+        if sign < 0: np.maximum(self.vol, 0.0, out=self.vol)
+        return self
+
+    def price(self, i):
+        return float(np.exp((i + self.origin + 0.5) * self.step))
+
+    def poc(self):
+        """成交量最大价位（Point of Control）"""
+        return self.price(int(np.argmax(self.vol))) if self.vol.sum() > 0 else None
+
+    def value_area(self, pct=0.7):
+        """成交量从大到小取箱，累计达 pct 时覆盖的价格区间 (VAL, VAH)"""
+        total = self.vol.sum()
+        if total <= 0: return None, None
+        order = np.argsort(-self.vol, kind="stable")
+        k = int(np.searchsorted(np.cumsum(self.vol[order]), pct * total)) + 1
+        sel = order[:k]
+        return (float(np.exp((sel.min() + self.origin) * self.step)),
+                float(np.exp((sel.max() + self.origin + 1) * self.step)))
+
+
+def _prev(x):
+    out = np.full(x.shape, np.nan)
+    out[:, 1:] = x[:, :-1]
+    return out
+
+
+def detect_events(high, low, close, volume, n=20, climax_vol=2.0, climax_spread=1.5):
+    """一次扫描返回 {事件: 布尔数组}，形状与输入相同；参考区间均取到前一根K线为止
+    Spring: 跌破n日支撑后收回且收在K线上半部；UT: 突破n日阻力后收回且收在下半部，创3n日新高时记为UTAD
+    SC/BC: 创3n日新低/新高，放量（>=climax_vol倍均量）且振幅放大（>=climax_spread倍均幅）
+    放量滞涨/滞跌: 量>=1.5倍均量而振幅<=0.6倍均幅（努力与结果背离）
+    """
+    squeeze = np.ndim(close) == 1
+    H, L, C, V = (np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in (high, low, close, volume))
+    sup, res = _prev(rolling_min(L, n)), _prev(rolling_max(H, n))
+    lo_long, hi_long = _prev(rolling_min(L, 3 * n)), _prev(rolling_max(H, 3 * n))
+    spread = H - L
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rv = V / _prev(rolling_mean(V, n))
+        rs = spread / _prev(rolling_mean(spread, n))
+        cl = (C - L) / spread
+    pc = _prev(C)
+    ut = (H > res) & (C < res) & (cl <= 0.5)
+    utad = ut & (H > hi_long)
+    climax = (rv >= climax_vol) & (rs >= climax_spread)
+    out = {
+        "spring": (L < sup) & (C > sup) & (cl >= 0.5),
+        "ut": ut & ~utad,
+        "utad": utad,
+        "sc": (L < lo_long) & climax & (C < pc),
+        "bc": (H > hi_long) & climax & (C > pc),
+        "evr": (rv >= 1.5) & (rs <= 0.6),
+    }
+    return {k: v[0] for k, v in out.items()} if squeeze else out
+
+
+class WyckoffEngine:
+    """extend() 追加K线：成交量分布增量累加，事件只对新K线判定（保留3n根尾部作为参考区间），结果与整段计算一致"""
+
+    def __init__(self, n=20, step=0.002):
+        self.n = n
+        self.profile = VolumeProfile(step)
+        self.count = 0
+        self.tail = np.empty((4, 0))
+        self.events = []  # (K线位置, 事件名)，按位置排序
+
+    def extend(self, high, low, close, volume):
+        new = np.vstack([np.asarray(a, dtype=np.float64).ravel() for a in (high, low, close, volume)])
+        if new.shape[1] == 0: return self
+        self.profile.add(new[0], new[1], new[3])
+        buf = np.hstack([self.tail, new])
+        start = self.tail.shape[1]
+        found = []
+        for name, mask in detect_events(*buf, n=self.n).items():
+            found += [(self.count + int(j), name) for j in np.flatnonzero(mask[start:])]
+        self.events += sorted(found)
+        self.count += new.shape[1]
+        self.tail = buf[:, -3 * self.n:]
+        return self
+
+    def recent(self, lookback=None):
+        lookback = lookback or 3 * self.n
+        return [e for e in self.events if e[0] >= self.count - lookback]
+
+
+def analyze_wyckoff(df, n=20):
+    return WyckoffEngine(n).extend(df['High'], df['Low'], df['Close'], df['Volume'])
+
+
+def wyckoff_phase(engine, price, lookback=None):
+    """最近3n根内的事件决定吸筹/派发（以最后出现的一类为准），否则按价格相对价值区判断"""
+    recent = engine.recent(lookback)
+    acc = [i for i, e in recent if e in ACCUMULATION]
+    dist = [i for i, e in recent if e in DISTRIBUTION]
+    if acc and (not dist or acc[-1] > dist[-1]): return "吸筹", "买入"
+    if dist: return "派发", "卖出"
+    val, vah = engine.profile.value_area()
+    if vah is not None and price > vah: return "上涨", "观望"
+    if val is not None and price < val: return "下跌", "观望"
+    return "震荡", "观望"